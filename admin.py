@@ -0,0 +1,23 @@
+import functools
+import hmac
+import os
+from flask import abort, request
+
+
+# admin routes answer only when ADMIN_TOKEN is set in the environment and the request sends
+# it back in the X-Admin-Token header; otherwise they 404 as if they didn't exist
+TOKEN_HEADER = 'X-Admin-Token'
+
+
+def authorized():
+    token = os.environ.get('ADMIN_TOKEN')
+    return bool(token) and hmac.compare_digest(request.headers.get(TOKEN_HEADER, ''), token)
+
+
+def guarded(view):
+    @functools.wraps(view)
+    def checked(*args, **kwargs):
+        if not authorized():
+            abort(404)
+        return view(*args, **kwargs)
+    return checked
@@ -0,0 +1,187 @@
+import argparse
+import time
+import numpy as np
+from embeddings import distance_blocks, top_k_rows
+
+
+# inverted-file (IVF) approximate nearest neighbour index in plain numpy: k-means centroids
+# split the gallery into lists, and a query only scans the n_probe lists nearest to it.
+# n_probe trades recall for latency; n_probe == n_lists is exact search.
+#
+#   python ann.py bench --n 100000 --queries 200
+
+KMEANS_ITERATIONS = 20
+# points per centroid used to train k-means, the rest are only assigned
+TRAINING_POINTS_PER_LIST = 64
+DEFAULT_N_PROBE = 8
+
+
+def default_n_lists(n):
+    return max(1, int(round(np.sqrt(n))))
+
+
+# index of the nearest centroid for every vector
+def assign(vectors, centroids):
+    labels = np.empty(len(vectors), dtype=np.int64)
+    for start, distances in distance_blocks(vectors, centroids):
+        labels[start:start + len(distances)] = distances.argmin(axis=1)
+    return labels
+
+
+def kmeans(vectors, n_lists, iterations=KMEANS_ITERATIONS, seed=0):
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), n_lists, replace=False)].copy()
+    for _ in range(iterations):
+        labels = assign(vectors, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, vectors)
+        counts = np.bincount(labels, minlength=n_lists)
+        empty = counts == 0
+        # an empty list restarts from a random point rather than staying dead
+        centroids[~empty] = sums[~empty] / counts[~empty, None]
+        centroids[empty] = vectors[rng.choice(len(vectors), int(empty.sum()), replace=False)]
+    return centroids
+
+
+class IVFIndex:
+
+    # vectors are stored grouped by list: list i holds rows offsets[i]:offsets[i + 1] of
+    # `vectors`, whose positions in the original gallery are `ids`
+    def __init__(self, centroids, offsets, ids, vectors):
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        self.squared_norms = np.einsum('ij,ij->i', self.vectors, self.vectors)
+
+    @classmethod
+    def build(cls, vectors, n_lists=None, iterations=KMEANS_ITERATIONS, seed=0):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        n_lists = min(n_lists or default_n_lists(len(vectors)), len(vectors))
+        rng = np.random.default_rng(seed)
+        sample_size = min(len(vectors), n_lists * TRAINING_POINTS_PER_LIST)
+        sample = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+        centroids = kmeans(sample, n_lists, iterations, seed)
+        labels = assign(vectors, centroids)
+        ids = np.argsort(labels, kind='stable')
+        offsets = np.searchsorted(labels[ids], np.arange(n_lists + 1))
+        return cls(centroids, offsets, ids, vectors[ids])
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        return cls(data['centroids'], data['offsets'], data['ids'], data['vectors'])
+
+    def save(self, path):
+        np.savez(path, centroids=self.centroids, offsets=self.offsets, ids=self.ids, vectors=self.vectors)
+
+    @property
+    def n_lists(self):
+        return len(self.centroids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    # (ids, squared L2 distances) of the k nearest indexed vectors for each query, closest
+    # first, as len(queries) x k arrays; rows are padded with -1 / inf when the probed
+    # lists hold fewer than k vectors
+    def search(self, queries, k, n_probe=DEFAULT_N_PROBE):
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        n_probe = min(n_probe, self.n_lists)
+        ids = np.full((len(queries), k), -1, dtype=np.int64)
+        distances = np.full((len(queries), k), np.inf, dtype=np.float32)
+        for start, coarse in distance_blocks(queries, self.centroids):
+            probes = top_k_rows(coarse, n_probe)
+            for i, lists in enumerate(probes):
+                rows = np.concatenate([np.arange(self.offsets[l], self.offsets[l + 1]) for l in lists])
+                if not len(rows):
+                    continue
+                _, scanned = next(distance_blocks(queries[start + i:start + i + 1], self.vectors[rows], self.squared_norms[rows]))
+                best = top_k_rows(scanned, k)[0]
+                ids[start + i, :len(best)] = self.ids[rows[best]]
+                distances[start + i, :len(best)] = scanned[0, best]
+        return ids, distances
+
+
+# unit vectors drawn around `clusters` random centres, roughly how face embeddings group by person
+def synthetic_embeddings(n, dim=128, clusters=None, spread=0.35, seed=0):
+    rng = np.random.default_rng(seed)
+    clusters = clusters or max(1, n // 10)
+    centres = rng.normal(size=(clusters, dim)).astype(np.float32)
+    centres /= np.linalg.norm(centres, axis=1, keepdims=True)
+    vectors = centres[rng.integers(0, clusters, n)] + spread * rng.normal(size=(n, dim)).astype(np.float32) / np.sqrt(dim)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def exact_search(queries, gallery, k, gallery_sq=None):
+    ids = []
+    for _, distances in distance_blocks(queries, gallery, gallery_sq):
+        ids.append(top_k_rows(distances, k))
+    return np.concatenate(ids)
+
+
+def recall(found, truth):
+    hits = sum(len(np.intersect1d(f, t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+# recall@k and per-query latency of the index against exact search, for each n_probe
+def benchmark(n=100000, dim=128, queries=200, k=8, n_lists=None, probes=(1, 2, 4, 8, 16, 32, 64), seed=0):
+    gallery = synthetic_embeddings(n, dim, seed=seed)
+    rng = np.random.default_rng(seed + 1)
+    query_vectors = gallery[rng.choice(n, queries, replace=False)]
+    query_vectors = query_vectors + 0.05 * rng.normal(size=query_vectors.shape).astype(np.float32) / np.sqrt(dim)
+
+    start = time.perf_counter()
+    index = IVFIndex.build(gallery, n_lists, seed=seed)
+    print('built {} lists over {} vectors in {:.2f}s'.format(index.n_lists, n, time.perf_counter() - start))
+
+    # exact search one query at a time, the interactive case the index replaces
+    gallery_sq = np.einsum('ij,ij->i', gallery, gallery)
+    start = time.perf_counter()
+    truth = np.concatenate([exact_search(q[None, :], gallery, k, gallery_sq) for q in query_vectors])
+    exact_ms = (time.perf_counter() - start) * 1000 / queries
+    print('exact       recall 1.000  {:8.3f} ms/query'.format(exact_ms))
+
+    results = []
+    for n_probe in probes:
+        if n_probe > index.n_lists:
+            break
+        start = time.perf_counter()
+        found, _ = index.search(query_vectors, k, n_probe)
+        ms = (time.perf_counter() - start) * 1000 / queries
+        r = recall(found, truth)
+        results.append((n_probe, r, ms))
+        print('n_probe {:>3} recall {:.3f}  {:8.3f} ms/query  {:5.1f}x'.format(n_probe, r, ms, exact_ms / ms))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build, query and benchmark the IVF face index.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build = commands.add_parser('build', help='index an embedding store')
+    build.add_argument('--store', required=True)
+    build.add_argument('--out', required=True, help='.npz index file')
+    build.add_argument('--n-lists', type=int, default=None)
+
+    bench = commands.add_parser('bench', help='recall vs latency against exact search on synthetic embeddings')
+    bench.add_argument('--n', type=int, default=100000)
+    bench.add_argument('--dim', type=int, default=128)
+    bench.add_argument('--queries', type=int, default=200)
+    bench.add_argument('--k', type=int, default=8)
+    bench.add_argument('--n-lists', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        from embeddings import EmbeddingStore
+        index = IVFIndex.build(EmbeddingStore.load(args.store).vectors, args.n_lists)
+        index.save(args.out)
+        print('wrote {} lists over {} vectors to {}'.format(index.n_lists, len(index), args.out))
+    else:
+        benchmark(args.n, args.dim, args.queries, args.k, args.n_lists)
+
+
+if __name__ == '__main__':
+    main()
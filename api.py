@@ -0,0 +1,57 @@
+import hashlib
+import json
+import math
+import threading
+from collections import OrderedDict
+from flask import Response, request
+
+
+# conditional GET for the read-only json api. A response's ETag depends only on the data
+# version and the request path + query, so a client polling with If-None-Match gets its 304
+# without the body ever being built. Bodies that are built are kept (most recent
+# CACHE_SIZE) for the lifetime of the data version.
+
+CACHE_SIZE = 256
+# clients may keep a copy but have to revalidate it, which is what the ETag makes cheap
+CACHE_CONTROL = 'no-cache'
+
+_bodies = OrderedDict()
+_lock = threading.Lock()
+
+
+def etag(version, key):
+    return hashlib.sha1('{} {}'.format(version, key).encode()).hexdigest()[:20]
+
+
+# compact json, with NaN (padding, undefined rates) as null
+def dumps(value):
+    return json.dumps(value, separators=(',', ':'), allow_nan=False)
+
+
+def _headers(tag):
+    return {'ETag': '"{}"'.format(tag), 'Cache-Control': CACHE_CONTROL}
+
+
+# the json `build()` returns, or 304 if the client already has this version of it
+def conditional_json(version, build):
+    key = request.full_path
+    tag = etag(version, key)
+    if tag in request.if_none_match:
+        return Response(status=304, headers=_headers(tag))
+    with _lock:
+        body = _bodies.get((version, key))
+        if body is not None:
+            _bodies.move_to_end((version, key))
+    if body is None:
+        body = dumps(build())
+        with _lock:
+            _bodies[(version, key)] = body
+            while len(_bodies) > CACHE_SIZE:
+                _bodies.popitem(last=False)
+    return Response(body, mimetype='application/json', headers=_headers(tag))
+
+
+# numpy scalars as plain floats, NaN / inf as null
+def finite(value):
+    value = float(value)
+    return value if math.isfinite(value) else None
@@ -0,0 +1,20 @@
+// redraws the per-group false match / miss bars of groups-graph at the slider's threshold
+window.dash_clientside = window.dash_clientside || {};
+window.dash_clientside.groups = {
+    bars: function(threshold, figure, points) {
+        if (!figure || !points || threshold === undefined || threshold === null) {
+            return window.dash_clientside.no_update;
+        }
+        // precomputed at the slider marks; take the nearest one
+        var t = 0;
+        for (var i = 1; i < points.thresholds.length; i++) {
+            if (Math.abs(points.thresholds[i] - threshold) < Math.abs(points.thresholds[t] - threshold)) {
+                t = i;
+            }
+        }
+        var data = figure.data.slice();
+        data[0] = Object.assign({}, data[0], {y: points.false_match[t]});
+        data[1] = Object.assign({}, data[1], {y: points.miss[t]});
+        return Object.assign({}, figure, {data: data});
+    }
+};
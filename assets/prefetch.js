@@ -0,0 +1,23 @@
+// issues <link rel=prefetch> for the image urls the server expects to be needed next
+window.dash_clientside = window.dash_clientside || {};
+window.dash_clientside.prefetch = {
+    hint: function(urls) {
+        if (!urls || !urls.length) {
+            return '';
+        }
+        var idle = window.requestIdleCallback || function(fn) { return setTimeout(fn, 200); };
+        idle(function() {
+            urls.forEach(function(url) {
+                if (document.head.querySelector('link[rel="prefetch"][href="' + url + '"]')) {
+                    return;
+                }
+                var link = document.createElement('link');
+                link.rel = 'prefetch';
+                link.as = 'image';
+                link.href = url;
+                document.head.appendChild(link);
+            });
+        });
+        return String(urls.length);
+    }
+};
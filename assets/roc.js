@@ -0,0 +1,24 @@
+// places the ROC and DET markers (the last two traces of roc-graph) at the slider's threshold
+window.dash_clientside = window.dash_clientside || {};
+window.dash_clientside.roc = {
+    marker: function(threshold, figure, points) {
+        if (!figure || !points || threshold === undefined || threshold === null) {
+            return window.dash_clientside.no_update;
+        }
+        // thresholds are descending; find the last point still at or above the slider value
+        var lo = 0, hi = points.thresholds.length - 1;
+        while (lo < hi) {
+            var mid = Math.ceil((lo + hi) / 2);
+            if (points.thresholds[mid] >= threshold) {
+                lo = mid;
+            } else {
+                hi = mid - 1;
+            }
+        }
+        var data = figure.data.slice();
+        var n = data.length;
+        data[n - 2] = Object.assign({}, data[n - 2], {x: [points.fpr[lo]], y: [points.tpr[lo]]});
+        data[n - 1] = Object.assign({}, data[n - 1], {x: [points.det_x[lo]], y: [points.det_y[lo]]});
+        return Object.assign({}, figure, {data: data});
+    }
+};
@@ -0,0 +1,21 @@
+// passes threshold-slider drags on to the `threshold` store at most once per throttle-timer
+// interval; a value held back is sent when the timer next fires, so the final one always lands
+window.dash_clientside = window.dash_clientside || {};
+window.dash_clientside.throttle = (function() {
+    var lastSent = 0;
+    return {
+        threshold: function(value, ticks, interval, current) {
+            var noUpdate = window.dash_clientside.no_update;
+            if (value === undefined || value === null || value === current) {
+                return [noUpdate, true];
+            }
+            var now = Date.now();
+            if (now - lastSent >= interval) {
+                lastSent = now;
+                return [value, true];
+            }
+            // too soon: hold it and let the timer bring us back
+            return [noUpdate, false];
+        }
+    };
+})();
@@ -0,0 +1,133 @@
+import argparse
+import threading
+import numpy as np
+from multiprocessing import Pool, cpu_count
+from sweep import at_or_above
+
+
+# bootstrap confidence intervals for each subject's false match rate (the "N% mismatches" the
+# subjectN_mismatches callbacks show from only 7 impostors). Every subject's impostor scores
+# are resampled with replacement RESAMPLES times in one array op per chunk of subjects, and
+# the rate at every threshold comes from sweep.at_or_above over all resamples at once.
+# Chunks go to a process pool once there are enough subjects to pay for it; each chunk has
+# its own seed, so results don't depend on the number of workers. Intervals are cached per
+# ScoreRegistry.version.
+#
+#   python bootstrap.py --resamples 2000 --confidence 0.9
+
+RESAMPLES = 1000
+CONFIDENCE = 0.95
+SEED = 0
+# resampled scores per task (resamples x subjects x candidates); fewer subjects than
+# POOL_MIN_SUBJECTS run in-process
+CHUNK_CELLS = 1 << 22
+POOL_MIN_SUBJECTS = 1024
+
+_intervals = {}
+_lock = threading.Lock()
+
+
+class Intervals:
+
+    # thresholds x subjects arrays of the observed false match rate and its interval bounds
+    def __init__(self, thresholds, rate, low, high, confidence, resamples):
+        self.thresholds = thresholds
+        self.rate = rate
+        self.low = low
+        self.high = high
+        self.confidence = confidence
+        self.resamples = resamples
+
+    # row of the precomputed threshold nearest to `threshold`
+    def at(self, threshold):
+        return int(np.abs(self.thresholds - threshold).argmin())
+
+
+# impostor scores packed to the left of each row, and how many each subject has
+def impostor_scores(registry):
+    mask = registry.valid & ~registry.match
+    order = np.argsort(~mask, axis=1, kind='stable')
+    return np.take_along_axis(np.where(mask, registry.similarity, np.nan), order, axis=1), mask.sum(axis=1)
+
+
+# percentile interval of every subject's false match rate from `resamples` resamples
+def resample_chunk(task):
+    scores, counts, thresholds, resamples, confidence, seed = task
+    rng = np.random.default_rng(seed)
+    subjects, width = scores.shape
+    # resample b of subject s is scores[s, picks[b, s]]; picks stay below each subject's count
+    picks = (rng.random((resamples, subjects, width)) * counts[None, :, None]).astype(np.int64)
+    resampled = np.take_along_axis(np.broadcast_to(scores, (resamples, subjects, width)), picks, axis=2)
+    mask = np.broadcast_to(np.arange(width)[None, None, :] < counts[None, :, None], resampled.shape)
+    hits = at_or_above(resampled.reshape(-1, width), mask.reshape(-1, width), thresholds)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rates = hits.reshape(resamples, subjects, -1) / counts[None, :, None]
+    tail = (1 - confidence) / 2 * 100
+    low, high = np.percentile(rates, [tail, 100 - tail], axis=0)
+    return low.T, high.T
+
+
+def compute(registry, thresholds, resamples=RESAMPLES, confidence=CONFIDENCE, seed=SEED, workers=None):
+    thresholds = np.sort(np.asarray(thresholds, dtype=float))
+    scores, counts = impostor_scores(registry)
+    chunk = max(1, CHUNK_CELLS // (resamples * max(scores.shape[1], 1)))
+    starts = range(0, len(scores), chunk)
+    seeds = np.random.SeedSequence(seed).spawn(len(starts))
+    tasks = [(scores[s:s + chunk], counts[s:s + chunk], thresholds, resamples, confidence, seeds[i])
+             for i, s in enumerate(starts)]
+    if len(scores) >= POOL_MIN_SUBJECTS and len(tasks) > 1:
+        with Pool(min(workers or cpu_count(), len(tasks))) as pool:
+            results = pool.map(resample_chunk, tasks)
+    else:
+        results = [resample_chunk(task) for task in tasks]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rate = at_or_above(scores, ~np.isnan(scores), thresholds).T / counts[None, :]
+    return Intervals(thresholds, rate, np.hstack([r[0] for r in results]), np.hstack([r[1] for r in results]),
+                     confidence, resamples)
+
+
+def _key(registry, thresholds, resamples, confidence, seed):
+    return (registry.version, tuple(np.round(thresholds, 6)), resamples, confidence, seed)
+
+
+def intervals(registry, thresholds, resamples=RESAMPLES, confidence=CONFIDENCE, seed=SEED):
+    key = _key(registry, thresholds, resamples, confidence, seed)
+    with _lock:
+        if key not in _intervals:
+            _intervals[key] = compute(registry, thresholds, resamples, confidence, seed)
+        return _intervals[key]
+
+
+# the cached intervals, or None while they're still being computed
+def cached(registry, thresholds, resamples=RESAMPLES, confidence=CONFIDENCE, seed=SEED):
+    return _intervals.get(_key(registry, thresholds, resamples, confidence, seed))
+
+
+# fills the cache on a daemon thread so startup and callbacks never wait for it
+def precompute(registry, thresholds, **kwargs):
+    thread = threading.Thread(target=intervals, args=(registry, thresholds), kwargs=kwargs, daemon=True)
+    thread.start()
+    return thread
+
+
+def main(argv=None):
+    from dash_skeleton import registry
+
+    parser = argparse.ArgumentParser(description='Bootstrap intervals for every subject\'s false match rate.')
+    parser.add_argument('--resamples', type=int, default=RESAMPLES)
+    parser.add_argument('--confidence', type=float, default=CONFIDENCE)
+    parser.add_argument('--step', type=float, default=0.1)
+    parser.add_argument('--seed', type=int, default=SEED)
+    args = parser.parse_args(argv)
+
+    thresholds = np.round(np.arange(0, 1.4 + args.step / 2, args.step), 6)
+    result = compute(registry, thresholds, args.resamples, args.confidence, args.seed)
+    print('{:.0%} intervals from {} resamples, data version {}'.format(args.confidence, args.resamples, registry.version))
+    for s, label in enumerate(registry.labels):
+        print('\n' + label)
+        for t, threshold in enumerate(result.thresholds):
+            print('  {:>5.2f}  {:>4.0%}  [{:.0%}, {:.0%}]'.format(threshold, result.rate[t, s], result.low[t, s], result.high[t, s]))
+
+
+if __name__ == '__main__':
+    main()
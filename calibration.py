@@ -0,0 +1,145 @@
+import argparse
+import numpy as np
+
+
+# maps the raw Difference score to the probability that a pair really is the same person,
+# fitted on the labelled Match column of every subject:
+#   platt     p = 1 / (1 + exp(a * difference + b)), fitted by Newton's method
+#   isotonic  the best non-increasing step fit (pool adjacent violators), interpolated
+# Fitted curves are cached per ScoreRegistry.version, so a reload with unchanged csvs
+# doesn't refit.
+#
+#   python calibration.py
+
+METHODS = ('platt', 'isotonic')
+NEWTON_ITERATIONS = 100
+
+_curves = {}
+
+
+def sigmoid(z):
+    return 1 / (1 + np.exp(-np.clip(z, -500, 500)))
+
+
+class PlattCurve:
+
+    method = 'platt'
+
+    def __init__(self, a, b):
+        self.a = a
+        self.b = b
+
+    def __call__(self, difference):
+        return sigmoid(-(self.a * np.asarray(difference, dtype=float) + self.b))
+
+
+class IsotonicCurve:
+
+    method = 'isotonic'
+
+    # breakpoints: probability y at difference x, x ascending
+    def __init__(self, x, y):
+        self.x = np.asarray(x, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+
+    def __call__(self, difference):
+        difference = np.asarray(difference, dtype=float)
+        return np.where(np.isnan(difference), np.nan, np.interp(difference, self.x, self.y))
+
+
+# Platt scaling with Platt's smoothed targets, so a perfectly separable set (like the
+# shipped csvs) still gets a finite slope
+def fit_platt(difference, match):
+    difference = np.asarray(difference, dtype=float)
+    match = np.asarray(match, dtype=bool)
+    positives = match.sum()
+    negatives = len(match) - positives
+    target = np.where(match, (positives + 1) / (positives + 2), 1 / (negatives + 2))
+    a, b = 0.0, np.log((negatives + 1) / (positives + 1))
+    for _ in range(NEWTON_ITERATIONS):
+        p = sigmoid(-(a * difference + b))
+        residual = target - p
+        weight = p * (1 - p) + 1e-12
+        gradient = np.array([residual @ difference, residual.sum()])
+        hessian = np.array([[weight @ difference ** 2, weight @ difference],
+                            [weight @ difference, weight.sum()]])
+        step = np.linalg.solve(hessian + 1e-9 * np.eye(2), gradient)
+        a, b = a - step[0], b - step[1]
+        if np.abs(step).max() < 1e-10:
+            break
+    return PlattCurve(a, b)
+
+
+# pool adjacent violators on the pairs sorted from largest to smallest difference, where
+# the match rate has to be non-decreasing
+def fit_isotonic(difference, match):
+    difference = np.asarray(difference, dtype=float)
+    match = np.asarray(match, dtype=float)
+    # tied differences are one point carrying their mean and their count
+    x, inverse, counts = np.unique(difference, return_inverse=True, return_counts=True)
+    sums = np.bincount(inverse, weights=match)
+    x, sums, counts = x[::-1], sums[::-1], counts[::-1].astype(float)
+
+    block_sum, block_count, block_start = [], [], []
+    for i in range(len(x)):
+        block_sum.append(sums[i])
+        block_count.append(counts[i])
+        block_start.append(i)
+        while len(block_sum) > 1 and block_sum[-2] / block_count[-2] > block_sum[-1] / block_count[-1]:
+            merged_sum, merged_count = block_sum.pop(), block_count.pop()
+            block_sum[-1] += merged_sum
+            block_count[-1] += merged_count
+            block_start.pop()
+
+    values = np.empty(len(x))
+    starts = block_start + [len(x)]
+    for j in range(len(block_sum)):
+        values[starts[j]:starts[j + 1]] = block_sum[j] / block_count[j]
+    return IsotonicCurve(x[::-1], values[::-1])
+
+
+def fit(difference, match, method='isotonic'):
+    if method == 'platt':
+        return fit_platt(difference, match)
+    if method == 'isotonic':
+        return fit_isotonic(difference, match)
+    raise ValueError('unknown calibration method {!r}, expected one of {}'.format(method, METHODS))
+
+
+# the curve fitted on every valid pair in the registry, cached per data version
+def curve(registry, method='isotonic'):
+    key = (registry.version, method)
+    if key not in _curves:
+        _curves[key] = fit(registry.difference[registry.valid], registry.match[registry.valid], method)
+    return _curves[key]
+
+
+# calibrated match probability for every subject x candidate cell in one pass (NaN for padding)
+def probabilities(registry, method='isotonic'):
+    return curve(registry, method)(registry.difference)
+
+
+def brier_score(probability, match):
+    return float(np.mean((probability - match) ** 2))
+
+
+def main(argv=None):
+    from dash_skeleton import registry
+
+    parser = argparse.ArgumentParser(description='Fit Difference -> match probability on the subject csvs.')
+    parser.add_argument('--step', type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    valid = registry.valid
+    print('{} pairs, {} true matches, data version {}'.format(int(valid.sum()), int(registry.match[valid].sum()), registry.version))
+    curves = [curve(registry, method) for method in METHODS]
+    print('platt a={:.3f} b={:.3f}'.format(curves[0].a, curves[0].b))
+    for c in curves:
+        print('{:<9} brier {:.4f}'.format(c.method, brier_score(c(registry.difference[valid]), registry.match[valid])))
+    print('\n{:>10} {:>9} {:>9}'.format('difference', *METHODS))
+    for d in np.round(np.arange(0, 1.5 + 1e-9, args.step), 3):
+        print('{:>10} {:>9.3f} {:>9.3f}'.format(d, *(float(c(d)) for c in curves)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+import argparse
+import hashlib
+import os
+import sys
+import time
+import numpy as np
+from multiprocessing import Pool, cpu_count, shared_memory
+from embeddings import EmbeddingStore, QuantizedVectors, distance_blocks, top_k_rows
+from gallery import TABLE_K, TopKTable
+
+
+# the offline gallery x gallery comparison behind the subject csvs and 11th_match.csv, spread
+# over every core. The distance matrix is cut into tiles, each tile is reduced to its top-k
+# per row in a worker, and the parent merges those into every face's running top-k list.
+# Finished tiles are checkpointed, so a killed run picks up where it stopped:
+#
+#   python compare_all.py --store embeddings.npy --table topk.npz --out results/
+#   python gallery.py export --table topk.npz --out .
+
+TILE_SIZE = 2048
+# seconds between checkpoint writes
+CHECKPOINT_INTERVAL = 30
+
+# set in each worker by attach()
+_shared = {}
+
+
+# a checkpoint is only resumed against the same store: the files and every vector (as stored,
+# so codes and scale for a quantized store), the tile size and k
+def store_fingerprint(store, tile_size, k):
+    digest = hashlib.sha1()
+    digest.update('{} {} {} {}'.format(store.vectors.shape, store.precision, tile_size, k).encode())
+    for f in store.files:
+        digest.update(f.encode())
+    if isinstance(store.vectors, QuantizedVectors):
+        arrays = [store.vectors.codes] + ([] if store.vectors.scale is None else [store.vectors.scale])
+    else:
+        arrays = [store.vectors]
+    for array in arrays:
+        digest.update(np.ascontiguousarray(array).data)
+    return digest.hexdigest()
+
+
+def attach(name, shape):
+    memory = shared_memory.SharedMemory(name=name)
+    vectors = np.ndarray(shape, dtype=np.float32, buffer=memory.buf)
+    _shared['memory'] = memory
+    _shared['vectors'] = vectors
+    _shared['squared_norms'] = np.einsum('ij,ij->i', vectors, vectors)
+
+
+# top-k of one tile: rows of `row_start` block against columns of `column_start` block
+def reduce_tile(task):
+    row_start, column_start, tile_size, k = task
+    vectors = _shared['vectors']
+    rows = vectors[row_start:row_start + tile_size]
+    columns = slice(column_start, column_start + tile_size)
+    _, distances = next(distance_blocks(rows, vectors[columns], _shared['squared_norms'][columns], block_size=len(rows)))
+    if row_start == column_start:
+        np.fill_diagonal(distances, np.inf)
+    picked = top_k_rows(distances, k)
+    return row_start, column_start, picked + column_start, np.take_along_axis(distances, picked, axis=1)
+
+
+class Checkpoint:
+
+    def __init__(self, path, fingerprint, n, k, tiles):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.indices = np.full((n, k), -1, dtype=np.int64)
+        self.differences = np.full((n, k), np.inf, dtype=np.float32)
+        self.done = np.zeros(tiles, dtype=bool)
+
+    # resumes from `path` when it was written for the same store and settings
+    def restore(self):
+        if not self.path or not os.path.exists(self.path):
+            return False
+        data = np.load(self.path)
+        if str(data['fingerprint']) != self.fingerprint:
+            raise ValueError('{} was written for a different store or settings, delete it to start over'.format(self.path))
+        self.indices, self.differences, self.done = data['indices'], data['differences'], data['done']
+        return True
+
+    def save(self):
+        if not self.path:
+            return
+        partial = self.path + '.partial.npz'
+        np.savez(partial, fingerprint=self.fingerprint, indices=self.indices, differences=self.differences, done=self.done)
+        os.replace(partial, self.path)
+
+    # folds one tile's per-row top-k into the running lists
+    def merge(self, row_start, indices, differences):
+        rows = slice(row_start, row_start + len(indices))
+        k = self.indices.shape[1]
+        merged_indices = np.concatenate([self.indices[rows], indices], axis=1)
+        merged_differences = np.concatenate([self.differences[rows], differences], axis=1)
+        best = top_k_rows(merged_differences, k)
+        self.indices[rows] = np.take_along_axis(merged_indices, best, axis=1)
+        self.differences[rows] = np.take_along_axis(merged_differences, best, axis=1)
+
+
+def run(store, k=TABLE_K, tile_size=TILE_SIZE, workers=None, checkpoint_path=None,
+        checkpoint_interval=CHECKPOINT_INTERVAL, log=sys.stderr):
+    vectors = np.ascontiguousarray(np.asarray(store.vectors, dtype=np.float32))
+    n = len(vectors)
+    k = min(k, n - 1)
+    starts = list(range(0, n, tile_size))
+    tiles = [(r, c) for r in starts for c in starts]
+    checkpoint = Checkpoint(checkpoint_path, store_fingerprint(store, tile_size, k), n, k, len(tiles))
+    if checkpoint.restore():
+        print('resuming {}: {} of {} tiles already done'.format(checkpoint_path, int(checkpoint.done.sum()), len(tiles)), file=log)
+    tile_number = {tile: i for i, tile in enumerate(tiles)}
+    tasks = [(r, c, tile_size, k) for (r, c), done in zip(tiles, checkpoint.done) if not done]
+
+    memory = shared_memory.SharedMemory(create=True, size=max(vectors.nbytes, 1))
+    try:
+        np.ndarray(vectors.shape, dtype=np.float32, buffer=memory.buf)[:] = vectors
+        started = last_save = time.time()
+        with Pool(workers or cpu_count(), initializer=attach, initargs=(memory.name, vectors.shape)) as pool:
+            for finished, (row_start, column_start, indices, differences) in enumerate(pool.imap_unordered(reduce_tile, tasks), 1):
+                checkpoint.merge(row_start, indices, differences)
+                checkpoint.done[tile_number[(row_start, column_start)]] = True
+                now = time.time()
+                if now - last_save >= checkpoint_interval:
+                    checkpoint.save()
+                    last_save = now
+                rate = finished / max(now - started, 1e-9)
+                print('\r{}/{} tiles, {:.1f} tiles/s, eta {:.0f}s'.format(
+                    int(checkpoint.done.sum()), len(tiles), rate, (len(tasks) - finished) / rate), end='', file=log)
+        print(file=log)
+        checkpoint.save()
+    finally:
+        memory.close()
+        memory.unlink()
+    return checkpoint.indices, checkpoint.differences
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='All-pairs top-k over an embedding store on a process pool.')
+    parser.add_argument('--store', required=True)
+    parser.add_argument('--table', required=True, help='gallery.py top-k table to write')
+    parser.add_argument('--out', help='also write the subject csvs and k-th match csv here')
+    parser.add_argument('--k', type=int, default=TABLE_K)
+    parser.add_argument('--tile-size', type=int, default=TILE_SIZE)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--checkpoint', help='checkpoint file, default: <table>.checkpoint.npz')
+    parser.add_argument('--checkpoint-interval', type=float, default=CHECKPOINT_INTERVAL)
+    args = parser.parse_args(argv)
+
+    store = EmbeddingStore.load(args.store)
+    checkpoint = args.checkpoint or os.path.splitext(args.table)[0] + '.checkpoint.npz'
+    indices, differences = run(store, args.k, args.tile_size, args.workers, checkpoint, args.checkpoint_interval)
+    vectors = np.asarray(store.vectors, dtype=np.float32)
+    table = TopKTable(store.files, vectors, store.files[indices].astype(object), differences)
+    table.save(args.table)
+    os.remove(checkpoint)
+    print('wrote top-{} lists for {} faces to {}'.format(table.k, len(store), args.table))
+    if args.out:
+        import gallery
+        gallery.main(['export', '--table', args.table, '--out', args.out])
+
+
+if __name__ == '__main__':
+    main()
@@ -1,21 +1,291 @@
+# first, so the startup report (startup.py) times the imports too
+import startup
+import json
+import os
+import threading
 import dash
 import dash_core_components as dcc
 import dash_html_components as html
-from dash.dependencies import Input, Output
-import pandas as pd
-import plotly.graph_objs as go
-import math
-import os
-import logging
-
-
-app = dash.Dash(__name__)
+from dash.dependencies import Input, Output, State, ALL
+from dash.dependencies import ClientsideFunction
+from flask import Response, jsonify, request, stream_with_context
+from plotly.utils import PlotlyJSONEncoder
+startup.mark('import dash')
+import prerender
+import singleflight
+import profiling
+import admin
+import memory
+import roc
+import sweep
+import bootstrap
+import calibration
+import export
+import api
+import groups
+import thresholds
+import scores
+from scores import ScoreRegistry
+startup.mark('import app modules')
+
+
+# ASSETS_FOLDER points the app at the output of optimize_assets.py
+app = dash.Dash(__name__, assets_folder=os.environ.get('ASSETS_FOLDER', 'assets'))
 app.title = 'Face ID Fail'
 server = app.server
+# profiles callbacks on demand (/admin/profile), inside the coalescing so waiters aren't traced
+profiler = profiling.install(app)
+# identical callback requests in flight at once share one computation
+singleflight.coalesce(app)
+startup.mark('dash app')
+
+# subjects offered in the radio buttons, in display order
+SUBJECT_OPTIONS = [
+    {'label': 'LeBron James', 'value': 'LeBron_James.csv'},
+    {'label': 'Lisa Leslie', 'value': 'Lisa_Leslie.csv'},
+    {'label': 'Paris Hilton', 'value': 'Paris_Hilton.csv'},
+    {'label': 'Jennifer Lopez', 'value': 'Jennifer_Lopez.csv'},
+    {'label': 'Aaron Peirsol', 'value': 'Aaron_Peirsol.csv'},
+    {'label': 'Jacqueline Edwards', 'value': 'Jacqueline_Edwards.csv'},
+    {'label': 'Kalpana Chawla', 'value': 'Kalpana_Chawla.csv'},
+    {'label': 'Jason Campbell', 'value': 'Jason_Campbell.csv'},
+    {'label': 'Katie Couric', 'value': 'Katie_Couric.csv'},
+    {'label': 'Vicki Zhao Wei', 'value': 'Vicki_Zhao_Wei.csv'}
+]
+# DATA_DIR points the app at a directory of subject csvs instead, e.g. from synthetic.py
+DATA_DIR = os.environ.get('DATA_DIR')
+if DATA_DIR:
+    SUBJECT_OPTIONS = scores.directory_options(DATA_DIR)
+
+# how many radio options on each side of the current subject get prefetched
+PREFETCH_NEIGHBOURS = 1
+# while dragging, the slider reaches the callbacks at most once per THROTTLE_MS (assets/throttle.js)
+THROTTLE_MS = 150
+
+
+# every subject csv, read once per worker
+registry = ScoreRegistry(SUBJECT_OPTIONS)
+startup.mark('score registry')
+
+
+def load_data(value):
+    return registry.frame(value)
+
+
+# green border for a true match at or above the threshold, faded below it
+def tile_style(similarity, match, threshold):
+    if threshold is None or similarity >= threshold:
+        if match:
+            return {"border":"10px #00ff00 solid"}
+        return {"border":"10px black solid"}
+    return {"border":"10px black solid", "opacity": "0.2"}
+
+
+# one result tile, pattern-matching ids so any number of them share the callbacks
+def tile(i, src, name, similarity, match, threshold, probability):
+    return html.Div([
+        html.Img(id={'type': 'tile-img', 'index': i}, src=src, style=tile_style(similarity, match, threshold)),
+        html.Figcaption(name),
+        html.Figcaption(str(round(similarity, 3))),
+        html.Figcaption('{:.0%} likely a match'.format(probability), className='probability')
+        ], id={'type': 'tile', 'index': i}, className='result')
+
+
+# error rates over every subject, fixed for the worker's lifetime; the slider only moves its marker
+roc_curve = roc.curve(registry)
+startup.mark('roc curve')
+# Difference -> calibrated match probability fitted on every subject's pairs, shown under each
+# tile and in the api; platt, since isotonic steps read as 0% / 100% off so few true matches
+CALIBRATION_METHOD = 'platt'
+match_probability = calibration.curve(registry, CALIBRATION_METHOD)
+startup.mark('calibration')
+# bootstrap intervals for the mismatch rates at the slider marks, computed off the request path
+SLIDER_MARKS = [round(0.1 * i, 1) for i in range(15)]
+bootstrap.precompute(registry, SLIDER_MARKS)
+startup.mark('bootstrap start')
+# false match / miss rates per demographic group (subjects.csv) at the slider marks; None for
+# a DATA_DIR without subjects.csv, and the group panel says so
+group_metadata = groups.load_metadata(os.path.join(DATA_DIR or '', groups.METADATA))
+group_rates = groups.rates(registry, group_metadata, SLIDER_MARKS) if group_metadata else None
+startup.mark('group rates')
+
+
+# mismatch % for every subject at each threshold, as the subjectN_mismatches callbacks show it:
+#   GET  /api/sweep?thresholds=0.5,0.9,1.2
+#   POST /api/sweep  {"thresholds": [0.5, 0.9, 1.2]}
+@server.route('/api/sweep', methods=['GET', 'POST'])
+def threshold_sweep():
+    try:
+        if request.method == 'POST':
+            values = (request.get_json(silent=True) or {}).get('thresholds', [])
+        else:
+            values = [v for v in request.args.get('thresholds', '').split(',') if v.strip()]
+        result = sweep.sweep(registry, [float(v) for v in values])
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(dict(result.to_json(), version=registry.version))
+
+
+# read-only json for dashboards, with ETags tied to the data version (If-None-Match -> 304):
+#   GET /api/subjects              the subjects and their candidate counts
+#   GET /api/subjects/<id>         one subject's candidates, operating thresholds and
+#                                  mismatch % at the slider marks; the id is the csv's file
+#                                  name (the radio value, less any DATA_DIR path)
+#   GET /api/thresholds            operating thresholds for every subject and pooled
+def threshold_summary(value):
+    row = thresholds.table(registry).loc[value]
+    return {name: api.finite(row[name]) for name in row.index if name != 'subject'}
+
+
+@server.route('/api/subjects')
+def api_subjects():
+    return api.conditional_json(registry.version, lambda: {
+        'version': registry.version,
+        'subjects': [{'id': registry.ids[i], 'value': value, 'label': label, 'candidates': int(registry.valid[i].sum()), 'impostors': int(registry.impostors[i])}
+                     for i, (value, label) in enumerate(zip(registry.values, registry.labels))]})
+
+
+# path: so a nested path gets this json 404, not the dash index page
+@server.route('/api/subjects/<path:subject_id>')
+def api_subject(subject_id):
+    i = registry.find(subject_id)
+    if i is None:
+        return jsonify({'error': 'unknown subject {!r}'.format(subject_id)}), 404
+    value = registry.values[i]
+
+    def build():
+        valid = registry.valid[i]
+        mismatches = sweep.sweep(registry, SLIDER_MARKS)
+        probability = match_probability(registry.difference[i, valid])
+        return {
+            'version': registry.version,
+            'id': subject_id,
+            'value': value,
+            'label': registry.labels[i],
+            'subject_file': registry.subject_files[i],
+            'candidates': [{'name': name, 'difference': api.finite(d), 'similarity': api.finite(s), 'file': f, 'match': bool(m),
+                            'match_probability': api.finite(p)}
+                           for name, d, s, f, m, p in zip(registry.names[i], registry.difference[i, valid], registry.similarity[i, valid],
+                                                          registry.files[i], registry.match[i, valid], probability)],
+            'calibration': CALIBRATION_METHOD,
+            'thresholds': threshold_summary(value),
+            'mismatches': {'thresholds': SLIDER_MARKS, 'percent': mismatches.mismatch_percent[:, i].tolist(),
+                           'finds_subject': mismatches.finds_subject[:, i].tolist()},
+        }
+    return api.conditional_json(registry.version, build)
+
+
+@server.route('/api/thresholds')
+def api_thresholds():
+    table = thresholds.table(registry)
+    return api.conditional_json(registry.version, lambda: {
+        'version': registry.version,
+        'subjects': [dict(threshold_summary(value), value=value, label=table.loc[value, 'subject']) for value in table.index]})
+
+
+# traced (sys.setprofile) profiles of the next N callback requests, as collapsed stacks per
+# callback (needs ADMIN_TOKEN); the count is shared by preloaded workers, the stacks are not:
+#   POST   /admin/profile?requests=20    arm
+#   GET    /admin/profile                what this worker has profiled so far
+#   DELETE /admin/profile                disarm, and forget this worker's stacks
+@server.route('/admin/profile', methods=['GET', 'POST', 'DELETE'])
+@admin.guarded
+def admin_profile():
+    if request.method == 'POST':
+        try:
+            profiler.arm(int(request.args.get('requests', 10)))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+    elif request.method == 'DELETE':
+        profiler.arm(0)
+        profiler.reset()
+    return jsonify(profiler.status())
+
+# what this worker holds, by structure (needs ADMIN_TOKEN); images aren't held, flask serves
+# them from disk
+def memory_structures():
+    return {
+        'registry.frames': registry.frames,
+        'registry arrays': [registry.similarity, registry.difference, registry.match, registry.valid, registry.impostors],
+        'registry names': [registry.names, registry.files, registry.subject_files],
+        'layout': app.layout,
+        'layout json': layout_json,
+        'index_string': app.index_string,
+        'roc_curve': roc_curve,
+        'group_rates': group_rates,
+        'bootstrap cache': bootstrap._intervals,
+        'api cache': api._bodies,
+        'roc cache': roc._curves,
+        'calibration cache': calibration._curves,
+        'thresholds cache': thresholds._tables,
+        'groups cache': groups._rates,
+        'profiler stacks': profiler.stacks,
+    }
+
+
+#   GET    /admin/memory                         process rss and the size of each structure
+#   POST   /admin/memory/snapshot?top=25         tracemalloc snapshot, diffed against the last
+#   DELETE /admin/memory/snapshot                stop tracing
+@server.route('/admin/memory')
+@admin.guarded
+def admin_memory():
+    return jsonify({'process': memory.process(), 'structures': memory.sizes(memory_structures()), 'tracemalloc': memory.tracing()})
+
+
+@server.route('/admin/memory/snapshot', methods=['POST', 'DELETE'])
+@admin.guarded
+def admin_memory_snapshot():
+    if request.method == 'DELETE':
+        memory.stop()
+        return jsonify(memory.tracing())
+    group_by = request.args.get('group_by', 'lineno')
+    if group_by not in ('lineno', 'filename', 'traceback'):
+        return jsonify({'error': 'group_by must be lineno, filename or traceback'}), 400
+    try:
+        top = int(request.args.get('top', memory.TOP))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(memory.snapshot(top, group_by))
+
+# where this worker's boot time went, by phase (needs ADMIN_TOKEN): GET /admin/startup
+@server.route('/admin/startup')
+@admin.guarded
+def admin_startup():
+    return jsonify(startup.report())
+
+
+# every subject's candidates judged at one threshold, streamed a subject at a time:
+#   GET /api/export?threshold=0.9&format=csv|ndjson
+@server.route('/api/export')
+def threshold_export():
+    export_format = request.args.get('format', 'csv')
+    try:
+        threshold = float(request.args.get('threshold', 0.0))
+        chunks = export.chunks(registry, threshold, export_format)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    filename = 'threshold_{:g}.{}'.format(threshold, export_format)
+    return Response(stream_with_context(chunks), mimetype=export.FORMATS[export_format],
+                    headers={'Content-Disposition': 'attachment; filename="{}"'.format(filename)})
+
+
+# image urls for the subjects next to `value` in the radio list, i.e. the likely next click
+def prefetch_urls(value):
+    values = [option['value'] for option in SUBJECT_OPTIONS]
+    if value not in values:
+        return []
+    i = values.index(value)
+    neighbours = values[max(i - PREFETCH_NEIGHBOURS, 0):i] + values[i + 1:i + 1 + PREFETCH_NEIGHBOURS]
+    urls = []
+    for neighbour in neighbours:
+        n = registry.position(neighbour)
+        urls.append(registry.subject_files[n])
+        urls.extend(registry.files[n])
+    return urls
 
 
 # introduction text
-app.layout = html.Div([
+intro = [
     html.Div([
         #html.H2("Face Mis-ID", id='title', style={'font-family': 'Monaco'}),
         #html.H4("***This beta version works best in Chrome***", style={'font-family': 'Monaco'}),
@@ -90,47 +360,45 @@ app.layout = html.Div([
              html.P("1c. What is the lowest threshold at which the software correctly identifies Jacqueline Edwards' face?"),
              html.P("2. Consider whether making facial recognition software more accurate for people of color would actually make the technology safe to use. More accurate facial recognition software could help policing and surveillance among communities of color, undocumented immigrants, and others. Do you think more accurate software has a place in our society?")
                  ]),
+]
 
 
-    # stores current subject data
-    html.Div([
-    html.Div(id='current_data_similarity', style={'display': 'none'}, children=[0.0,0.0,0.0,0.0,0.0,0.0,0.0,0.0]),
-    html.Div(id='current_data_names', style={'display': 'none'}, children=['','','','','','','','']),
-    html.Div(id='current_match_values', style={'display': 'none'}, children=[False,False,False,False,False,False,False,False]),
+# one mismatch line per subject, then the operating thresholds. With a large DATA_DIR (10k
+# subjects) building the lines is most of the layout phase, so they're added off the import
+# path by add_mismatch_lines(): warm() does it, or else the first layout request
+mismatches = html.Div([html.Div(id='threshold_summary')], id="mismatches")
+_mismatches_lock = threading.Lock()
+
+
+def add_mismatch_lines():
+    with _mismatches_lock:
+        if len(mismatches.children) == 1:
+            mismatches.children[:0] = [
+                html.Div(id='subject{}_mismatches'.format(i + 1), className = 'mismatches{}'.format(i + 1), style={'marginBottom': '.14em'})
+                for i in range(len(SUBJECT_OPTIONS))]
+
+
+# interactive subject, slider and results area; stores current subject data
+interactive = html.Div([
+    html.Div(id='current_data_similarity', style={'display': 'none'}, children=[]),
+    html.Div(id='current_data_names', style={'display': 'none'}, children=[]),
+    html.Div(id='current_match_values', style={'display': 'none'}, children=[]),
+    html.Div(id='prefetch_urls', style={'display': 'none'}, children=[]),
+    html.Div(id='prefetch_sink', style={'display': 'none'}),
+    html.Div(id='threshold', style={'display': 'none'}, children=0.0),
+    dcc.Interval(id='throttle-timer', interval=THROTTLE_MS, disabled=True),
 
 #    subject and radio button options to switch subject
     html.Div([
         html.H4("[Subject:] ", id = "current", style = {'font-weight': 'bold', 'font-family': 'Monaco'}),
 
         html.Img(id='celeb'), dcc.RadioItems(
-    options=[
-        {'label': 'LeBron James', 'value': 'LeBron_James.csv'},
-        {'label': 'Lisa Leslie', 'value': 'Lisa_Leslie.csv'},
-        {'label': 'Paris Hilton', 'value': 'Paris_Hilton.csv'},
-        {'label': 'Jennifer Lopez', 'value': 'Jennifer_Lopez.csv'},
-        {'label': 'Aaron Peirsol', 'value': 'Aaron_Peirsol.csv'},
-        {'label': 'Jacqueline Edwards', 'value': 'Jacqueline_Edwards.csv'},
-        {'label': 'Kalpana Chawla', 'value': 'Kalpana_Chawla.csv'},
-        {'label': 'Jason Campbell', 'value': 'Jason_Campbell.csv'},
-        {'label': 'Katie Couric', 'value': 'Katie_Couric.csv'},
-        {'label': 'Vicki Zhao Wei', 'value': 'Vicki_Zhao_Wei.csv'}
-    ],
-    value='LeBron_James.csv',
+    options=SUBJECT_OPTIONS,
+    value=SUBJECT_OPTIONS[0]['value'],
     labelStyle={'display': 'inline-block'},
     id = 'subject_options'
 ), html.Div(id="mismatch_title", className="mismatch_title"),
-html.Div([
-html.Div(id='subject1_mismatches', className = 'mismatches1', style={'marginBottom': '.14em'}),
-html.Div(id='subject2_mismatches', className = 'mismatches2', style={'marginBottom': '.14em'}),
-html.Div(id='subject3_mismatches', className = 'mismatches3', style={'marginBottom': '.14em'}),
-html.Div(id='subject4_mismatches', className = 'mismatches4', style={'marginBottom': '.14em'}),
-html.Div(id='subject5_mismatches', className = 'mismatches5', style={'marginBottom': '.14em'}),
-html.Div(id='subject6_mismatches', className = 'mismatches6', style={'marginBottom': '.14em'}),
-html.Div(id='subject7_mismatches', className = 'mismatches7', style={'marginBottom': '.14em'}),
-html.Div(id='subject8_mismatches', className = 'mismatches8', style={'marginBottom': '.14em'}),
-html.Div(id='subject9_mismatches', className = 'mismatches9', style={'marginBottom': '.14em'}),
-html.Div(id='subject10_mismatches', className = 'mismatches10', style={'marginBottom': '.14em'})
-], id="mismatches")],
+mismatches],
 id='subject'),
 
 
@@ -144,7 +412,8 @@ id='subject'),
             dcc.Slider(
             id='threshold-slider',
             min=-0.0,
-            value = 0.0
+            value = 0.0,
+            updatemode='drag'
         ),
         html.Div(
          id='slider-output-container', className = 'slider'
@@ -155,47 +424,28 @@ id='subject'),
             html.H4("[Matches:] ", style = {'font-weight': 'bold', 'font-family': 'Monaco'})
             ], id = 'matches')], id = 'slider'),
 
-        html.Div([
-        html.Div([
-            html.Img(id='img1'), html.Figcaption(id='name1'),
-            html.Figcaption(id='sim1')
-            ], id='result1', className='result1'),
+        html.Div(id='tiles', className = 'pics')], className = 'box'),
 
-        html.Div([
-            html.Img(id='img2'), html.Figcaption(id='name2'),
-            html.Figcaption(id='sim2')
-            ], id='result2', className = 'result2'),
-        html.Div([
-            html.Img(id='img3'), html.Figcaption(id='name3'),
-            html.Figcaption(id='sim3')
-            ], id='result3', className = 'result3'),
-        html.Div([
-            html.Img(id='img4'), html.Figcaption(id='name4'),
-            html.Figcaption(id='sim4')
-            ], id='result4', className = 'result4'),
-        html.Div([
-            html.Img(id='img5'), html.Figcaption(id='name5'),
-            html.Figcaption(id='sim5')
-            ], id='result5', className = 'result5'),
-        html.Div([
-            html.Img(id='img6'), html.Figcaption(id='name6'),
-            html.Figcaption(id='sim6')
-            ], id='result6', className = 'result6'),
-        html.Div([
-            html.Img(id='img7'), html.Figcaption(id='name7'),
-            html.Figcaption(id='sim7')
-            ], id='result7', className = 'result7'),
-        html.Div([
-            html.Img(id='img8'), html.Figcaption(id='name8'),
-            html.Figcaption(id='sim8')
-            ], id='result8', className = 'result8')], className = 'pics')], className = 'box')
-            ], id = "interactive"),
+    # ROC / DET over all subjects, marker follows the threshold slider (assets/roc.js)
+    html.Div([
+        html.H4("[Error Rates:] ", style = {'font-weight': 'bold', 'font-family': 'Monaco'}),
+        dcc.Graph(id='roc-graph', figure=roc.figure(roc_curve), config={'displayModeBar': False}),
+        html.Div(id='roc_points', style={'display': 'none'}, children=roc.points(roc_curve))
+        ], id = 'roc_panel'),
+
+    # the same error rates split by group, bars follow the threshold slider (assets/groups.js)
+    html.Div([
+        html.H4("[Error Rates by Group:] ", style = {'font-weight': 'bold', 'font-family': 'Monaco'}),
+        dcc.Graph(id='groups-graph', figure=groups.figure(group_rates), config={'displayModeBar': False}),
+        html.Div(id='group_points', style={'display': 'none'}, children=groups.points(group_rates))
+        ], id = 'groups_panel')
+            ], id = "interactive")
 
 # slider
 
 
 
-    html.Div([
+case_studies = html.Div([
 #      html.H3('Case Studies:'),
 #      html.Div([
 
@@ -211,9 +461,9 @@ id='subject'),
 #      dcc.Link('and read official Amazon guidelines here', href = 'https://docs.aws.amazon.com/rekognition/latest/dg/collections.html')
 
 
-    ], id = "case_studies"),
+    ], id = "case_studies")
 
-    html.Div([
+resources = html.Div([
 #      html.H3('Resources:'),
 #      html.Div([
 #      html.Span("Facial Recognition Model", style = {'font-weight': 'bold'}),
@@ -223,16 +473,40 @@ id='subject'),
 #      ": We obtained nearly of all our images from Labeled Faces in the Wild, an  open dataset of celebrity photos. For celebrity subjects who did not have more than one photo in the Labeled Faces in the Wild dataset, we supplemented with images from Google Image searches."
 #      ]),
     ], id = "resources")
-])
+
+startup.mark('layout')
+
+# static prose is rendered to html once at startup and served inside the index page,
+# so only the interactive area is shipped as a dash component tree
+PRERENDER_INTRO = os.environ.get('PRERENDER_INTRO', '1') != '0'
+if PRERENDER_INTRO:
+    app.index_string = prerender.index_with_static(app.index_string, prerender.render_html(intro))
+    app.layout = html.Div([interactive, case_studies, resources])
+else:
+    app.layout = html.Div(intro + [interactive, case_studies, resources])
+startup.mark('prerender')
+
+# the layout never changes, so it's serialized once (by warm(), or else the first page load)
+# and every page load is sent the same bytes instead of dash re-encoding the whole tree
+layout_json = []
+
+
+def serve_layout():
+    if not layout_json:
+        add_mismatch_lines()
+        layout_json.append(json.dumps(app.layout, cls=PlotlyJSONEncoder))
+    return Response(layout_json[0], mimetype='application/json')
+
+
+server.view_functions[app.config.routes_pathname_prefix + '_dash-layout'] = serve_layout
 
 #loads all images and slider with current subject
-@app.callback([Output('celeb', 'src'), Output('img1', 'src'), Output('img2', 'src'), Output('img3', 'src'), Output('img4', 'src'), Output('img5', 'src'),
-Output('img6', 'src'), Output('img7', 'src'), Output('img8', 'src'), Output('threshold-slider', 'max'), Output('threshold-slider', 'step'),
-Output('threshold-slider', 'marks'), Output('current_data_similarity', 'children'), Output('current_data_names', 'children'), Output('current_match_values', 'children')], [Input('subject_options', 'value')])
-def update_output(value):
+@app.callback([Output('celeb', 'src'), Output('tiles', 'children'), Output('threshold-slider', 'max'), Output('threshold-slider', 'step'),
+Output('threshold-slider', 'marks'), Output('current_data_similarity', 'children'), Output('current_data_names', 'children'), Output('current_match_values', 'children'),
+Output('prefetch_urls', 'children')], [Input('subject_options', 'value')], [State('threshold', 'children')])
+def update_output(value, threshold):
     print("updating output: ", value)
-    #data = load_data(value)
-    results = pd.read_csv(value)
+    results = load_data(value)
     print("updated value: ", value)
     #gather names
     names = results['Name']
@@ -263,118 +537,57 @@ def update_output(value):
     subject_image = results["Subject_File"][0]
     images = results["File"]
 
-    return [subject_image, images[0], images[1], images[2], images[3], images[4],
-        images[5], images[6], images[7], threshold_upper,
-        step, steps, similarity, names, matches]
-
-# threshold image 1
-@app.callback([Output('img1', 'style'), Output('name1', 'children'), Output('sim1', 'children')],
-    [Input('threshold-slider', 'value'), Input('current_data_similarity', 'children'), Input('current_data_names', 'children'), Input('current_match_values', 'children')])
-def update_output(threshold, similarity, names, match):
-    if similarity[0] >= threshold:
-        if match[0]:
-            return {"border":"10px #00ff00 solid"}, names[0], str(round(similarity[0], 3))
-        else:
-            return {"border":"10px black solid"}, names[0], str(round(similarity[0], 3))
-    else:
-        return {"border":"10px black solid", "opacity": "0.2"}, names[0], str(round(similarity[0], 3))
-
-#threshold image 2
-@app.callback([Output('img2', 'style'),Output('name2', 'children'), Output('sim2', 'children')],
-    [Input('threshold-slider', 'value'), Input('current_data_similarity', 'children'), Input('current_data_names', 'children'), Input('current_match_values', 'children')])
-def update_output(threshold, similarity, names, match):
-    if similarity[1] >= threshold:
-        if match[1]:
-            return {"border":"10px #00ff00 solid"}, names[1], str(round(similarity[1], 3))
-        else:
-            return {"border":"10px black solid"}, names[1], str(round(similarity[1], 3))
-    else:
-        return {"border":"10px black solid", "opacity": "0.2"}, names[1], str(round(similarity[1], 3))
-
-#threshold image 3
-@app.callback([Output('img3', 'style'),Output('name3', 'children'), Output('sim3', 'children')],
-    [Input('threshold-slider', 'value'), Input('current_data_similarity', 'children'), Input('current_data_names', 'children'), Input('current_match_values', 'children')])
-def update_output(threshold, similarity, names, match):
-    if similarity[2] >= threshold:
-        if match[2]:
-            return {"border":"10px #00ff00 solid"}, names[2], str(round(similarity[2], 3))
-        else:
-            return {"border":"10px black solid"}, names[2], str(round(similarity[2], 3))
-    else:
-        return {"border":"10px black solid", "opacity": "0.2"}, names[2], str(round(similarity[2], 3))
-
-#threshold image 4
-@app.callback([Output('img4', 'style'),Output('name4', 'children'), Output('sim4', 'children')],
-    [Input('threshold-slider', 'value'), Input('current_data_similarity', 'children'), Input('current_data_names', 'children'), Input('current_match_values', 'children')])
-def update_output(threshold, similarity, names, match):
-    if similarity[3] >= threshold:
-        if match[3]:
-            return {"border":"10px #00ff00 solid"}, names[3], str(round(similarity[3], 3))
-        else:
-            return {"border":"10px black solid"}, names[3], str(round(similarity[3], 3))
-    else:
-        return {"border":"10px black solid", "opacity": "0.2"}, names[3], str(round(similarity[3], 3))
-
-#threshold image 5
-@app.callback([Output('img5', 'style'),Output('name5', 'children'), Output('sim5', 'children')],
-    [Input('threshold-slider', 'value'), Input('current_data_similarity', 'children'), Input('current_data_names', 'children'), Input('current_match_values', 'children')])
-def update_output(threshold, similarity, names, match):
-    if similarity[4] >= threshold:
-        if match[4]:
-            return {"border":"10px #00ff00 solid"}, names[4], str(round(similarity[4], 3))
-        else:
-            return {"border":"10px black solid"}, names[4], str(round(similarity[4], 3))
-    else:
-        return {"border":"10px black solid", "opacity": "0.2"}, names[4], str(round(similarity[4], 3))
-
-#threshold image 6
-@app.callback([Output('img6', 'style'),Output('name6', 'children'), Output('sim6','children')],
-    [Input('threshold-slider', 'value'), Input('current_data_similarity', 'children'),
-    Input('current_data_names', 'children'), Input('current_match_values', 'children')])
-def update_output(threshold, similarity, names, match):
-    if similarity[5] >= threshold:
-        if match[5]:
-            return {"border":"10px #00ff00 solid"}, names[5], str(round(similarity[5], 3))
-        else:
-            return {"border":"10px black solid"}, names[5], str(round(similarity[5], 3))
-    else:
-        return {"border":"10px black solid", "opacity": "0.2"}, names[5], str(round(similarity[5], 3))
-
-#threshold image 7
-@app.callback([Output('img7', 'style'),Output('name7', 'children'), Output('sim7', 'children')],
-    [Input('threshold-slider', 'value'), Input('current_data_similarity', 'children'), Input('current_data_names', 'children'), Input('current_match_values', 'children')])
-def update_output(threshold, similarity, names, match):
-    if similarity[6] >= threshold:
-        if match[6]:
-            return {"border":"10px #00ff00 solid"}, names[6], str(round(similarity[6], 3))
-        else:
-            return {"border":"10px black solid"}, names[6], str(round(similarity[6], 3))
-    else:
-        return {"border":"10px black solid", "opacity": "0.2"}, names[6], str(round(similarity[6], 3))
-
-#threshold image 8
-@app.callback([Output('img8', 'style'),Output('name8', 'children'), Output('sim8', 'children')],
-    [Input('threshold-slider', 'value'), Input('current_data_similarity', 'children'), Input('current_data_names', 'children'), Input('current_match_values', 'children')])
-def update_output(threshold, similarity, names, match):
-    if similarity[7] >= threshold:
-        if match[7]:
-            return {"border":"10px #00ff00 solid"}, names[7], str(round(similarity[7], 3))
-        else:
-            return {"border":"10px black solid"}, names[7], str(round(similarity[7], 3))
-    else:
-        return {"border":"10px black solid", "opacity": "0.2"}, names[7], str(round(similarity[7], 3))
+    # one tile per candidate, however many the csv has
+    probability = match_probability(results['Difference'])
+    tiles = [tile(i, images[i], names[i], similarity[i], matches[i], threshold, probability[i]) for i in range(len(results))]
+
+    return [subject_image, tiles, threshold_upper,
+        step, steps, similarity, names, matches, prefetch_urls(value)]
+
+# hints the browser to fetch the neighbouring subjects' images at idle priority (assets/prefetch.js)
+app.clientside_callback(
+    ClientsideFunction(namespace='prefetch', function_name='hint'),
+    Output('prefetch_sink', 'children'),
+    [Input('prefetch_urls', 'children')])
+
+# throttles the slider into the `threshold` store every other callback listens to
+app.clientside_callback(
+    ClientsideFunction(namespace='throttle', function_name='threshold'),
+    [Output('threshold', 'children'), Output('throttle-timer', 'disabled')],
+    [Input('threshold-slider', 'value'), Input('throttle-timer', 'n_intervals')],
+    [State('throttle-timer', 'interval'), State('threshold', 'children')])
+
+# moves the ROC / DET markers to the slider's operating point without a server round trip
+app.clientside_callback(
+    ClientsideFunction(namespace='roc', function_name='marker'),
+    Output('roc-graph', 'figure'),
+    [Input('threshold', 'children')],
+    [dash.dependencies.State('roc-graph', 'figure'), dash.dependencies.State('roc_points', 'children')])
+
+# redraws the group bars at the slider's threshold, also without a round trip
+app.clientside_callback(
+    ClientsideFunction(namespace='groups', function_name='bars'),
+    Output('groups-graph', 'figure'),
+    [Input('threshold', 'children')],
+    [dash.dependencies.State('groups-graph', 'figure'), dash.dependencies.State('group_points', 'children')])
+
+# threshold borders for every tile in one request
+@app.callback(Output({'type': 'tile-img', 'index': ALL}, 'style'),
+    [Input('threshold', 'children'), Input('current_data_similarity', 'children'), Input('current_match_values', 'children')])
+def update_output(threshold, similarity, match):
+    return [tile_style(similarity[i], match[i], threshold) for i in range(len(similarity))]
 
 # threshold text
 @app.callback(
     dash.dependencies.Output('slider-output-container', 'children'),
-    [dash.dependencies.Input('threshold-slider', 'value')])
+    [Input('threshold', 'children')])
 def update_output(value):
     return 'The minimum similarity score you have selected for a match is: {}'.format(value)
 
 # threshold text
 @app.callback(
     dash.dependencies.Output('slider-output-container2', 'children'),
-    [Input('threshold-slider', 'value'), Input('current_data_similarity', 'children'), Input('current_data_names', 'children'), Input('current_match_values', 'children')])
+    [Input('threshold', 'children'), Input('current_data_similarity', 'children'), Input('current_data_names', 'children'), Input('current_match_values', 'children')])
 def update_output(threshold, similarity, names, match):
     num_match = 0
     for i in range(len(similarity)):
@@ -386,253 +599,63 @@ def update_output(threshold, similarity, names, match):
     else:
         return 'This threshold results in {} mismatches for the current subject.'.format(num_match)
 
-#mismatches LeBron James
+#mismatches for every subject, from the scores already in the registry
 @app.callback(
-    dash.dependencies.Output('subject1_mismatches', 'children'),
-    [Input('threshold-slider', 'value')])
+    [Output('subject{}_mismatches'.format(i + 1), 'children') for i in range(len(SUBJECT_OPTIONS))],
+    [Input('threshold', 'children')])
 def update_output(threshold):
-    num_match = 0
-    results1 = pd.read_csv('LeBron_James.csv')
-    matches = results1['Match']
-    similarity = results1['Similarity']
-    matches_subject = False
-    for i in range(len(similarity)):
-        if similarity[i] >= threshold:
-            if matches[i]==False:
-                num_match +=1
-            else:
-                matches_subject = True
-    num_match_percent = int(num_match/7 * 100)
-    if matches_subject==False and num_match==0:
-        return 'Fails to ID anyone'
-    elif num_match_percent==0:
-        return 'Correctly Matches'
-    else:
-        return '{}% mismatches'.format(num_match_percent)
+    return sweep.sweep(registry, [threshold]).messages()[0].tolist()
 
-
-#mismatches Lisa Leslie
+#threshhold mismatch title
 @app.callback(
-    dash.dependencies.Output('subject2_mismatches', 'children'),
-    [Input('threshold-slider', 'value')])
+    dash.dependencies.Output('mismatch_title', 'children'),
+    [Input('threshold', 'children')])
 def update_output(threshold):
-    num_match = 0
-    results1 = pd.read_csv('Lisa_Leslie.csv')
-    matches = results1['Match']
-    similarity = results1['Similarity']
-    matches_subject = False
-    for i in range(len(similarity)):
-        if similarity[i] >= threshold:
-            if matches[i]==False:
-                num_match +=1
-            else:
-                matches_subject = True
-    num_match_percent = int(num_match/7 * 100)
-    if matches_subject==False and num_match==0:
-        return 'Fails to ID anyone'
-    elif num_match_percent==0:
-        return 'Correctly Matches'
-    else:
-        return '{}% mismatches'.format(num_match_percent)
+    return '[At {} threshold:]'.format(threshold)
 
-#mismatches Paris Hilton
+#bootstrap interval for each subject's mismatches, shown on hover once it's been computed
 @app.callback(
-    dash.dependencies.Output('subject3_mismatches', 'children'),
-    [Input('threshold-slider', 'value')])
+    [Output('subject{}_mismatches'.format(i + 1), 'title') for i in range(len(SUBJECT_OPTIONS))],
+    [Input('threshold', 'children')])
 def update_output(threshold):
-    num_match = 0
-    results1 = pd.read_csv('Paris_Hilton.csv')
-    matches = results1['Match']
-    similarity = results1['Similarity']
-    matches_subject = False
-    for i in range(len(similarity)):
-        if similarity[i] >= threshold:
-            if matches[i]==False:
-                num_match +=1
-            else:
-                matches_subject = True
-    num_match_percent = int(num_match/7 * 100)
-    if matches_subject==False and num_match==0:
-        return 'Fails to ID anyone'
-    elif num_match_percent==0:
-        return 'Correctly Matches'
-    else:
-        return '{}% mismatches'.format(num_match_percent)
-
-#mismatches Jennifer_Lopez
+    intervals = bootstrap.cached(registry, SLIDER_MARKS)
+    if intervals is None:
+        return ['still estimating uncertainty'] * len(SUBJECT_OPTIONS)
+    t = intervals.at(threshold)
+    return ['{:.0%} of {} impostors, {:.0%} interval {:.0%} to {:.0%}'.format(
+        intervals.rate[t, s], registry.impostors[s], intervals.confidence, intervals.low[t, s], intervals.high[t, s])
+        for s in range(len(SUBJECT_OPTIONS))]
+
+#operating thresholds for the subject and for everyone, looked up from thresholds.table
 @app.callback(
-    dash.dependencies.Output('subject4_mismatches', 'children'),
-    [Input('threshold-slider', 'value')])
-def update_output(threshold):
-    num_match = 0
-    results1 = pd.read_csv('Jennifer_Lopez.csv')
-    matches = results1['Match']
-    similarity = results1['Similarity']
-    matches_subject = False
-    for i in range(len(similarity)):
-        if similarity[i] >= threshold:
-            if matches[i]==False:
-                num_match +=1
-            else:
-                matches_subject = True
-    num_match_percent = int(num_match/7 * 100)
-    if matches_subject==False and num_match==0:
-        return 'Fails to ID anyone'
-    elif num_match_percent==0:
-        return 'Correctly Matches'
-    else:
-        return '{}% mismatches'.format(num_match_percent)
+    Output('threshold_summary', 'children'),
+    [Input('subject_options', 'value')])
+def update_output(value):
+    # equal error rate / lowest-cost / highest finding thresholds per subject and pooled, built
+    # once per worker (by warm() below) and cached against the data version
+    table = thresholds.table(registry)
+    subject = table.loc[value]
+    pooled = table.loc['all']
+    return [html.P('[{}:] {}'.format(subject['subject'], thresholds.describe(subject))),
+            html.P('[{}:] {}'.format(pooled['subject'], thresholds.describe(pooled)))]
+startup.mark('callbacks')
+startup.done()
 
-#mismatches Aaron_Peirsol
-@app.callback(
-    dash.dependencies.Output('subject5_mismatches', 'children'),
-    [Input('threshold-slider', 'value')])
-def update_output(threshold):
-    num_match = 0
-    results1 = pd.read_csv('Aaron_Peirsol.csv')
-    matches = results1['Match']
-    similarity = results1['Similarity']
-    matches_subject = False
-    for i in range(len(similarity)):
-        if similarity[i] >= threshold:
-            if matches[i]==False:
-                num_match +=1
-            else:
-                matches_subject = True
-    num_match_percent = int(num_match/7 * 100)
-    if matches_subject==False and num_match==0:
-        return 'Fails to ID anyone'
-    elif num_match_percent==0:
-        return 'Correctly Matches'
-    else:
-        return '{}% mismatches'.format(num_match_percent)
 
-#mismatches Jacqueline_Edwards
-@app.callback(
-    dash.dependencies.Output('subject6_mismatches', 'children'),
-    [Input('threshold-slider', 'value')])
-def update_output(threshold):
-    num_match = 0
-    results1 = pd.read_csv('Jacqueline_Edwards.csv')
-    matches = results1['Match']
-    similarity = results1['Similarity']
-    matches_subject = False
-    for i in range(len(similarity)):
-        if similarity[i] >= threshold:
-            if matches[i]==False:
-                num_match +=1
-            else:
-                matches_subject = True
-    num_match_percent = int(num_match/7 * 100)
-    if matches_subject==False and num_match==0:
-        return 'Fails to ID anyone'
-    elif num_match_percent==0:
-        return 'Correctly Matches'
-    else:
-        return '{}% mismatches'.format(num_match_percent)
+# what the first page load would otherwise wait for, built off the request path like the
+# bootstrap intervals: pandas (imported with the first DataFrame), the operating threshold
+# table, the mismatch lines and the layout json. Calling it again waits for the thread to finish.
+_warm_lock = threading.Lock()
 
-#mismatches Kalpana_Chawla
-@app.callback(
-    dash.dependencies.Output('subject7_mismatches', 'children'),
-    [Input('threshold-slider', 'value')])
-def update_output(threshold):
-    num_match = 0
-    results1 = pd.read_csv('Kalpana_Chawla.csv')
-    matches = results1['Match']
-    similarity = results1['Similarity']
-    matches_subject = False
-    for i in range(len(similarity)):
-        if similarity[i] >= threshold:
-            if matches[i]==False:
-                num_match +=1
-            else:
-                matches_subject = True
-    num_match_percent = int(num_match/7 * 100)
-    if matches_subject==False and num_match==0:
-        return 'Fails to ID anyone'
-    elif num_match_percent==0:
-        return 'Correctly Matches'
-    else:
-        return '{}% mismatches'.format(num_match_percent)
 
-#mismatches Jason_Campbell
-@app.callback(
-    dash.dependencies.Output('subject8_mismatches', 'children'),
-    [Input('threshold-slider', 'value')])
-def update_output(threshold):
-    num_match = 0
-    results1 = pd.read_csv('Jason_Campbell.csv')
-    matches = results1['Match']
-    similarity = results1['Similarity']
-    matches_subject = False
-    for i in range(len(similarity)):
-        if similarity[i] >= threshold:
-            if matches[i]==False:
-                num_match +=1
-            else:
-                matches_subject = True
-    num_match_percent = int(num_match/7 * 100)
-    if matches_subject==False and num_match==0:
-        return 'Fails to ID anyone'
-    elif num_match_percent==0:
-        return 'Correctly Matches'
-    else:
-        return '{}% mismatches'.format(num_match_percent)
-    
-#mismatches Katie_Couric
-@app.callback(
-    dash.dependencies.Output('subject9_mismatches', 'children'),
-    [Input('threshold-slider', 'value')])
-def update_output(threshold):
-    num_match = 0
-    results1 = pd.read_csv('Katie_Couric.csv')
-    matches = results1['Match']
-    similarity = results1['Similarity']
-    matches_subject = False
-    for i in range(len(similarity)):
-        if similarity[i] >= threshold:
-            if matches[i]==False:
-                num_match +=1
-            else:
-                matches_subject = True
-    num_match_percent = int(num_match/7 * 100)
-    if matches_subject==False and num_match==0:
-        return 'Fails to ID anyone'
-    elif num_match_percent==0:
-        return 'Correctly Matches'
-    else:
-        return '{}% mismatches'.format(num_match_percent)
+def warm():
+    with _warm_lock:
+        load_data(SUBJECT_OPTIONS[0]['value'])
+        thresholds.table(registry)
+        serve_layout()
 
-#mismatches Vicki_Zhao_Wei
-@app.callback(
-    dash.dependencies.Output('subject10_mismatches', 'children'),
-    [Input('threshold-slider', 'value')])
-def update_output(threshold):
-    num_match = 0
-    results1 = pd.read_csv('Vicki_Zhao_Wei.csv')
-    matches = results1['Match']
-    similarity = results1['Similarity']
-    matches_subject = False
-    for i in range(len(similarity)):
-        if similarity[i] >= threshold:
-            if matches[i]==False:
-                num_match +=1
-            else:
-                matches_subject = True
-    num_match_percent = int(num_match/7 * 100)
-    if matches_subject==False and num_match==0:
-        return 'Fails to ID anyone'
-    elif num_match_percent==0:
-        return 'Correctly Matches'
-    else:
-        return '{}% mismatches'.format(num_match_percent)
 
-#threshhold mismatch title
-@app.callback(
-    dash.dependencies.Output('mismatch_title', 'children'),
-    [Input('threshold-slider', 'value')])
-def update_output(threshold):
-    return '[At {} threshold:]'.format(threshold)
+threading.Thread(target=warm, daemon=True).start()
 
 if __name__ == '__main__':
     port = os.environ.get('PORT') or 8035
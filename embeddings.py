@@ -0,0 +1,361 @@
+import argparse
+import os
+import re
+import numpy as np
+import pandas as pd
+
+
+# face embeddings keyed by asset filename, and the engine that turns them into the
+# per-subject csvs dash_skeleton.py reads (Name, Difference, Similarity, File, Subject, Subject_File, Match)
+#
+#   python embeddings.py --store embeddings.npy --subjects LeBron_James_0002.jpg Lisa_Leslie_0001.jpg --out .
+
+CSV_COLUMNS = ['Name', 'Difference', 'Similarity', 'File', 'Subject', 'Subject_File', 'Match']
+
+# the shipped csvs report Similarity = 1.5 - Difference
+SIMILARITY_OFFSET = 1.5
+
+# rows of the distance matrix computed per matrix multiplication; 512 x 50k float32 is ~100 MB
+BLOCK_SIZE = 512
+
+# candidates per subject csv, the number of tiles in the demo
+CANDIDATES = 8
+
+ASSETS_URL = '/assets/'
+
+# storage precisions for gallery vectors; int8 keeps one scale per dimension
+PRECISIONS = ('float32', 'float16', 'int8')
+
+# quantized gallery rows upcast to float32 per matrix multiplication, small enough to stay in cache
+GALLERY_BLOCK_SIZE = 4096
+
+
+# 'Jason_Campbell_0002.jpg' -> 'Jason Campbell'
+def person_name(filename):
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    return re.sub(r'_\d+$', '', stem).replace('_', ' ')
+
+
+# 'Jason Campbell' -> 'Jason_Campbell.csv', the value used in SUBJECT_OPTIONS
+def subject_csv_name(name):
+    return name.replace(' ', '_') + '.csv'
+
+
+class QuantizedVectors:
+
+    # float16 codes, or int8 codes with a per-dimension `scale` so that vector = codes * scale;
+    # indexing decodes the selected rows to float32
+    def __init__(self, codes, scale=None):
+        self.codes = np.ascontiguousarray(codes)
+        self.scale = None if scale is None else np.asarray(scale, dtype=np.float32)
+        self.precision = self.codes.dtype.name
+        self.shape = self.codes.shape
+        self._squared_norms = None
+
+    @classmethod
+    def encode(cls, vectors, precision):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if precision == 'float16':
+            return cls(vectors.astype(np.float16))
+        if precision == 'int8':
+            scale = np.abs(vectors).max(axis=0) / 127
+            scale[scale == 0] = 1
+            return cls(np.round(vectors / scale).astype(np.int8), scale)
+        raise ValueError('unknown precision {!r}, expected one of {}'.format(precision, PRECISIONS))
+
+    def __len__(self):
+        return len(self.codes)
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes + (0 if self.scale is None else self.scale.nbytes)
+
+    def __getitem__(self, rows):
+        block = self.codes[rows].astype(np.float32)
+        if self.scale is not None:
+            block *= self.scale
+        return block
+
+    def __array__(self, dtype=None, copy=None):
+        vectors = self[:]
+        return vectors if dtype is None else vectors.astype(dtype)
+
+    def squared_norms(self):
+        if self._squared_norms is None:
+            norms = np.empty(len(self), dtype=np.float32)
+            for start in range(0, len(self), GALLERY_BLOCK_SIZE):
+                block = self[start:start + GALLERY_BLOCK_SIZE]
+                norms[start:start + len(block)] = np.einsum('ij,ij->i', block, block)
+            self._squared_norms = norms
+        return self._squared_norms
+
+    # queries @ gallery.T computed from the codes a gallery block at a time; for int8 the
+    # scale is folded into the queries so the codes are only ever cast, never rescaled
+    def dot(self, queries):
+        if self.scale is not None:
+            queries = queries * self.scale
+        products = np.empty((len(queries), len(self)), dtype=np.float32)
+        for start in range(0, len(self), GALLERY_BLOCK_SIZE):
+            codes = self.codes[start:start + GALLERY_BLOCK_SIZE].astype(np.float32)
+            np.matmul(queries, codes.T, out=products[:, start:start + len(codes)])
+        return products
+
+
+class EmbeddingStore:
+
+    # a .npy file of a structured array with a 'file' and a 'vector' field (float32 or
+    # float16), or for int8 codes a .npz with 'files', 'codes' and 'scale'
+    def __init__(self, files, vectors, precision='float32'):
+        self.files = np.asarray(files, dtype=str)
+        if isinstance(vectors, QuantizedVectors):
+            self.vectors = vectors
+        elif precision == 'float32':
+            self.vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        else:
+            self.vectors = QuantizedVectors.encode(vectors, precision)
+        if len(self.files) != len(self.vectors):
+            raise ValueError('{} files but {} vectors'.format(len(self.files), len(self.vectors)))
+        self.names = np.array([person_name(f) for f in self.files])
+        self._index = {f: i for i, f in enumerate(self.files)}
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        if isinstance(data, np.lib.npyio.NpzFile):
+            return cls(data['files'], QuantizedVectors(data['codes'], data['scale']))
+        vectors = data['vector']
+        if vectors.dtype != np.float32:
+            vectors = QuantizedVectors(vectors)
+        return cls(data['file'], vectors)
+
+    def save(self, path):
+        if isinstance(self.vectors, QuantizedVectors) and self.vectors.scale is not None:
+            if not path.endswith('.npz'):
+                raise ValueError('int8 stores keep a scale array and have to be saved as .npz')
+            np.savez(path, files=self.files, codes=self.vectors.codes, scale=self.vectors.scale)
+            return
+        vectors = self.vectors.codes if isinstance(self.vectors, QuantizedVectors) else self.vectors
+        dtype = [('file', self.files.dtype), ('vector', vectors.dtype, (vectors.shape[1],))]
+        data = np.empty(len(self.files), dtype=dtype)
+        data['file'] = self.files
+        data['vector'] = vectors
+        np.save(path, data)
+
+    @property
+    def precision(self):
+        return self.vectors.precision if isinstance(self.vectors, QuantizedVectors) else 'float32'
+
+    # the same store with its vectors re-encoded at another precision
+    def quantized(self, precision):
+        return EmbeddingStore(self.files, np.asarray(self.vectors, dtype=np.float32), precision)
+
+    # this store with `other`'s faces added, kept at this store's precision: int8 codes keep
+    # their scale unless a new vector falls outside it, and then the whole store is re-encoded
+    def appended(self, other):
+        files = np.concatenate([self.files, other.files])
+        new = np.asarray(other.vectors, dtype=np.float32)
+        if not isinstance(self.vectors, QuantizedVectors):
+            return EmbeddingStore(files, np.concatenate([self.vectors, new]))
+        scale = self.vectors.scale
+        if scale is None:
+            return EmbeddingStore(files, QuantizedVectors(np.concatenate([self.vectors.codes, new.astype(np.float16)])))
+        codes = np.round(new / scale)
+        if np.abs(codes).max(initial=0) <= 127:
+            return EmbeddingStore(files, QuantizedVectors(np.concatenate([self.vectors.codes, codes.astype(np.int8)]), scale))
+        return EmbeddingStore(files, np.concatenate([np.asarray(self.vectors), new]), 'int8')
+
+    def __len__(self):
+        return len(self.files)
+
+    def index_of(self, filename):
+        try:
+            return self._index[os.path.basename(filename)]
+        except KeyError:
+            raise KeyError('{} is not in the embedding store'.format(filename))
+
+    def squared_norms(self):
+        if isinstance(self.vectors, QuantizedVectors):
+            return self.vectors.squared_norms()
+        return np.einsum('ij,ij->i', self.vectors, self.vectors)
+
+
+# squared L2 distances (what OpenFace's compare.py reports as the difference) between each
+# query and every gallery vector, yielded BLOCK_SIZE query rows at a time as (start, block);
+# the gallery can be a float32 array or QuantizedVectors
+def distance_blocks(queries, gallery, gallery_sq=None, block_size=BLOCK_SIZE):
+    queries = np.asarray(queries, dtype=np.float32)
+    quantized = isinstance(gallery, QuantizedVectors)
+    if not quantized:
+        gallery = np.asarray(gallery, dtype=np.float32)
+    if gallery_sq is None:
+        gallery_sq = gallery.squared_norms() if quantized else np.einsum('ij,ij->i', gallery, gallery)
+    for start in range(0, len(queries), block_size):
+        block = queries[start:start + block_size]
+        distances = gallery.dot(block) if quantized else block @ gallery.T
+        distances *= -2
+        distances += np.einsum('ij,ij->i', block, block)[:, None]
+        distances += gallery_sq[None, :]
+        # rounding can push identical vectors slightly below zero
+        np.maximum(distances, 0, out=distances)
+        yield start, distances
+
+
+def similarity(difference):
+    return SIMILARITY_OFFSET - difference
+
+
+def check_k(k):
+    if k < 1:
+        raise ValueError('k must be at least 1 (the nearest face), got {}'.format(k))
+
+
+# column indices of the k smallest distances in each row, closest first; argpartition
+# selects them in linear time so only k values per row are ever sorted
+def top_k_rows(distances, k):
+    check_k(k)
+    k = min(k, distances.shape[1])
+    if k < distances.shape[1]:
+        picked = np.argpartition(distances, k - 1, axis=1)[:, :k]
+    else:
+        picked = np.broadcast_to(np.arange(k), distances.shape).copy()
+    order = np.argsort(np.take_along_axis(distances, picked, axis=1), axis=1, kind='stable')
+    return np.take_along_axis(picked, order, axis=1)
+
+
+# one subject csv as a DataFrame, ordered like the shipped files: least similar first
+def subject_frame(store, subject_file, gallery_indices, differences):
+    order = np.argsort(-differences, kind='stable')
+    gallery_indices = gallery_indices[order]
+    differences = np.round(differences[order].astype(np.float64), 3)
+    subject = person_name(subject_file)
+    frame = pd.DataFrame({
+        'Name': store.names[gallery_indices],
+        'Difference': differences,
+        'Similarity': np.round(similarity(differences), 3),
+        'File': [ASSETS_URL + f for f in store.files[gallery_indices]],
+        'Subject': [subject] + [None] * (len(order) - 1),
+        'Subject_File': [ASSETS_URL + os.path.basename(subject_file)] + [None] * (len(order) - 1),
+        'Match': store.names[gallery_indices] == subject,
+    })
+    return frame[CSV_COLUMNS]
+
+
+def write_subject_csv(frame, path):
+    frame = frame.copy()
+    frame['Match'] = frame['Match'].map({True: 'TRUE', False: 'FALSE'})
+    frame.to_csv(path, index=False)
+
+
+# first image of every person in the store, the default subjects
+def default_subjects(store):
+    seen = set()
+    subjects = []
+    for f, name in zip(store.files, store.names):
+        if name not in seen:
+            seen.add(name)
+            subjects.append(f)
+    return subjects
+
+
+# (gallery indices, differences) of the k nearest gallery faces for each subject, closest first,
+# as two len(subjects) x k arrays; a subject's own image is never one of its candidates.
+# with an ann.IVFIndex built over the store the candidates come from the index instead of
+# a brute-force scan
+def top_k_many(store, subjects, k=CANDIDATES, block_size=BLOCK_SIZE, index=None, n_probe=None):
+    check_k(k)
+    if len(store) < 2:
+        raise ValueError('the store holds no faces besides the subject')
+    rows = np.array([store.index_of(s) for s in subjects], dtype=np.int64)
+    k = min(k, len(store) - 1)
+    if index is not None:
+        return approximate_top_k(store, rows, k, index, n_probe)
+    indices = np.empty((len(rows), k), dtype=np.int64)
+    differences = np.empty((len(rows), k), dtype=np.float32)
+    gallery_sq = store.squared_norms()
+    for start, distances in distance_blocks(store.vectors[rows], store.vectors, gallery_sq, block_size):
+        block_rows = rows[start:start + len(distances)]
+        distances[np.arange(len(block_rows)), block_rows] = np.inf
+        picked = top_k_rows(distances, k)
+        indices[start:start + len(picked)] = picked
+        differences[start:start + len(picked)] = np.take_along_axis(distances, picked, axis=1)
+    return indices, differences
+
+
+# the index pads rows with id -1 when the probed lists hold fewer than k + 1 vectors; those rows
+# are searched again with twice the lists probed until every subject has k real candidates
+# besides its own image (probing every list is exact search)
+def approximate_top_k(store, rows, k, index, n_probe=None):
+    from ann import DEFAULT_N_PROBE
+
+    n_probe = DEFAULT_N_PROBE if n_probe is None else n_probe
+    indices = np.empty((len(rows), k), dtype=np.int64)
+    differences = np.empty((len(rows), k), dtype=np.float32)
+    pending = np.arange(len(rows))
+    while len(pending):
+        # one extra neighbour, since the subject's own image is normally its nearest
+        found, distances = index.search(store.vectors[rows[pending]], k + 1, n_probe=n_probe)
+        real = (found >= 0) & (found != rows[pending, None])
+        done = real.sum(axis=1) >= k
+        for i in np.flatnonzero(done):
+            # closest first; the subject's own image and padding are skipped
+            keep = np.flatnonzero(real[i])[:k]
+            indices[pending[i]] = found[i, keep]
+            differences[pending[i]] = distances[i, keep]
+        pending = pending[~done]
+        if len(pending) and n_probe >= index.n_lists:
+            raise ValueError('the index holds fewer than {} vectors besides the subject'.format(k))
+        n_probe = min(2 * n_probe, index.n_lists)
+    return indices, differences
+
+
+# the k most similar gallery faces for one subject, in the subject csv schema
+def top_k(store, subject_file, k=CANDIDATES, index=None, n_probe=None):
+    indices, differences = top_k_many(store, [subject_file], k, index=index, n_probe=n_probe)
+    return subject_frame(store, subject_file, indices[0], differences[0])
+
+
+# compares every subject against the whole gallery and yields (subject_file, frame)
+def generate(store, subjects=None, candidates=CANDIDATES, block_size=BLOCK_SIZE, index=None, n_probe=None):
+    if subjects is None:
+        subjects = default_subjects(store)
+    for start in range(0, len(subjects), block_size):
+        chunk = subjects[start:start + block_size]
+        indices, differences = top_k_many(store, chunk, candidates, block_size, index, n_probe)
+        for i, subject_file in enumerate(chunk):
+            yield os.path.basename(subject_file), subject_frame(store, subject_file, indices[i], differences[i])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate subject csvs from an embedding store.')
+    parser.add_argument('--store', required=True, help='.npy structured array with file and vector fields')
+    parser.add_argument('--subjects', nargs='*', help='subject image filenames, default: first image of each person')
+    parser.add_argument('--candidates', type=int, default=CANDIDATES)
+    parser.add_argument('--block-size', type=int, default=BLOCK_SIZE)
+    parser.add_argument('--precision', choices=PRECISIONS, default=None,
+                        help='re-encode the store before comparing, see precision_report.py')
+    parser.add_argument('--index', help='ann.py index over the same store, for approximate candidates')
+    parser.add_argument('--n-probe', type=int, default=None)
+    parser.add_argument('--out', default='.')
+    args = parser.parse_args(argv)
+    try:
+        check_k(args.candidates)
+    except ValueError as e:
+        parser.error(str(e))
+
+    store = EmbeddingStore.load(args.store)
+    if args.precision and args.precision != store.precision:
+        store = store.quantized(args.precision)
+    index = None
+    if args.index:
+        from ann import IVFIndex
+        index = IVFIndex.load(args.index)
+    os.makedirs(args.out, exist_ok=True)
+    count = 0
+    for subject_file, frame in generate(store, args.subjects or None, args.candidates, args.block_size, index, args.n_probe):
+        write_subject_csv(frame, os.path.join(args.out, subject_csv_name(person_name(subject_file))))
+        count += 1
+    print('wrote {} subject csvs to {}'.format(count, args.out))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+import csv
+import io
+import json
+import numpy as np
+
+
+# every subject's candidates judged at one threshold, generated a subject at a time so an
+# export is never held in memory whole, however many subjects the registry has:
+#   Subject, Name, Similarity, Match, Above (Similarity >= threshold)
+
+COLUMNS = ['Subject', 'Name', 'Similarity', 'Match', 'Above']
+FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+
+# one list of rows per subject, in registry order, from the registry's arrays and name lists
+# (no DataFrames, so nothing per subject outlives its chunk)
+def subject_rows(registry, threshold):
+    for i in range(len(registry.values)):
+        valid = registry.valid[i]
+        similarity = registry.similarity[i, valid]
+        names = registry.names[i]
+        above = similarity >= threshold
+        yield [[registry.labels[i], name, round(float(s), 3), bool(m), bool(a)]
+               for name, s, m, a in zip(names, similarity, registry.match[i, valid], above)]
+
+
+def csv_chunks(registry, threshold):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(COLUMNS)
+    for rows in subject_rows(registry, threshold):
+        writer.writerows([row[:3] + [str(row[3]).upper(), str(row[4]).upper()] for row in rows])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def ndjson_chunks(registry, threshold):
+    for rows in subject_rows(registry, threshold):
+        yield ''.join(json.dumps(dict(zip(COLUMNS, row))) + '\n' for row in rows)
+
+
+def chunks(registry, threshold, export_format='csv'):
+    if export_format not in FORMATS:
+        raise ValueError('unknown export format {!r}, expected one of {}'.format(export_format, sorted(FORMATS)))
+    if not np.isfinite(threshold):
+        raise ValueError('threshold must be a finite number')
+    return csv_chunks(registry, threshold) if export_format == 'csv' else ndjson_chunks(registry, threshold)
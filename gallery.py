@@ -0,0 +1,173 @@
+import argparse
+import os
+import numpy as np
+import pandas as pd
+from embeddings import (CANDIDATES, EmbeddingStore, default_subjects, person_name,
+                        subject_csv_name, subject_frame, top_k_many, write_subject_csv)
+
+
+# every subject's stored top-K gallery list, kept current as faces are added one at a time
+# instead of rerunning the whole gallery x gallery comparison:
+#
+#   python gallery.py build --store embeddings.npy --table topk.npz --k 16
+#   python gallery.py insert --table topk.npz --new new_faces.npy --store embeddings.npy
+#   python gallery.py export --table topk.npz --out . --kth 11
+
+# stored neighbours per subject; has to cover the tiles plus the k-th non-match record
+TABLE_K = 16
+KTH = 11
+
+
+def ordinal(n):
+    if 10 <= n % 100 <= 20:
+        return '{}th'.format(n)
+    return '{}{}'.format(n, {1: 'st', 2: 'nd', 3: 'rd'}.get(n % 10, 'th'))
+
+
+class TopKTable:
+
+    # subjects x k arrays of gallery filenames and differences, closest first; unused
+    # slots hold '' and inf
+    def __init__(self, subjects, subject_vectors, files, differences):
+        self.subjects = np.asarray(subjects, dtype=str)
+        self.subject_vectors = np.ascontiguousarray(subject_vectors, dtype=np.float32)
+        self.subject_names = np.array([person_name(s) for s in self.subjects])
+        self.subject_sq = np.einsum('ij,ij->i', self.subject_vectors, self.subject_vectors)
+        self.files = np.asarray(files, dtype=object)
+        self.differences = np.ascontiguousarray(differences, dtype=np.float32)
+
+    @classmethod
+    def build(cls, store, subjects=None, k=TABLE_K):
+        if subjects is None:
+            subjects = default_subjects(store)
+        indices, differences = top_k_many(store, subjects, k)
+        rows = [store.index_of(s) for s in subjects]
+        return cls(store.files[rows], store.vectors[rows], store.files[indices].astype(object), differences)
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        return cls(data['subjects'], data['subject_vectors'], data['files'].astype(object), data['differences'])
+
+    def save(self, path):
+        np.savez(path, subjects=self.subjects, subject_vectors=self.subject_vectors,
+                 files=self.files.astype(str), differences=self.differences)
+
+    @property
+    def k(self):
+        return self.differences.shape[1]
+
+    # compares one new face with every subject in a single vectorized step and merges it
+    # into the lists it beats; returns the indices of the subjects whose list changed
+    def insert(self, filename, vector):
+        filename = os.path.basename(filename)
+        vector = np.asarray(vector, dtype=np.float32)
+        differences = self.subject_sq + vector @ vector - 2 * (self.subject_vectors @ vector)
+        np.maximum(differences, 0, out=differences)
+        differences[self.subjects == filename] = np.inf
+        rows = np.flatnonzero(differences < self.differences[:, -1])
+        if not len(rows):
+            return rows
+        # a face already in the gallery ties with itself, so it can only show up in these rows
+        if (self.files[rows] == filename).any():
+            raise ValueError('{} is already in the gallery'.format(filename))
+        merged = np.concatenate([self.differences[rows], differences[rows, None]], axis=1)
+        merged_files = np.concatenate([self.files[rows], np.full((len(rows), 1), filename, dtype=object)], axis=1)
+        order = np.argsort(merged, axis=1, kind='stable')[:, :self.k]
+        self.differences[rows] = np.take_along_axis(merged, order, axis=1)
+        self.files[rows] = np.take_along_axis(merged_files, order, axis=1)
+        return rows
+
+    # (file, difference) of the k-th nearest face that isn't the subject, for every subject;
+    # '' / inf where the stored list holds fewer than k non-matches
+    def kth_match(self, k=KTH, rows=None):
+        rows = np.arange(len(self.subjects)) if rows is None else np.asarray(rows)
+        names = np.vectorize(person_name, otypes=[object])(self.files[rows])
+        non_match = (names != self.subject_names[rows, None]) & np.isfinite(self.differences[rows])
+        rank = np.cumsum(non_match, axis=1)
+        hit = non_match & (rank == k)
+        found = hit.any(axis=1)
+        column = hit.argmax(axis=1)
+        files = np.where(found, self.files[rows, column], '')
+        differences = np.where(found, self.differences[rows, column], np.inf)
+        return files, differences
+
+    # the first row of every person, the rows that get a subject csv when the table covers
+    # several images per person (e.g. a full gallery x gallery run from compare_all.py)
+    def person_rows(self):
+        _, rows = np.unique(self.subject_names, return_index=True)
+        return np.sort(rows)
+
+    def kth_match_frame(self, k=KTH, rows=None):
+        rows = self.person_rows() if rows is None else rows
+        files, differences = self.kth_match(k, rows)
+        return pd.DataFrame({
+            'Subject': self.subject_names[rows],
+            '{} match'.format(ordinal(k)): [person_name(f) if f else '' for f in files],
+            'Dif score': np.round(differences.astype(np.float64), 3),
+        })
+
+    # the subject csv for one row of the table, in the schema dash_skeleton.py reads
+    def subject_frame(self, row, candidates=CANDIDATES):
+        filled = np.flatnonzero(self.files[row] != '')[:candidates]
+        gallery = GalleryNames(self.files[row, filled])
+        return subject_frame(gallery, self.subjects[row], np.arange(len(filled)), self.differences[row, filled])
+
+
+# the minimal store interface subject_frame needs, over a table row's filenames
+class GalleryNames:
+
+    def __init__(self, files):
+        self.files = np.asarray(files, dtype=str)
+        self.names = np.array([person_name(f) for f in self.files])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Maintain every subject\'s top-K gallery list incrementally.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build = commands.add_parser('build', help='compute the table from an embedding store')
+    build.add_argument('--store', required=True)
+    build.add_argument('--table', required=True)
+    build.add_argument('--subjects', nargs='*')
+    build.add_argument('--k', type=int, default=TABLE_K)
+
+    insert = commands.add_parser('insert', help='add new faces to the table (and optionally the store)')
+    insert.add_argument('--table', required=True)
+    insert.add_argument('--new', required=True, help='embedding store holding the faces to add')
+    insert.add_argument('--store', help='embedding store to append the new faces to, at its own precision')
+
+    export = commands.add_parser('export', help='write subject csvs and the k-th match csv')
+    export.add_argument('--table', required=True)
+    export.add_argument('--out', default='.')
+    export.add_argument('--candidates', type=int, default=CANDIDATES)
+    export.add_argument('--kth', type=int, default=KTH)
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        table = TopKTable.build(EmbeddingStore.load(args.store), args.subjects or None, args.k)
+        table.save(args.table)
+        print('wrote top-{} lists for {} subjects to {}'.format(table.k, len(table.subjects), args.table))
+    elif args.command == 'insert':
+        table = TopKTable.load(args.table)
+        new = EmbeddingStore.load(args.new)
+        changed = set()
+        for filename, vector in zip(new.files, new.vectors):
+            changed.update(table.insert(filename, vector).tolist())
+        table.save(args.table)
+        if args.store:
+            EmbeddingStore.load(args.store).appended(new).save(args.store)
+        print('inserted {} faces, {} subjects changed'.format(len(new), len(changed)))
+    else:
+        table = TopKTable.load(args.table)
+        os.makedirs(args.out, exist_ok=True)
+        rows = table.person_rows()
+        for row in rows:
+            write_subject_csv(table.subject_frame(row, args.candidates),
+                              os.path.join(args.out, subject_csv_name(table.subject_names[row])))
+        table.kth_match_frame(args.kth, rows).to_csv(os.path.join(args.out, '{}_match.csv'.format(ordinal(args.kth))), index=False)
+        print('wrote {} subject csvs to {}'.format(len(rows), args.out))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+import argparse
+import csv
+import os
+import numpy as np
+from sweep import at_or_above
+
+
+# false match and miss rates per demographic group. subjects.csv holds one row per subject
+# csv with its group attributes (perceived gender and a lighter / darker skin type split, as
+# in the Gender Shades audit); it's joined onto the ScoreRegistry by csv path. Each group's
+# rate pools the pairs of all its subjects: per-subject counts at every threshold come from
+# sweep.at_or_above and are summed into groups with one matrix product, so it's the same
+# cost for ten subjects or thousands. Cached per data version and grouping.
+#
+#   python groups.py --by Skin Gender
+
+METADATA = 'subjects.csv'
+GROUP_BY = ('Skin', 'Gender')
+UNKNOWN = 'unknown'
+
+_rates = {}
+
+
+# {csv path: row} with paths as the registry has them, i.e. relative to the metadata file's
+# directory; empty when there's no metadata file (a data directory of bare csvs)
+def load_metadata(path=METADATA):
+    if not os.path.exists(path):
+        return {}
+    with open(path, newline='') as f:
+        return {os.path.join(os.path.dirname(path), row['Csv']): row for row in csv.DictReader(f)}
+
+
+# a group label for every subject in the registry, e.g. 'darker female'; subjects or
+# attributes missing from the metadata are UNKNOWN
+def group_labels(registry, metadata, by=GROUP_BY):
+    return [' '.join(metadata.get(value, {}).get(column) or UNKNOWN for column in by) for value in registry.values]
+
+
+class GroupRates:
+
+    # thresholds ascending; false_match / miss are thresholds x groups
+    def __init__(self, thresholds, groups, subjects, false_match, miss):
+        self.thresholds = thresholds
+        self.groups = groups
+        self.subjects = subjects
+        self.false_match = false_match
+        self.miss = miss
+
+    def frame(self):
+        import pandas as pd
+        index = pd.Index(self.thresholds, name='threshold')
+        return pd.concat({'false_match': pd.DataFrame(self.false_match, index=index, columns=self.groups),
+                          'miss': pd.DataFrame(self.miss, index=index, columns=self.groups)}, axis=1)
+
+
+def compute(registry, labels, thresholds):
+    thresholds = np.sort(np.asarray(thresholds, dtype=float))
+    groups, codes = np.unique(np.asarray(labels, dtype=str), return_inverse=True)
+    membership = np.zeros((len(labels), len(groups)))
+    membership[np.arange(len(labels)), codes] = 1
+
+    impostors = registry.valid & ~registry.match
+    genuine = registry.valid & registry.match
+    false_matches = at_or_above(registry.similarity, impostors, thresholds).T @ membership
+    found = at_or_above(registry.similarity, genuine, thresholds).T @ membership
+    genuine_total = genuine.sum(axis=1) @ membership
+    with np.errstate(invalid='ignore', divide='ignore'):
+        false_match = false_matches / (impostors.sum(axis=1) @ membership)
+        miss = (genuine_total - found) / genuine_total
+    return GroupRates(thresholds, groups.tolist(), membership.sum(axis=0).astype(int), false_match, miss)
+
+
+def rates(registry, metadata, thresholds, by=GROUP_BY):
+    labels = group_labels(registry, metadata, by)
+    key = (registry.version, tuple(labels), tuple(np.round(thresholds, 6)))
+    if key not in _rates:
+        _rates[key] = compute(registry, labels, thresholds)
+    return _rates[key]
+
+
+# what the clientside callback needs to redraw the bars at the slider's threshold; None when
+# there are no groups, which assets/groups.js leaves alone
+def points(rates):
+    if rates is None:
+        return None
+    return {'thresholds': rates.thresholds.tolist(),
+            'false_match': np.round(np.nan_to_num(rates.false_match), 4).tolist(),
+            'miss': np.round(np.nan_to_num(rates.miss), 4).tolist()}
+
+
+# grouped bars of false match and miss rate per group, at one threshold; a plain figure dict,
+# like roc.figure. `rates` is None when there's no metadata to group by
+def figure(rates, threshold=0.0):
+    layout = {'yaxis': {'range': [0, 1.02], 'tickformat': '.0%'}, 'barmode': 'group', 'height': 320,
+              'margin': {'l': 60, 'r': 20, 't': 20, 'b': 60}, 'legend': {'orientation': 'h', 'y': 1.12},
+              'paper_bgcolor': 'black', 'plot_bgcolor': 'black', 'font': {'color': '#00ff00', 'family': 'Monaco'}}
+    if rates is None:
+        note = {'text': 'no group metadata ({}) for these subjects'.format(METADATA), 'showarrow': False,
+                'xref': 'paper', 'yref': 'paper', 'x': 0.5, 'y': 0.5}
+        return {'data': [], 'layout': dict(layout, annotations=[note], xaxis={'visible': False}, yaxis={'visible': False})}
+    t = int(np.abs(rates.thresholds - threshold).argmin())
+    names = ['{} ({})'.format(group, n) for group, n in zip(rates.groups, rates.subjects)]
+    data = [
+        {'type': 'bar', 'x': names, 'y': np.round(np.nan_to_num(rates.false_match[t]), 4).tolist(), 'name': 'false match rate',
+         'marker': {'color': '#00ff00'}},
+        {'type': 'bar', 'x': names, 'y': np.round(np.nan_to_num(rates.miss[t]), 4).tolist(), 'name': 'miss rate',
+         'marker': {'color': 'white'}},
+    ]
+    return {'data': data, 'layout': layout}
+
+
+def main(argv=None):
+    from dash_skeleton import registry
+
+    parser = argparse.ArgumentParser(description='False match and miss rates per demographic group.')
+    parser.add_argument('--metadata', default=METADATA)
+    parser.add_argument('--by', nargs='+', default=list(GROUP_BY))
+    parser.add_argument('--step', type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    metadata = load_metadata(args.metadata)
+    if not metadata:
+        parser.error('no metadata at {}'.format(args.metadata))
+    thresholds = np.round(np.arange(0, 1.4 + args.step / 2, args.step), 6)
+    result = rates(registry, metadata, thresholds, args.by)
+    print(result.frame().round(3).to_string())
+
+
+if __name__ == '__main__':
+    main()
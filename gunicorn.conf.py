@@ -0,0 +1,190 @@
+import gc
+import importlib.util
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+
+# gunicorn settings, sized to the machine it starts on. Gunicorn reads this file from the
+# working directory; every value can be overridden from the environment.
+#   workers    2 * cpus + 1, capped by how many WORKER_MEMORY_MB workers fit in the memory
+#              available (the cgroup limit on a dyno or container) beside the APP_MEMORY_MB
+#              they share; WEB_CONCURRENCY overrides
+#   threads    enough gthread threads per worker for REQUESTS_PER_CPU concurrent requests per
+#              cpu, so when memory caps the processes, threads take up the slack
+#   preload    the app (score registry, tables, layout json, bootstrap intervals) is built and
+#              warmed once in the master and shared with the workers copy-on-write
+#   recycling  workers restart after MAX_REQUESTS requests, +- jitter so they don't all restart
+#              at once; with preload a new worker is a fork of the warm master, not a cold boot
+#
+# Benchmark mode starts the app under each worker class in turn, runs loadtest.py's callback
+# mix against it and reports the throughput of each:
+#
+#   python gunicorn.conf.py --benchmark --seconds 20 --concurrency 8
+
+# the preloaded app, shared copy-on-write by every worker (~60 MB resident on the shipped
+# data), and what each worker adds on its own under load (~17 MB), both with headroom
+APP_MEMORY_MB = int(os.environ.get('APP_MEMORY_MB', 100))
+WORKER_MEMORY_MB = int(os.environ.get('WORKER_MEMORY_MB', 60))
+REQUESTS_PER_CPU = 4
+WORKER_CLASSES = ('sync', 'gthread', 'gevent')
+
+
+def cpus():
+    try:
+        count = len(os.sched_getaffinity(0))
+    except AttributeError:
+        count = os.cpu_count() or 1
+    # a cgroup v2 quota, e.g. '200000 100000' is two cpus
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+        if quota != 'max':
+            count = min(count, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return count
+
+
+def available_memory():
+    available = None
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    available = int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    # a container's limit less what it already uses (cgroup v2, then v1)
+    for limit, usage in (('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory.current'),
+                         ('/sys/fs/cgroup/memory/memory.limit_in_bytes', '/sys/fs/cgroup/memory/memory.usage_in_bytes')):
+        try:
+            with open(limit) as f, open(usage) as g:
+                remaining = int(f.read()) - int(g.read())
+        except (OSError, ValueError):
+            continue
+        available = remaining if available is None else min(available, remaining)
+        break
+    return available
+
+
+def sizing(cpu_count=None, memory=None, worker_class='gthread'):
+    cpu_count = cpu_count or cpus()
+    memory = available_memory() if memory is None else memory
+    workers = 2 * cpu_count + 1
+    if memory is not None:
+        workers = min(workers, max(1, (memory - (APP_MEMORY_MB << 20)) // (WORKER_MEMORY_MB << 20)))
+    if os.environ.get('WEB_CONCURRENCY'):
+        workers = int(os.environ['WEB_CONCURRENCY'])
+    threads = max(1, math.ceil(REQUESTS_PER_CPU * cpu_count / workers)) if worker_class == 'gthread' else 1
+    return workers, threads
+
+
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+workers, threads = sizing(worker_class=worker_class)
+threads = int(os.environ.get('GUNICORN_THREADS', threads))
+preload_app = True
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', max_requests // 10))
+# Heroku puts the port in PORT; gunicorn binds to it when no bind is given
+
+
+def on_starting(server):
+    server.log.info('%s workers x %s threads (%s), %s cpus, %s MB available, recycled every %s +- %s requests',
+                    workers, threads, worker_class, cpus(), (available_memory() or 0) >> 20, max_requests, max_requests_jitter)
+
+
+# runs in the master after the app is preloaded and before any worker is forked: everything
+# dash_skeleton builds lazily or on daemon threads is finished here, so workers inherit it
+# instead of each building its own; gc.freeze() then keeps the collector in the workers from
+# touching (and so copying) the shared objects
+def when_ready(server):
+    app = sys.modules.get('dash_skeleton')
+    if app is None:
+        return
+    start = time.perf_counter()
+    app.warm()
+    sys.modules['bootstrap'].intervals(app.registry, app.SLIDER_MARKS)
+    gc.freeze()
+    server.log.info('warmed the preloaded app in %.2fs', time.perf_counter() - start)
+
+
+# the app under one worker class on a free port, loaded with loadtest.py's mix
+def bench(worker_class, seconds, concurrency, port):
+    import loadtest
+
+    env = dict(os.environ, GUNICORN_WORKER_CLASS=worker_class, STARTUP_REPORT='0')
+    log = tempfile.TemporaryFile()
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', os.path.abspath(__file__), '-b', '127.0.0.1:{}'.format(port),
+                               '--log-level', 'warning', 'dash_skeleton:server'],
+                              cwd=os.path.dirname(os.path.abspath(__file__)), env=env, stdout=log, stderr=log)
+    base = 'http://127.0.0.1:{}'.format(port)
+    try:
+        deadline = time.perf_counter() + 60
+        while True:
+            if server.poll() is not None:
+                log.seek(0)
+                return {'error': (log.read().decode(errors='replace').strip().splitlines() or ['exited'])[-1]}
+            try:
+                session = loadtest.Session(loadtest.App(base))
+                if session.request('GET', '/')[0] == 200:
+                    break
+            except (OSError, ValueError):
+                pass
+            if time.perf_counter() > deadline:
+                return {'error': 'not ready after 60s'}
+            time.sleep(0.5)
+        result = loadtest.run(base, seconds, concurrency)
+        result.pop('callbacks')
+        return result
+    finally:
+        server.terminate()
+        server.wait()
+        log.close()
+
+
+def benchmark(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Compare gunicorn worker classes on the demo\'s callback mix.')
+    parser.add_argument('--benchmark', action='store_true')
+    parser.add_argument('--classes', nargs='+', default=list(WORKER_CLASSES), choices=WORKER_CLASSES)
+    parser.add_argument('--seconds', type=float, default=20)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--port', type=int, default=8091)
+    parser.add_argument('--out', help='also write the results here as json')
+    args = parser.parse_args(argv)
+
+    results = {}
+    for worker_class in args.classes:
+        if worker_class == 'gevent' and importlib.util.find_spec('gevent') is None:
+            results[worker_class] = {'error': 'gevent is not installed'}
+            continue
+        w, t = sizing(worker_class=worker_class)
+        results[worker_class] = dict(bench(worker_class, args.seconds, args.concurrency, args.port), workers=w, threads=t)
+
+    print('{:<8} {:>7} {:>7} {:>9} {:>9} {:>8} {:>8} {:>8} {:>7}'.format(
+        'class', 'workers', 'threads', 'req/s', 'events/s', 'p50 ms', 'p95 ms', 'p99 ms', 'errors'))
+    for worker_class, r in results.items():
+        if 'error' in r:
+            print('{:<8} {}'.format(worker_class, r['error']))
+            continue
+        print('{:<8} {:>7} {:>7} {:>9} {:>9} {:>8} {:>8} {:>8} {:>7}'.format(
+            worker_class, r['workers'], r['threads'], r['requests_per_second'], r['events_per_second'],
+            r['p50_ms'], r['p95_ms'], r['p99_ms'], r['errors']))
+    ran = {k: r for k, r in results.items() if 'error' not in r and not r['errors']}
+    if ran:
+        best = max(ran, key=lambda k: ran[k]['requests_per_second'])
+        print('best: {} (GUNICORN_WORKER_CLASS={})'.format(best, best))
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+# gunicorn execs this file as a config, never as __main__
+if __name__ == '__main__':
+    benchmark()
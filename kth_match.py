@@ -0,0 +1,124 @@
+import argparse
+import numpy as np
+import pandas as pd
+from embeddings import BLOCK_SIZE, EmbeddingStore, default_subjects, distance_blocks, person_name, top_k_rows
+from gallery import KTH, ordinal
+
+
+# the k-th nearest face that is NOT the subject, for every subject and any k, straight from
+# the embedding store; replaces the hand-curated assets/11th_match.csv:
+#
+#   python kth_match.py --store embeddings.npy --k 11 --out assets/11th_match.csv
+#   python kth_match.py --store embeddings.npy --curve 1 2 5 11 20 50 --out impostors.csv
+
+
+def check_k(k):
+    if k < 1:
+        raise ValueError('k must be at least 1 (the nearest impostor), got {}'.format(k))
+
+
+class KthMatchEngine:
+
+    # keeps each subject's nearest impostors sorted, K at a time, and answers any k <= K from
+    # them; asking for a larger k recomputes with at least twice as many
+    def __init__(self, store, subjects=None, block_size=BLOCK_SIZE):
+        self.store = store
+        self.subjects = list(subjects) if subjects is not None else default_subjects(store)
+        self.rows = np.array([store.index_of(s) for s in self.subjects], dtype=np.int64)
+        self.block_size = block_size
+        _, self.person_ids = np.unique(store.names, return_inverse=True)
+        # gallery indices grouped by person: person p owns by_person[offsets[p]:offsets[p + 1]]
+        self._by_person = np.argsort(self.person_ids, kind='stable')
+        self._person_offsets = np.searchsorted(self.person_ids[self._by_person], np.arange(self.person_ids.max() + 2))
+        self._indices = np.empty((len(self.rows), 0), dtype=np.int64)
+        self._differences = np.empty((len(self.rows), 0), dtype=np.float32)
+        self._frames = {}
+
+    @property
+    def depth(self):
+        return self._differences.shape[1]
+
+    # subjects x depth arrays of impostor gallery indices and differences, closest first;
+    # inf where the gallery has fewer impostors than depth
+    def impostors(self, depth):
+        check_k(depth)
+        if depth > len(self.store):
+            raise ValueError('k={} is larger than the gallery ({} faces)'.format(depth, len(self.store)))
+        if depth > self.depth:
+            self._compute(max(depth, 2 * self.depth))
+        return self._indices[:, :depth], self._differences[:, :depth]
+
+    def _compute(self, depth):
+        depth = min(depth, len(self.store))
+        indices = np.empty((len(self.rows), depth), dtype=np.int64)
+        differences = np.empty((len(self.rows), depth), dtype=np.float32)
+        gallery_sq = self.store.squared_norms()
+        queries = self.store.vectors[self.rows]
+        for start, distances in distance_blocks(queries, self.store.vectors, gallery_sq, self.block_size):
+            # every image of the subject's own person, including the subject image itself
+            distances[self.own_images(self.rows[start:start + len(distances)])] = np.inf
+            picked = top_k_rows(distances, depth)
+            indices[start:start + len(picked)] = picked
+            differences[start:start + len(picked)] = np.take_along_axis(distances, picked, axis=1)
+        self._indices, self._differences = indices, differences
+
+    # (block rows, gallery columns) of every image belonging to each row's own person
+    def own_images(self, rows):
+        people = self.person_ids[rows]
+        counts = self._person_offsets[people + 1] - self._person_offsets[people]
+        block_rows = np.repeat(np.arange(len(rows)), counts)
+        within = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        return block_rows, self._by_person[np.repeat(self._person_offsets[people], counts) + within]
+
+    # (gallery index, difference) of every subject's k-th nearest impostor; -1 / inf when the
+    # gallery holds fewer than k impostors
+    def kth(self, k=KTH):
+        check_k(k)
+        indices, differences = self.impostors(k)
+        index = np.where(np.isfinite(differences[:, k - 1]), indices[:, k - 1], -1)
+        return index, differences[:, k - 1]
+
+    # the 11th_match.csv record for any k: Subject, '<k>th match', Dif score
+    def frame(self, k=KTH):
+        if k not in self._frames:
+            index, differences = self.kth(k)
+            self._frames[k] = pd.DataFrame({
+                'Subject': [person_name(s) for s in self.subjects],
+                '{} match'.format(ordinal(k)): np.where(index >= 0, self.store.names[index], ''),
+                'Dif score': np.round(differences.astype(np.float64), 3),
+            })
+        return self._frames[k]
+
+    # the k-th impostor's difference for every subject and every k in `ks`, i.e. how quickly
+    # impostors close in on each subject
+    def curve(self, ks):
+        ks = np.asarray(ks, dtype=np.int64)
+        for k in ks:
+            check_k(k)
+        _, differences = self.impostors(int(ks.max()))
+        frame = pd.DataFrame(np.round(differences[:, ks - 1].astype(np.float64), 3),
+                             columns=[ordinal(k) for k in ks])
+        frame.insert(0, 'Subject', [person_name(s) for s in self.subjects])
+        return frame
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='k-th nearest non-matching face for every subject.')
+    parser.add_argument('--store', required=True)
+    parser.add_argument('--subjects', nargs='*', help='subject image filenames, default: first image of each person')
+    parser.add_argument('--k', type=int, default=KTH)
+    parser.add_argument('--curve', type=int, nargs='*', help='write the k-th impostor difference for each of these k instead')
+    parser.add_argument('--out', required=True)
+    args = parser.parse_args(argv)
+
+    engine = KthMatchEngine(EmbeddingStore.load(args.store), args.subjects or None)
+    try:
+        frame = engine.curve(args.curve) if args.curve else engine.frame(args.k)
+    except ValueError as e:
+        parser.error(str(e))
+    frame.to_csv(args.out, index=False)
+    print('wrote {} subjects to {}'.format(len(frame), args.out))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,260 @@
+import argparse
+import collections
+import http.client
+import json
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+# load generator for the demo's callback mix. Each simulated browser replays what the dash
+# renderer would send: it loads the page (index, layout, dependencies), then picks a subject or
+# moves the slider, POSTs every server-side callback that depends on the change with inputs and
+# state from its own copy of the page, applies the responses and follows the callbacks they
+# trigger in turn (a subject change refills the stores, which restyles the tiles). Clientside
+# callbacks never reach the server and are skipped. The mix is mostly slider moves, as with
+# real visitors.
+#
+#   python loadtest.py http://localhost:8035 --seconds 20 --concurrency 8
+
+MIX = {'threshold': 0.75, 'subject': 0.2, 'page': 0.05}
+SECONDS = 20
+CONCURRENCY = 8
+TIMEOUT = 30
+# callbacks triggered by callbacks, followed at most this deep
+CHAIN_DEPTH = 5
+
+
+def id_key(component_id):
+    if isinstance(component_id, dict):
+        return json.dumps(component_id, sort_keys=True, separators=(',', ':'))
+    return component_id
+
+
+# (id key, prop) -> value for every component with an id in a component tree
+def collect(tree, values, ids):
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(node)
+        elif isinstance(node, dict) and 'props' in node:
+            props = node['props']
+            if 'id' in props:
+                ids[id_key(props['id'])] = props['id']
+                for prop, value in props.items():
+                    values[(id_key(props['id']), prop)] = value
+            stack.append(props.get('children'))
+
+
+def parse_output(output):
+    outputs = output[2:-2].split('...') if output.startswith('..') else [output]
+    specs = []
+    for spec in outputs:
+        component_id, prop = spec.rsplit('.', 1)
+        specs.append({'id': json.loads(component_id) if component_id.startswith('{') else component_id, 'property': prop})
+    return specs, output.startswith('..')
+
+
+class Callback:
+
+    def __init__(self, dependency):
+        self.output = dependency['output']
+        self.outputs, self.multi = parse_output(self.output)
+        self.inputs = dependency['inputs']
+        self.state = dependency['state']
+        self.triggers = {(id_key(i['id']), i['property']) for i in self.inputs}
+        self.name = '{}.{}'.format(id_key(self.outputs[0]['id']), self.outputs[0]['property'])
+
+    # the outputs field: ALL wildcards are expanded to the matching ids on the page
+    def outputs_list(self, ids):
+        expanded = []
+        for spec in self.outputs:
+            if isinstance(spec['id'], dict) and ['ALL'] in spec['id'].values():
+                fixed = {k: v for k, v in spec['id'].items() if v != ['ALL']}
+                matches = sorted((i for i in ids.values() if isinstance(i, dict) and set(i) == set(spec['id'])
+                                  and all(i[k] == v for k, v in fixed.items())), key=id_key)
+                expanded.append([{'id': i, 'property': spec['property']} for i in matches])
+            else:
+                expanded.append(spec)
+        return expanded if self.multi else expanded[0]
+
+    def body(self, values, ids, changed):
+        def filled(items):
+            return [{'id': i['id'], 'property': i['property'], 'value': values.get((id_key(i['id']), i['property']))} for i in items]
+        return {'output': self.output, 'outputs': self.outputs_list(ids), 'inputs': filled(self.inputs),
+                'state': filled(self.state), 'changedPropIds': ['{}.{}'.format(*key) for key in changed if key in self.triggers]}
+
+
+# what every session shares: the page as first served and its server-side callbacks
+class App:
+
+    def __init__(self, base):
+        self.base = base
+        session = Session(self)
+        status, layout = session.request('GET', '/_dash-layout')
+        status, dependencies = session.request('GET', '/_dash-dependencies')
+        self.values, self.ids = {}, {}
+        collect(json.loads(layout), self.values, self.ids)
+        self.callbacks = [Callback(d) for d in json.loads(dependencies) if not d.get('clientside_function')]
+        self.subjects = [option['value'] for option in self.values.get(('subject_options', 'options'), [])]
+
+
+class Stats:
+
+    def __init__(self):
+        self.latencies = collections.defaultdict(list)
+        self.errors = collections.Counter()
+        self.events = collections.Counter()
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds, ok):
+        with self._lock:
+            self.latencies[name].append(seconds)
+            if not ok:
+                self.errors[name] += 1
+
+    def event(self, kind):
+        with self._lock:
+            self.events[kind] += 1
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else None
+
+
+# one simulated browser on its own keep-alive connection
+class Session:
+
+    def __init__(self, app, stats=None, seed=None):
+        self.app = app
+        self.stats = stats
+        self.random = random.Random(seed)
+        parts = urlsplit(app.base)
+        self.connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=TIMEOUT)
+        self.values = dict(getattr(app, 'values', {}))
+        self.ids = dict(getattr(app, 'ids', {}))
+        # ids of the components inside each prop a callback has set, replaced along with it
+        self.owned = {}
+
+    def request(self, method, path, body=None, name=None):
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        data = json.dumps(body) if body is not None else None
+        start = time.perf_counter()
+        # a failure is retried once on a fresh connection, as browsers do: the kept-alive one
+        # may have been closed by a worker recycling (max_requests) as the request went out
+        for attempt in range(2):
+            try:
+                self.connection.request(method, path, data, headers)
+                response = self.connection.getresponse()
+                status, payload = response.status, response.read()
+                break
+            except (OSError, http.client.HTTPException):
+                self.connection.close()
+                status, payload = None, b''
+        if self.stats is not None:
+            self.stats.add(name or path, time.perf_counter() - start, status in (200, 204))
+        return status, payload
+
+    # sets a prop as the user would, then runs the server callbacks that follow from it
+    def change(self, component_id, prop, value):
+        self.values[(component_id, prop)] = value
+        changed = {(component_id, prop)}
+        for _ in range(CHAIN_DEPTH):
+            if not changed:
+                break
+            fired = [callback for callback in self.app.callbacks if callback.triggers & changed]
+            bodies = [(callback, callback.body(self.values, self.ids, changed)) for callback in fired]
+            changed = set()
+            for callback, body in bodies:
+                status, payload = self.request('POST', '/_dash-update-component', body, callback.name)
+                if status == 200:
+                    changed |= self.apply(json.loads(payload))
+        return changed
+
+    def apply(self, payload):
+        changed = set()
+        for key, props in payload.get('response', {}).items():
+            for prop, value in props.items():
+                self.values[(key, prop)] = value
+                changed.add((key, prop))
+                for old in self.owned.pop((key, prop), ()):
+                    self.ids.pop(old, None)
+                ids = {}
+                collect(value, self.values, ids)
+                self.ids.update(ids)
+                self.owned[(key, prop)] = set(ids)
+        return changed
+
+    def page(self):
+        for path in ('/', '/_dash-layout', '/_dash-dependencies'):
+            self.request('GET', path)
+        self.values, self.ids, self.owned = dict(self.app.values), dict(self.app.ids), {}
+        self.change('subject_options', 'value', self.values.get(('subject_options', 'value')))
+        self.change('threshold', 'children', self.values.get(('threshold', 'children')))
+
+    def subject(self):
+        self.change('subject_options', 'value', self.random.choice(self.app.subjects))
+
+    def threshold(self):
+        top = self.values.get(('threshold-slider', 'max')) or 1.4
+        step = self.values.get(('threshold-slider', 'step')) or 0.01
+        self.change('threshold', 'children', round(self.random.randrange(int(round(top / step)) + 1) * step, 6))
+
+
+def run(base, seconds=SECONDS, concurrency=CONCURRENCY, mix=MIX, seed=0):
+    app = App(base)
+    stats = Stats()
+    kinds, weights = zip(*mix.items())
+    deadline = time.perf_counter() + seconds
+
+    def browse(i):
+        session = Session(app, stats, seed + i)
+        # every session starts on the page, then follows the mix
+        kind = 'page'
+        while time.perf_counter() < deadline:
+            getattr(session, kind)()
+            stats.event(kind)
+            kind = session.random.choices(kinds, weights)[0]
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=browse, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return report(stats, time.perf_counter() - start, concurrency)
+
+
+def report(stats, elapsed, concurrency):
+    everything = [s for latencies in stats.latencies.values() for s in latencies]
+    return {
+        'seconds': round(elapsed, 2), 'concurrency': concurrency,
+        'requests': len(everything), 'errors': sum(stats.errors.values()),
+        'requests_per_second': round(len(everything) / elapsed, 1),
+        'events_per_second': round(sum(stats.events.values()) / elapsed, 1),
+        'p50_ms': round(1000 * (percentile(everything, 0.5) or 0), 1),
+        'p95_ms': round(1000 * (percentile(everything, 0.95) or 0), 1),
+        'p99_ms': round(1000 * (percentile(everything, 0.99) or 0), 1),
+        'callbacks': {name: {'requests': len(latencies), 'errors': stats.errors[name],
+                             'p50_ms': round(1000 * percentile(latencies, 0.5), 1), 'p95_ms': round(1000 * percentile(latencies, 0.95), 1)}
+                      for name, latencies in sorted(stats.latencies.items())},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Replay the demo\'s callback mix against a running server.')
+    parser.add_argument('url', nargs='?', default='http://127.0.0.1:8035')
+    parser.add_argument('--seconds', type=float, default=SECONDS)
+    parser.add_argument('--concurrency', type=int, default=CONCURRENCY)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    result = run(args.url, args.seconds, args.concurrency, seed=args.seed)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
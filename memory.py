@@ -0,0 +1,126 @@
+import gc
+import os
+import sys
+import threading
+import tracemalloc
+import types
+import numpy as np
+
+
+# what a worker's memory goes on: deep byte sizes of the structures the app holds (score
+# registry, layout tree, precomputed tables, caches) and on-demand tracemalloc snapshots, each
+# diffed against the one before it, to find what grows between two points in time.
+#
+#   curl -H "X-Admin-Token: $ADMIN_TOKEN" localhost:8035/admin/memory
+#   curl -X POST -H "X-Admin-Token: $ADMIN_TOKEN" localhost:8035/admin/memory/snapshot
+#   ... exercise the app ...
+#   curl -X POST -H "X-Admin-Token: $ADMIN_TOKEN" localhost:8035/admin/memory/snapshot
+
+# frames kept per traced allocation; more makes tracebacks useful and tracing slower
+TRACE_FRAMES = 10
+TOP = 25
+
+_snapshots = []
+_taken = [0]
+_lock = threading.Lock()
+
+
+# bytes held by `obj` and everything it references, each object counted once; arrays and
+# frames report their buffers, which getsizeof alone misses
+def deep_size(obj, seen=None):
+    seen = set() if seen is None else seen
+    # pandas is imported lazily by the app; until it is there are no pandas objects to size
+    pd = sys.modules.get('pandas')
+    stack = [obj]
+    total = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, (type, types.ModuleType)):
+            continue
+        seen.add(id(obj))
+        if isinstance(obj, np.ndarray):
+            total += sys.getsizeof(obj) + (obj.nbytes if obj.base is None else 0)
+            if obj.base is not None:
+                stack.append(obj.base)
+            continue
+        if pd is not None and isinstance(obj, (pd.DataFrame, pd.Series, pd.Index)):
+            total += int(obj.memory_usage(deep=True).sum() if isinstance(obj, pd.DataFrame) else obj.memory_usage(deep=True))
+            continue
+        total += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        elif hasattr(obj, '__dict__') and not callable(obj):
+            stack.append(obj.__dict__)
+        elif hasattr(obj, '__slots__'):
+            stack.extend(getattr(obj, slot) for slot in obj.__slots__ if hasattr(obj, slot))
+    return total
+
+
+# {name: bytes} for each named structure, largest first
+def sizes(structures):
+    measured = {name: deep_size(obj) for name, obj in structures.items()}
+    return dict(sorted(measured.items(), key=lambda item: -item[1]))
+
+
+# resident set size now and at its peak, from /proc where there is one
+def process():
+    report = {'pid': os.getpid()}
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(('VmRSS:', 'VmHWM:')):
+                    key, value = line.split(':')
+                    report['rss' if key == 'VmRSS' else 'peak_rss'] = int(value.split()[0]) * 1024
+    except OSError:
+        import resource
+        report['peak_rss'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    report['gc_objects'] = len(gc.get_objects())
+    return report
+
+
+def tracing():
+    report = {'tracing': tracemalloc.is_tracing(), 'snapshots': _taken[0]}
+    if report['tracing']:
+        report['traced'], report['traced_peak'] = tracemalloc.get_traced_memory()
+    return report
+
+
+def statistic(stat):
+    frame = stat.traceback[0]
+    return {'file': '{}:{}'.format(frame.filename, frame.lineno), 'size': stat.size, 'count': stat.count,
+            'size_diff': getattr(stat, 'size_diff', None), 'count_diff': getattr(stat, 'count_diff', None)}
+
+
+# takes a snapshot (starting tracemalloc first if needed) and returns the top allocation sites,
+# diffed against the previous snapshot when there is one. Only allocations made after tracing
+# started are seen, so the first snapshot is mostly a baseline.
+def snapshot(top=TOP, group_by='lineno'):
+    with _lock:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACE_FRAMES)
+        current = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        ])
+        previous = _snapshots[-1] if _snapshots else None
+        # only the latest is kept, it's all the next diff needs
+        _snapshots[:] = [current]
+        _taken[0] += 1
+        if previous is None:
+            stats = current.statistics(group_by)[:top]
+        else:
+            stats = current.compare_to(previous, group_by)[:top]
+        return {'snapshot': _taken[0], 'diff': previous is not None,
+                'total': sum(stat.size for stat in current.statistics('filename')),
+                'top': [statistic(stat) for stat in stats]}
+
+
+# stops tracing and drops the snapshots, giving their memory back
+def stop():
+    with _lock:
+        _snapshots.clear()
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
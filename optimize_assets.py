@@ -0,0 +1,143 @@
+import argparse
+import io
+import os
+import shutil
+import sys
+
+
+# recompresses everything in assets/ into an output folder the app can serve instead:
+#   python optimize_assets.py --out build/assets --budget 1MB
+# then run the app with ASSETS_FOLDER=build/assets
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+FONT_EXTENSIONS = ('.ttf', '.otf')
+
+# written next to the converted fonts so `font-family: apercu` in header.css resolves to the woff2
+FONT_CSS = 'fonts.css'
+FONT_FAMILIES = {'apercu-light': 'apercu'}
+
+# in assets/ but never served by the page (a planning sketch, most of the folder's weight)
+EXCLUDE = ('csv_plan.jpeg',)
+
+
+def parse_size(text):
+    text = text.strip().upper()
+    for suffix, factor in (('MB', 1024 * 1024), ('KB', 1024), ('B', 1)):
+        if text.endswith(suffix):
+            return int(float(text[:-len(suffix)]) * factor)
+    return int(text)
+
+
+# re-encodes a jpeg/png without metadata, keeping the original quantization tables for jpegs
+def optimize_image(path, max_dimension=None):
+    from PIL import Image
+
+    image = Image.open(path)
+    image_format = image.format
+    resized = bool(max_dimension) and max(image.size) > max_dimension
+    if resized:
+        image = image.copy()
+        image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+    out = io.BytesIO()
+    if image_format == 'JPEG':
+        # 'keep' reuses the source quantization tables, which only applies to an unscaled image
+        quality = 85 if resized else 'keep'
+        image.save(out, 'JPEG', quality=quality, optimize=True, progressive=True)
+    else:
+        image.save(out, image_format, optimize=True)
+    return out.getvalue()
+
+
+def optimize_font(path):
+    from fontTools.ttLib import TTFont
+
+    font = TTFont(path)
+    font.flavor = 'woff2'
+    out = io.BytesIO()
+    font.save(out)
+    return out.getvalue()
+
+
+def font_face(family, filename):
+    return ("@font-face {\n"
+            "    font-family: %s;\n"
+            "    src: url('%s') format('woff2');\n"
+            "    font-display: swap;\n"
+            "}\n" % (family, filename))
+
+
+# writes the optimized copy of every file in `src` but `exclude` to `out`, returns
+# [(name, before, after)] with before None for files the build adds
+def build(src, out, max_dimension=None, exclude=EXCLUDE):
+    os.makedirs(out, exist_ok=True)
+    report = []
+    font_css = []
+    for name in sorted(os.listdir(src)):
+        path = os.path.join(src, name)
+        if not os.path.isfile(path) or name.startswith('.') or name in exclude:
+            continue
+        before = os.path.getsize(path)
+        stem, ext = os.path.splitext(name)
+        ext = ext.lower()
+        if ext in IMAGE_EXTENSIONS:
+            data = optimize_image(path, max_dimension)
+            if len(data) >= before:
+                shutil.copyfile(path, os.path.join(out, name))
+                report.append((name, before, before))
+                continue
+            target = name
+        elif ext in FONT_EXTENSIONS:
+            data = optimize_font(path)
+            target = stem + '.woff2'
+            font_css.append(font_face(FONT_FAMILIES.get(stem, stem), target))
+        else:
+            shutil.copyfile(path, os.path.join(out, name))
+            report.append((name, before, before))
+            continue
+        with open(os.path.join(out, target), 'wb') as f:
+            f.write(data)
+        report.append((target if target == name else '%s -> %s' % (name, target), before, len(data)))
+    if font_css:
+        css = '\n'.join(font_css)
+        with open(os.path.join(out, FONT_CSS), 'w') as f:
+            f.write(css)
+        report.append((FONT_CSS, None, len(css.encode('utf-8'))))
+    return report
+
+
+def print_report(report, budget):
+    width = max(len(name) for name, _, _ in report)
+    for name, before, after in report:
+        if before is None:
+            print('{:<{w}}  {:>10}  {:>10,}  new'.format(name, '', after, w=width))
+        else:
+            saved = 100 - after * 100 // before if before else 0
+            print('{:<{w}}  {:>10,}  {:>10,}  {:>3}%'.format(name, before, after, saved, w=width))
+    total_before = sum(before or 0 for _, before, _ in report)
+    total_after = sum(after for _, _, after in report)
+    print('{:<{w}}  {:>10,}  {:>10,}'.format('total', total_before, total_after, w=width))
+    print('budget {:,} bytes, {} by {:,} bytes'.format(
+        budget, 'under' if total_after <= budget else 'OVER', abs(budget - total_after)))
+    return total_after <= budget
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Recompress assets/ and check the page-weight budget.')
+    parser.add_argument('--src', default='assets')
+    parser.add_argument('--out', default=os.path.join('build', 'assets'))
+    parser.add_argument('--budget', default=os.environ.get('ASSET_BUDGET', '1MB'),
+                        help='maximum total bytes of the optimized assets, e.g. 1500000, 900KB, 1.5MB')
+    parser.add_argument('--exclude', nargs='*', default=list(EXCLUDE),
+                        help='files in --src to leave out of the output, default: %(default)s')
+    parser.add_argument('--max-dimension', type=int, default=None,
+                        help='downscale images whose longest side is larger than this (lossy)')
+    args = parser.parse_args(argv)
+
+    report = build(args.src, args.out, args.max_dimension, args.exclude)
+    if not print_report(report, parse_size(args.budget)):
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,80 @@
+import argparse
+import numpy as np
+from embeddings import CANDIDATES, PRECISIONS, EmbeddingStore, default_subjects, similarity, top_k_many
+
+
+# how far quantized gallery storage moves the numbers the demo shows:
+#
+#   python precision_report.py --store embeddings.npy
+#   python precision_report.py --synthetic 20000
+#
+# for every precision it reports gallery RAM, the Similarity error on each subject's
+# full-precision candidates, how many candidate lists change, and how many match
+# decisions (Similarity >= threshold) flip at each threshold-slider mark
+
+# the threshold-slider marks, 0 to 1.4
+THRESHOLDS = np.round(np.arange(15) * 0.1, 1)
+
+
+def pair_similarities(store, rows, candidates):
+    subjects = store.vectors[rows]
+    differences = np.empty(candidates.shape, dtype=np.float32)
+    for column in range(candidates.shape[1]):
+        delta = subjects - store.vectors[candidates[:, column]]
+        differences[:, column] = np.einsum('ij,ij->i', delta, delta)
+    return similarity(np.round(differences.astype(np.float64), 3))
+
+
+def compare(store, subjects, precision, k=CANDIDATES, thresholds=THRESHOLDS):
+    rows = np.array([store.index_of(s) for s in subjects])
+    full_indices, _ = top_k_many(store, subjects, k)
+    quantized = store.quantized(precision)
+    indices, _ = top_k_many(quantized, subjects, k)
+    full = pair_similarities(store, rows, full_indices)
+    approximate = pair_similarities(quantized, rows, full_indices)
+    error = np.abs(approximate - full)
+    return {
+        'precision': precision,
+        'bytes': quantized.vectors.nbytes,
+        'max_error': float(error.max()),
+        'mean_error': float(error.mean()),
+        'changed_lists': int((np.sort(indices, axis=1) != np.sort(full_indices, axis=1)).any(axis=1).sum()),
+        'flips': [int(((full >= t) != (approximate >= t)).sum()) for t in thresholds],
+    }
+
+
+def print_report(store, subjects, results, thresholds=THRESHOLDS):
+    float64_bytes = store.vectors.size * 8
+    print('{} gallery faces x {} dims, {} subjects'.format(len(store), store.vectors.shape[1], len(subjects)))
+    print('{:<9} {:>12} {:>6} {:>10} {:>10} {:>14}'.format('precision', 'bytes', 'vs f64', 'max |dSim|', 'mean', 'changed lists'))
+    print('{:<9} {:>12,} {:>5.1f}x'.format('float64', float64_bytes, 1))
+    for r in results:
+        print('{:<9} {:>12,} {:>5.1f}x {:>10.4f} {:>10.5f} {:>14,}'.format(
+            r['precision'], r['bytes'], float64_bytes / r['bytes'], r['max_error'], r['mean_error'], r['changed_lists']))
+    pairs = len(subjects) * CANDIDATES
+    print('\nmatch decisions flipped out of {:,} subject/candidate pairs'.format(pairs))
+    print('{:<9} '.format('threshold') + ' '.join('{:>9}'.format(r['precision']) for r in results))
+    for i, t in enumerate(thresholds):
+        print('{:<9} '.format(t) + ' '.join('{:>9,}'.format(r['flips'][i]) for r in results))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare quantized embedding storage against full precision.')
+    parser.add_argument('--store', help='float32 embedding store')
+    parser.add_argument('--synthetic', type=int, default=20000, help='gallery size when no --store is given')
+    parser.add_argument('--subjects', type=int, default=1000, help='subjects sampled for the comparison')
+    args = parser.parse_args(argv)
+
+    if args.store:
+        store = EmbeddingStore.load(args.store).quantized('float32')
+    else:
+        from ann import synthetic_embeddings
+        vectors = synthetic_embeddings(args.synthetic)
+        store = EmbeddingStore(['face{}_0001.jpg'.format(i) for i in range(len(vectors))], vectors)
+    subjects = default_subjects(store)[:args.subjects]
+    results = [compare(store, subjects, p) for p in PRECISIONS]
+    print_report(store, subjects, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+import html as htmlescape
+import re
+from dash.development.base_component import Component
+
+
+# renders static dash_html_components trees to plain html strings, so prose that never
+# changes can be served inside the index page instead of being built by the renderer
+
+# props that only matter to the dash renderer, never written as attributes
+SKIPPED_PROPS = {'children', 'style', 'className', 'key', 'loading_state', 'n_clicks', 'n_clicks_timestamp'}
+VOID_TAGS = {'img', 'br', 'hr', 'meta', 'link', 'col', 'wbr'}
+
+
+def style_to_css(style):
+    declarations = []
+    for key, value in style.items():
+        # dash accepts both 'font-weight' and 'fontWeight'
+        key = re.sub(r'([A-Z])', lambda m: '-' + m.group(1).lower(), key)
+        declarations.append('{}: {}'.format(key, value))
+    return '; '.join(declarations)
+
+
+def render_attributes(component):
+    attributes = []
+    for prop in component._prop_names:
+        if prop in SKIPPED_PROPS:
+            continue
+        value = getattr(component, prop, None)
+        if value is None or value is False:
+            continue
+        if value is True:
+            attributes.append(prop)
+        else:
+            attributes.append('{}="{}"'.format(prop, htmlescape.escape(str(value), quote=True)))
+    class_name = getattr(component, 'className', None)
+    if class_name:
+        attributes.append('class="{}"'.format(htmlescape.escape(class_name, quote=True)))
+    style = getattr(component, 'style', None)
+    if style:
+        attributes.append('style="{}"'.format(htmlescape.escape(style_to_css(style), quote=True)))
+    return ''.join(' ' + attribute for attribute in attributes)
+
+
+def render_html(node):
+    if node is None:
+        return ''
+    if isinstance(node, (list, tuple)):
+        return ''.join(render_html(child) for child in node)
+    if isinstance(node, (str, int, float)):
+        return htmlescape.escape(str(node), quote=False)
+    if not isinstance(node, Component) or node._namespace != 'dash_html_components':
+        raise ValueError('only static dash_html_components can be prerendered, got {!r}'.format(node))
+    tag = node._type.lower()
+    if tag in VOID_TAGS:
+        return '<{}{}>'.format(tag, render_attributes(node))
+    return '<{0}{1}>{2}</{0}>'.format(tag, render_attributes(node), render_html(getattr(node, 'children', None)))
+
+
+# puts the prerendered markup ahead of the react entry point, so it paints before any script runs
+def index_with_static(index_string, static_html):
+    return index_string.replace('{%app_entry%}', '<div id="static">' + static_html + '</div>\n        {%app_entry%}', 1)
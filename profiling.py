@@ -0,0 +1,167 @@
+import collections
+import multiprocessing
+import os
+import re
+import sys
+import threading
+import time
+from flask import request
+
+
+# on-demand profiler for dash callbacks. arm(n) profiles the next n requests to
+# _dash-update-component with a sys.setprofile hook (the one cProfile uses), but instead of
+# per-function totals it keeps whole stacks: every microsecond of self time is charged to the
+# stack it was spent in. That works for callbacks far shorter than a sampling interval.
+# Stacks are kept per callback (the request's output id) and written as collapsed stacks,
+# one `frame;frame;frame microseconds` line each, to PROFILE_DIR/<callback>.<pid>.collapsed,
+# ready for flamegraph.pl or speedscope. The hook is only set on the thread running a
+# profiled request; when nothing is armed, the cost per request is reading one integer.
+#
+# The armed count lives in shared memory created at import, so with a preloaded app (as
+# gunicorn.conf.py sets) the workers forked from it share it: arming N profiles the next N
+# requests whichever workers take them. Stacks stay per worker, hence the pid in the file
+# name; GET /admin/profile reports the worker that answers it.
+#
+#   curl -X POST -H "X-Admin-Token: $ADMIN_TOKEN" localhost:8035/admin/profile?requests=20
+#   cat profiles/mismatch_title.children.*.collapsed | flamegraph.pl --countname us > mismatch_title.svg
+
+PROFILE_DIR = os.environ.get('PROFILE_DIR', 'profiles')
+
+
+def frame_name(frame):
+    code = frame.f_code
+    return '{} ({}:{})'.format(code.co_name, os.path.basename(code.co_filename), code.co_firstlineno)
+
+
+def builtin_name(function):
+    module = getattr(function, '__module__', None) or ''
+    return '{}.{}'.format(module, getattr(function, '__qualname__', repr(function))).lstrip('.')
+
+
+class Tracer:
+
+    def __init__(self, root):
+        self.stack = [root]
+        self.stacks = collections.Counter()
+        self._last = None
+
+    def _charge(self):
+        now = time.perf_counter_ns()
+        self.stacks[tuple(self.stack)] += (now - self._last) // 1000
+        self._last = now
+
+    def _event(self, frame, event, arg):
+        self._charge()
+        if event == 'call':
+            self.stack.append(frame_name(frame))
+        elif event == 'c_call':
+            self.stack.append(builtin_name(arg))
+        # returns from frames entered before tracing started leave the root in place
+        elif len(self.stack) > 1:
+            self.stack.pop()
+
+    def __enter__(self):
+        self._last = time.perf_counter_ns()
+        sys.setprofile(self._event)
+        return self
+
+    def __exit__(self, *exc):
+        sys.setprofile(None)
+        self._charge()
+
+    # collapsed lines, heaviest first, zero-time stacks dropped
+    def collapsed(self):
+        return collections.Counter({';'.join(stack): us for stack, us in self.stacks.items() if us})
+
+
+class Profiler:
+
+    def __init__(self, directory=PROFILE_DIR):
+        self.directory = directory
+        # shared with forked workers, see above
+        self._remaining = multiprocessing.Value('i', 0)
+        self.stacks = collections.defaultdict(collections.Counter)
+        self.requests = collections.Counter()
+        self.seconds = collections.Counter()
+        self._lock = threading.Lock()
+
+    @property
+    def remaining(self):
+        return self._remaining.value
+
+    def arm(self, n):
+        with self._remaining.get_lock():
+            self._remaining.value = max(0, int(n))
+
+    # True for the requests that should be profiled, counting down the armed budget
+    def take(self):
+        if not self._remaining.value:
+            return False
+        with self._remaining.get_lock():
+            if not self._remaining.value:
+                return False
+            self._remaining.value -= 1
+            return True
+
+    def run(self, name, fn):
+        tracer = Tracer(filename(name))
+        start = time.perf_counter()
+        try:
+            with tracer:
+                return fn()
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.stacks[name].update(tracer.collapsed())
+                self.requests[name] += 1
+                self.seconds[name] += elapsed
+                self._write(name)
+
+    def _write(self, name):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, self.file(name))
+        with open(path + '.tmp', 'w') as f:
+            for stack, count in self.stacks[name].most_common():
+                f.write('{} {}\n'.format(stack, count))
+        os.replace(path + '.tmp', path)
+
+    def file(self, name):
+        return '{}.{}.collapsed'.format(filename(name), os.getpid())
+
+    def status(self):
+        with self._lock:
+            return {'remaining': self.remaining, 'pid': os.getpid(), 'directory': self.directory,
+                    'callbacks': {filename(name): {'requests': self.requests[name], 'seconds': round(self.seconds[name], 4),
+                                         'traced_us': sum(self.stacks[name].values()),
+                                         'file': self.file(name)} for name in self.requests}}
+
+    def reset(self):
+        with self._lock:
+            self.stacks.clear()
+            self.requests.clear()
+            self.seconds.clear()
+
+
+# multi-output callbacks are named by their first output, '..a.children...b.children..' ->
+# 'a.children+1'; pattern-matching ids are json, so anything odd becomes '_'
+def filename(name):
+    outputs = [o for o in name.strip('.').split('...') if o]
+    name = outputs[0] + ('+{}'.format(len(outputs) - 1) if len(outputs) > 1 else '') if outputs else ''
+    return re.sub(r'[^A-Za-z0-9_.+-]+', '_', name).strip('._')[:120] or 'callback'
+
+
+# wraps the app's _dash-update-component view; install before anything that should stay
+# outside the profile (singleflight.coalesce, so waiters aren't traced)
+def install(app, profiler=None):
+    profiler = profiler or Profiler()
+    endpoint = app.config.routes_pathname_prefix + '_dash-update-component'
+    view = app.server.view_functions[endpoint]
+
+    def profiled(*args, **kwargs):
+        if not profiler.take():
+            return view(*args, **kwargs)
+        name = (request.get_json(silent=True) or {}).get('output', 'unknown')
+        return profiler.run(name, lambda: view(*args, **kwargs))
+
+    app.server.view_functions[endpoint] = profiled
+    return profiler
@@ -0,0 +1,103 @@
+from statistics import NormalDist
+import numpy as np
+
+
+# ROC and DET curves over every subject's candidates, where a pair counts as a match when its
+# Similarity >= the threshold. One sort of all scores plus cumulative sums gives the error
+# rates at every distinct threshold; curves are cached per ScoreRegistry.version.
+
+# DET axes are probit scaled; rates are clipped away from 0 and 1 so they stay finite
+DET_CLIP = 1e-3
+
+_curves = {}
+
+
+class Curve:
+
+    # thresholds descending; fpr/tpr are the rates when matching at Similarity >= thresholds[i].
+    # The first point is the (+inf) threshold that matches nothing.
+    def __init__(self, thresholds, fpr, tpr):
+        self.thresholds = thresholds
+        self.fpr = fpr
+        self.tpr = tpr
+        self.fnr = 1 - tpr
+
+    # index of the operating point for matching at Similarity >= threshold
+    def point(self, threshold):
+        return int(np.searchsorted(-self.thresholds, -threshold, side='right')) - 1
+
+    # probit-scaled (fpr, fnr), rounded like the other coordinates sent to the browser
+    def det(self):
+        probit = np.vectorize(NormalDist().inv_cdf)
+        return (np.round(probit(np.clip(self.fpr, DET_CLIP, 1 - DET_CLIP)), 4),
+                np.round(probit(np.clip(self.fnr, DET_CLIP, 1 - DET_CLIP)), 4))
+
+
+def compute(similarity, match):
+    similarity = np.asarray(similarity, dtype=float)
+    match = np.asarray(match, dtype=bool)
+    order = np.argsort(-similarity, kind='stable')
+    similarity, match = similarity[order], match[order]
+    true_positives = np.cumsum(match)
+    false_positives = np.cumsum(~match)
+    # the last pair of each run of tied scores carries the counts for that threshold
+    last = np.r_[np.flatnonzero(np.diff(similarity)), len(similarity) - 1]
+    positives = max(int(match.sum()), 1)
+    negatives = max(int((~match).sum()), 1)
+    return Curve(np.r_[np.inf, similarity[last]],
+                 np.r_[0.0, false_positives[last] / negatives],
+                 np.r_[0.0, true_positives[last] / positives])
+
+
+# the curve over every valid pair in the registry, cached per data version
+def curve(registry):
+    if registry.version not in _curves:
+        _curves[registry.version] = compute(registry.similarity[registry.valid], registry.match[registry.valid])
+    return _curves[registry.version]
+
+
+# what the clientside marker callback needs to place the slider's operating point
+def points(curve):
+    det_x, det_y = curve.det()
+    # +inf isn't valid json; no slider value reaches it anyway
+    thresholds = np.where(np.isinf(curve.thresholds), 1e9, curve.thresholds)
+    return {'thresholds': thresholds.tolist(), 'fpr': np.round(curve.fpr, 4).tolist(), 'tpr': np.round(curve.tpr, 4).tolist(),
+            'det_x': det_x.tolist(), 'det_y': det_y.tolist()}
+
+
+# ROC and DET side by side, with a marker trace per panel for the current threshold. A plain
+# figure dict: building it with plotly.graph_objs costs a cold start ~200 ms of validators for
+# json that comes out the same
+def figure(curve, threshold=0.0):
+    det_x, det_y = curve.det()
+    i = curve.point(threshold)
+    hover = ['threshold {:.3f}'.format(t) if np.isfinite(t) else 'no matches' for t in curve.thresholds]
+    ticks = [0.001, 0.01, 0.05, 0.2, 0.5, 0.8, 0.95, 0.99]
+    probit_ticks = [NormalDist().inv_cdf(t) for t in ticks]
+    line = {'shape': 'hv', 'color': '#00ff00'}
+    marker = {'size': 12, 'color': 'white'}
+    data = [
+        {'type': 'scatter', 'x': np.round(curve.fpr, 4).tolist(), 'y': np.round(curve.tpr, 4).tolist(), 'mode': 'lines', 'line': line,
+         'text': hover, 'name': 'ROC', 'xaxis': 'x', 'yaxis': 'y'},
+        {'type': 'scatter', 'x': det_x.tolist(), 'y': det_y.tolist(), 'mode': 'lines', 'line': line,
+         'text': hover, 'name': 'DET', 'xaxis': 'x2', 'yaxis': 'y2'},
+        {'type': 'scatter', 'x': [float(curve.fpr[i])], 'y': [float(curve.tpr[i])], 'mode': 'markers', 'marker': marker,
+         'name': 'threshold', 'xaxis': 'x', 'yaxis': 'y'},
+        {'type': 'scatter', 'x': [float(det_x[i])], 'y': [float(det_y[i])], 'mode': 'markers', 'marker': marker,
+         'name': 'threshold', 'xaxis': 'x2', 'yaxis': 'y2'},
+    ]
+    title = {'font': {'size': 16}, 'showarrow': False, 'xanchor': 'center', 'xref': 'paper', 'y': 1.0, 'yanchor': 'bottom', 'yref': 'paper'}
+    layout = {
+        # what make_subplots(rows=1, cols=2, subplot_titles=...) lays out
+        'annotations': [dict(title, text='ROC', x=0.225), dict(title, text='DET', x=0.775)],
+        'xaxis': {'anchor': 'y', 'domain': [0.0, 0.45], 'title': {'text': 'false match rate'}, 'range': [0, 1]},
+        'yaxis': {'anchor': 'x', 'domain': [0.0, 1.0], 'title': {'text': 'true match rate'}, 'range': [0, 1.02]},
+        'xaxis2': {'anchor': 'y2', 'domain': [0.55, 1.0], 'title': {'text': 'false match rate'},
+                   'tickvals': probit_ticks, 'ticktext': [str(t) for t in ticks]},
+        'yaxis2': {'anchor': 'x2', 'domain': [0.0, 1.0], 'title': {'text': 'miss rate'},
+                   'tickvals': probit_ticks, 'ticktext': [str(t) for t in ticks]},
+        # no template; plotly's default alone is ~20 KB of layout json
+        'showlegend': False, 'height': 360, 'margin': {'l': 60, 'r': 20, 't': 40, 'b': 50},
+        'paper_bgcolor': 'black', 'plot_bgcolor': 'black', 'font': {'color': '#00ff00', 'family': 'Monaco'},
+    }
+    return {'data': data, 'layout': layout}
@@ -0,0 +1,128 @@
+import collections
+import csv
+import glob
+import hashlib
+import os
+import threading
+import numpy as np
+
+
+# every subject csv the app offers, loaded once and stacked into subjects x candidates arrays
+# so analyses can run over all subjects in one numpy operation. Rows shorter than the longest
+# csv are padded (valid == False, Similarity/Difference NaN, Match False).
+#
+# The scores, names and image files are parsed at startup with the csv module, which is all
+# the analyses, the api and exports need. A subject's full DataFrame is only read for the
+# subject callback, through a small LRU (FRAME_CACHE subjects), so pandas (most of a cold
+# start) is imported by the first request that needs it rather than by every worker boot, and
+# the frames held stay bounded however many subjects there are.
+#
+# `version` is a hash of the csv contents; anything derived from the scores is cached
+# against it.
+
+# files in a data directory that aren't subject csvs
+NOT_SUBJECTS = ('subjects.csv',)
+FRAME_CACHE = 32
+
+
+# radio options for every subject csv in `path` (e.g. the output of synthetic.py), in
+# subjects.csv order when there is one, else by filename
+def directory_options(path):
+    metadata = os.path.join(path, 'subjects.csv')
+    if os.path.exists(metadata):
+        with open(metadata, newline='') as f:
+            return [{'label': row['Subject'], 'value': os.path.join(path, row['Csv'])} for row in csv.DictReader(f)]
+    files = sorted(f for f in glob.glob(os.path.join(path, '*.csv')) if os.path.basename(f) not in NOT_SUBJECTS)
+    return [{'label': os.path.splitext(os.path.basename(f))[0].replace('_', ' '), 'value': f} for f in files]
+
+
+def number(text):
+    return float(text) if text.strip() else np.nan
+
+
+# the columns of one csv the registry keeps, numbers and booleans read as pandas.read_csv
+# would read them; Subject_File is only set on the first row
+def score_columns(data):
+    # the shipped csvs mix line endings (LeBron_James.csv \r\n, the others a bare \r, which
+    # io.StringIO won't split on); splitlines() takes either
+    rows = csv.reader(data.decode('utf-8-sig').splitlines())
+    header = next(rows)
+    column = {name: header.index(name) for name in ('Name', 'Similarity', 'Difference', 'File', 'Subject_File', 'Match')}
+    rows = list(rows)
+    return {'similarity': [number(row[column['Similarity']]) for row in rows],
+            'difference': [number(row[column['Difference']]) for row in rows],
+            'match': [row[column['Match']].strip().lower() == 'true' for row in rows],
+            'names': [row[column['Name']] for row in rows],
+            'files': [row[column['File']] for row in rows],
+            'subject_file': rows[0][column['Subject_File']] if rows else ''}
+
+
+class ScoreRegistry:
+
+    # `options` are the {'label', 'value'} radio options, value being the csv path
+    def __init__(self, options):
+        self.options = list(options)
+        self.values = [option['value'] for option in self.options]
+        self.labels = [option['label'] for option in self.options]
+        self._position = {value: i for i, value in enumerate(self.values)}
+        # the csv's file name, a slash-free key for urls; the value itself for the shipped csvs
+        self.ids = [os.path.basename(value) for value in self.values]
+        self._by_id = {subject_id: i for i, subject_id in enumerate(self.ids)}
+        if len(self._by_id) != len(self.ids):
+            raise ValueError('subject csvs in different directories share a file name')
+        digest = hashlib.sha1()
+        # DataFrames of the subjects shown most recently, see frame()
+        self.frames = collections.OrderedDict()
+        self._frames_lock = threading.Lock()
+        columns = []
+        for value in self.values:
+            with open(value, 'rb') as f:
+                data = f.read()
+            digest.update(data)
+            columns.append(score_columns(data))
+        self.version = digest.hexdigest()[:12]
+        # per subject, in csv row order: candidate names and image urls, and the subject's own image
+        self.names = [c['names'] for c in columns]
+        self.files = [c['files'] for c in columns]
+        self.subject_files = [c['subject_file'] for c in columns]
+
+        candidates = max((len(c['similarity']) for c in columns), default=0)
+        shape = (len(self.values), candidates)
+        self.similarity = np.full(shape, np.nan)
+        self.difference = np.full(shape, np.nan)
+        self.match = np.zeros(shape, dtype=bool)
+        self.valid = np.zeros(shape, dtype=bool)
+        for i, c in enumerate(columns):
+            n = len(c['similarity'])
+            self.similarity[i, :n] = c['similarity']
+            self.difference[i, :n] = c['difference']
+            self.match[i, :n] = c['match']
+            self.valid[i, :n] = True
+        self.impostors = (self.valid & ~self.match).sum(axis=1)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __contains__(self, value):
+        return value in self._position
+
+    def position(self, value):
+        return self._position[value]
+
+    # position of the subject with this id, or None
+    def find(self, subject_id):
+        return self._by_id.get(subject_id)
+
+    def frame(self, value):
+        self.position(value)
+        with self._frames_lock:
+            if value in self.frames:
+                self.frames.move_to_end(value)
+                return self.frames[value]
+        import pandas as pd
+        frame = pd.read_csv(value)
+        with self._frames_lock:
+            self.frames[value] = frame
+            while len(self.frames) > FRAME_CACHE:
+                self.frames.popitem(last=False)
+        return frame
@@ -0,0 +1,74 @@
+import hashlib
+import threading
+from flask import Response, request
+
+
+# request coalescing for dash callbacks: while one worker thread is computing a callback, any
+# identical request (same output, inputs and state, i.e. the same POST body) that arrives waits
+# for that result instead of computing it again. Only requests in flight at the same time are
+# shared; nothing is cached once the first one returns. Coalescing is per process, so it helps
+# threaded servers (the dev server, gunicorn gthread/gevent workers).
+
+
+class Call:
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.shared = 0
+
+    # runs fn() for the first caller with `key`; callers arriving before it finishes get its
+    # result (or its exception) instead
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Call()
+            else:
+                self.shared += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+# a response every waiter can get its own copy of
+def _freeze(response):
+    response = response if isinstance(response, Response) else Response(response)
+    return response.get_data(), response.status_code, list(response.headers)
+
+
+# wraps the app's _dash-update-component view so identical in-flight callback requests share one
+# computation; PreventUpdate and other errors reach every waiter the same way
+def coalesce(app, flight=None):
+    flight = flight or SingleFlight()
+    endpoint = app.config.routes_pathname_prefix + '_dash-update-component'
+    view = app.server.view_functions[endpoint]
+
+    def coalesced(*args, **kwargs):
+        key = hashlib.sha1(request.get_data()).hexdigest()
+        body, status, headers = flight.do(key, lambda: _freeze(view(*args, **kwargs)))
+        return Response(body, status=status, headers=headers)
+
+    app.server.view_functions[endpoint] = coalesced
+    return flight
@@ -0,0 +1,51 @@
+import os
+import sys
+import time
+
+
+# where a worker's boot goes: dash_skeleton.py imports this first and calls mark(phase) after
+# each stage of startup, which charges the time since the previous mark to that phase. The
+# report goes to stderr once the app is built (STARTUP_REPORT=0 turns that off) and is served
+# at /admin/startup; `python startup.py` does one cold import and prints it.
+#
+#   python startup.py
+#   DATA_DIR=synthetic python startup.py
+
+STARTED = time.perf_counter()
+REPORT = os.environ.get('STARTUP_REPORT', '1') != '0'
+
+_phases = []
+_last = [STARTED]
+
+
+def mark(phase):
+    now = time.perf_counter()
+    _phases.append((phase, now - _last[0]))
+    _last[0] = now
+
+
+def report():
+    return {'pid': os.getpid(), 'seconds': round(_last[0] - STARTED, 4),
+            'phases': [{'phase': phase, 'seconds': round(seconds, 4)} for phase, seconds in _phases]}
+
+
+def describe(report):
+    lines = ['startup {:.3f}s (pid {})'.format(report['seconds'], report['pid'])]
+    for phase in report['phases']:
+        share = phase['seconds'] / report['seconds'] if report['seconds'] else 0
+        lines.append('  {:<28} {:>8.1f} ms {:>5.0%}'.format(phase['phase'], phase['seconds'] * 1000, share))
+    return '\n'.join(lines)
+
+
+def done():
+    if REPORT:
+        print(describe(report()), file=sys.stderr)
+
+
+def main():
+    import dash_skeleton
+    return dash_skeleton
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+import argparse
+import numpy as np
+
+
+# what the subjectN_mismatches callbacks show, for many thresholds and every subject at once:
+# the percentage of a subject's impostors with Similarity >= threshold (int(false / impostors
+# * 100), the callbacks' int(num_match / 7 * 100) with 7 generalized to the subject's own
+# impostor count), and whether the true match is still found. Memory stays thresholds x
+# subjects; nothing is broadcast out to thresholds x subjects x candidates.
+#
+#   python sweep.py --start 0 --stop 1.4 --step 0.1 --out sweep.csv
+
+MAX_THRESHOLDS = 10000
+
+
+class Sweep:
+
+    def __init__(self, thresholds, labels, mismatch_percent, finds_subject, false_matches):
+        self.thresholds = thresholds
+        self.labels = labels
+        self.mismatch_percent = mismatch_percent
+        self.finds_subject = finds_subject
+        self.false_matches = false_matches
+
+    # the strings the subjectN_mismatches callbacks return, thresholds x subjects
+    def messages(self):
+        percent = self.mismatch_percent.astype(str)
+        return np.where(~self.finds_subject & (self.false_matches == 0), 'Fails to ID anyone',
+                        np.where(self.mismatch_percent == 0, 'Correctly Matches',
+                                 np.char.add(percent, '% mismatches')))
+
+    def frame(self):
+        import pandas as pd
+        return pd.DataFrame(self.mismatch_percent, index=pd.Index(self.thresholds, name='threshold'), columns=self.labels)
+
+    def to_json(self):
+        return {'thresholds': self.thresholds.tolist(), 'subjects': list(self.labels),
+                'mismatch_percent': self.mismatch_percent.tolist(), 'finds_subject': self.finds_subject.tolist()}
+
+
+# how many of each subject's scores (where mask) are >= each of the sorted thresholds: every
+# score is binned by how many thresholds it clears, then a reverse cumulative sum turns the
+# bins into counts, so the cost is subjects x (candidates + thresholds) with no search per cell
+def at_or_above(similarity, mask, sorted_thresholds):
+    subjects, bins = similarity.shape[0], len(sorted_thresholds) + 1
+    cleared = np.searchsorted(sorted_thresholds, np.where(mask, similarity, -np.inf), side='right')
+    rows = np.broadcast_to(np.arange(subjects)[:, None], similarity.shape)
+    histogram = np.bincount((rows * bins + cleared)[mask], minlength=subjects * bins).reshape(subjects, bins)
+    return np.cumsum(histogram[:, ::-1], axis=1)[:, ::-1][:, 1:]
+
+
+def sweep(registry, thresholds):
+    thresholds = np.asarray(thresholds, dtype=float).ravel()
+    if len(thresholds) > MAX_THRESHOLDS:
+        raise ValueError('at most {} thresholds per sweep, got {}'.format(MAX_THRESHOLDS, len(thresholds)))
+    if not np.isfinite(thresholds).all():
+        raise ValueError('thresholds must be finite numbers')
+    similarity, valid, match = registry.similarity, registry.valid, registry.match
+    order = np.argsort(thresholds, kind='stable')
+    # subjects x thresholds in sorted order, transposed and put back in the order asked for
+    false_matches = np.empty((len(thresholds), similarity.shape[0]), dtype=np.int64)
+    finds_subject = np.empty((len(thresholds), similarity.shape[0]), dtype=bool)
+    false_matches[order] = at_or_above(similarity, valid & ~match, thresholds[order]).T
+    finds_subject[order] = (at_or_above(similarity, valid & match, thresholds[order]) > 0).T
+    with np.errstate(invalid='ignore', divide='ignore'):
+        percent = false_matches / registry.impostors[None, :] * 100
+    mismatch_percent = np.where(np.isfinite(percent), percent, 0).astype(int)
+    return Sweep(thresholds, registry.labels, mismatch_percent, finds_subject, false_matches)
+
+
+def main(argv=None):
+    from dash_skeleton import registry
+
+    parser = argparse.ArgumentParser(description='Mismatch percentage for every subject over a range of thresholds.')
+    parser.add_argument('--start', type=float, default=0.0)
+    parser.add_argument('--stop', type=float, default=1.4)
+    parser.add_argument('--step', type=float, default=0.1)
+    parser.add_argument('--out', help='csv path, default: print')
+    args = parser.parse_args(argv)
+
+    thresholds = np.round(np.arange(args.start, args.stop + args.step / 2, args.step), 6)
+    frame = sweep(registry, thresholds).frame()
+    if args.out:
+        frame.to_csv(args.out)
+        print('wrote {} thresholds x {} subjects to {}'.format(*frame.shape, args.out))
+    else:
+        print(frame.to_string())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+import argparse
+import glob
+import os
+import shutil
+import time
+import zlib
+import numpy as np
+import pandas as pd
+from embeddings import ASSETS_URL, CANDIDATES, SIMILARITY_OFFSET, subject_csv_name
+from gallery import KTH, ordinal
+
+
+# a seeded synthetic dataset in exactly the shape dash_skeleton.py reads, for scale and load
+# testing: one csv per subject (Name, Difference, Similarity, File, Subject, Subject_File,
+# Match; least similar first, one true match), a subjects.csv of group attributes, and an
+# assets folder with placeholder images, the 11th_match.csv summary and the app's own css/js,
+# so the app runs on it with
+#
+#   python synthetic.py --subjects 10000 --out synthetic
+#   DATA_DIR=synthetic ASSETS_FOLDER=$PWD/synthetic/assets python dash_skeleton.py
+#
+# Scores follow the shipped csvs: each subject's nearest impostors are the smallest of a
+# draw around a per-subject mean Difference (about 1.35, sd 0.25, pulled closer for the
+# 'darker' group to reproduce the uneven false match rates the demo is about), and the true
+# match's Difference is 0.05 + 0.7 * Beta(2, 4). The csv keeps the nearest CANDIDATES - 1
+# impostors; the KTH-nearest goes into the summary, so the two always agree.
+
+# gallery people per subject, so impostors are drawn from a larger population
+POPULATION = 2
+IMPOSTOR_SD = 0.25
+# fitted so the impostor, true match and 11th-match percentiles land near the shipped csvs'
+SUBJECT_MEAN = 1.35
+SUBJECT_SD = 0.25
+# how much closer (in Difference) impostors sit for the 'darker' group
+DARKER_SHIFT = 0.1
+PLACEHOLDER_COLOURS = 16
+PLACEHOLDER_SIZE = 125
+APP_ASSETS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets')
+
+
+def person(i):
+    return 'Synthetic Person {:05d}'.format(i)
+
+
+def image_file(i, n):
+    return '{}_{:04d}.jpg'.format(person(i).replace(' ', '_'), n)
+
+
+# per subject: impostor people (KTH of them, nearest first) and their differences, and the
+# true match's difference
+def draw_scores(rng, subjects, population, darker):
+    means = rng.normal(SUBJECT_MEAN, SUBJECT_SD, subjects) - DARKER_SHIFT * darker
+    # nearest KTH of a larger draw, like nearest neighbours from a gallery
+    draws = rng.normal(means[:, None], IMPOSTOR_SD, (subjects, 4 * KTH))
+    impostor_differences = np.sort(np.clip(draws, 0.05, 2.0), axis=1)[:, :KTH]
+    genuine = 0.05 + 0.7 * rng.beta(2, 4, subjects)
+
+    # distinct impostor people per subject, never the subject itself
+    people = rng.integers(0, population - 1, (subjects, KTH))
+    while True:
+        ordered = np.sort(people, axis=1)
+        repeated = (ordered[:, 1:] == ordered[:, :-1]).any(axis=1)
+        if not repeated.any():
+            break
+        people[repeated] = rng.integers(0, population - 1, (int(repeated.sum()), KTH))
+    people += people >= np.arange(subjects)[:, None]
+    return people, np.round(impostor_differences, 3), np.round(genuine, 3)
+
+
+def subject_lines(i, people, impostor_differences, genuine):
+    differences = np.r_[impostor_differences[:CANDIDATES - 1], genuine]
+    names = [person(p) for p in people[:CANDIDATES - 1]] + [person(i)]
+    files = [image_file(p, 1) for p in people[:CANDIDATES - 1]] + [image_file(i, 2)]
+    match = [False] * (CANDIDATES - 1) + [True]
+    lines = ['Name,Difference,Similarity,File,Subject,Subject_File,Match']
+    # least similar first
+    for row, j in enumerate(np.argsort(-differences, kind='stable')):
+        subject = ',{},{}{}'.format(person(i), ASSETS_URL, image_file(i, 1)) if row == 0 else ',,'
+        lines.append('{},{!r},{!r},{}{}{},{}'.format(names[j], float(differences[j]), round(SIMILARITY_OFFSET - float(differences[j]), 3),
+                                                   ASSETS_URL, files[j], subject, 'TRUE' if match[j] else 'FALSE'))
+    return '\n'.join(lines) + '\n'
+
+
+# a few solid-colour images, written once each and hard linked for every file that uses them
+# (tens of thousands of tiny files would otherwise cost a disk block each)
+def placeholders():
+    from PIL import Image
+    import io
+    images = []
+    for c in range(PLACEHOLDER_COLOURS):
+        shade = 40 + int(180 * c / max(PLACEHOLDER_COLOURS - 1, 1))
+        buffer = io.BytesIO()
+        Image.new('RGB', (PLACEHOLDER_SIZE, PLACEHOLDER_SIZE), (shade, shade, shade)).save(buffer, 'JPEG', quality=60)
+        images.append(buffer.getvalue())
+    return images
+
+
+def write_images(assets, files):
+    sources = []
+    for c, data in enumerate(placeholders()):
+        sources.append(os.path.join(assets, 'placeholder_{}.jpg'.format(c)))
+        with open(sources[-1], 'wb') as out:
+            out.write(data)
+    for f in files:
+        path = os.path.join(assets, f)
+        source = sources[zlib.crc32(f.encode()) % len(sources)]
+        if os.path.exists(path):
+            os.remove(path)
+        try:
+            os.link(source, path)
+        except OSError:
+            shutil.copy(source, path)
+
+
+def generate(out, subjects, seed=0, images=True, app_assets=APP_ASSETS):
+    rng = np.random.default_rng(seed)
+    population = max(subjects * POPULATION, KTH + 1)
+    darker = rng.random(subjects) < 0.5
+    gender = np.where(rng.random(subjects) < 0.5, 'female', 'male')
+    people, impostor_differences, genuine = draw_scores(rng, subjects, population, darker)
+
+    assets = os.path.join(out, 'assets')
+    os.makedirs(assets, exist_ok=True)
+    for i in range(subjects):
+        with open(os.path.join(out, subject_csv_name(person(i))), 'w') as f:
+            f.write(subject_lines(i, people[i], impostor_differences[i], genuine[i]))
+
+    pd.DataFrame({'Subject': [person(i) for i in range(subjects)],
+                  'Csv': [subject_csv_name(person(i)) for i in range(subjects)],
+                  'Gender': gender, 'Skin': np.where(darker, 'darker', 'lighter')}).to_csv(os.path.join(out, 'subjects.csv'), index=False)
+    pd.DataFrame({'Subject': [person(i) for i in range(subjects)],
+                  '{} match'.format(ordinal(KTH)): [person(p) for p in people[:, KTH - 1]],
+                  'Dif score': impostor_differences[:, KTH - 1]}).to_csv(os.path.join(assets, '{}_match.csv'.format(ordinal(KTH))), index=False)
+
+    files = set()
+    if images:
+        files = {image_file(i, n) for i in range(subjects) for n in (1, 2)} | {image_file(p, 1) for p in np.unique(people[:, :CANDIDATES - 1])}
+        write_images(assets, sorted(files))
+    # the app's stylesheets and clientside callbacks, so ASSETS_FOLDER can point here
+    for path in glob.glob(os.path.join(app_assets, '*.css')) + glob.glob(os.path.join(app_assets, '*.js')):
+        shutil.copy(path, assets)
+    return len(files)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Write a seeded synthetic dataset in the subject csv schema.')
+    parser.add_argument('--subjects', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default='synthetic')
+    parser.add_argument('--no-images', action='store_true', help='skip the placeholder images')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    images = generate(args.out, args.subjects, args.seed, not args.no_images)
+    print('wrote {} subjects and {} images to {} in {:.1f}s'.format(args.subjects, images, args.out, time.perf_counter() - start))
+
+
+if __name__ == '__main__':
+    main()
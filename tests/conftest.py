@@ -0,0 +1,49 @@
+import json
+import os
+import subprocess
+import sys
+import pytest
+
+
+# the app's modules live at the top of the repo, next to the shipped subject csvs
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+# the app on the shipped csvs, imported once; it reads them (and assets/) relative to the repo
+@pytest.fixture(scope='session')
+def app():
+    os.chdir(ROOT)
+    os.environ['STARTUP_REPORT'] = '0'
+    os.environ.pop('DATA_DIR', None)
+    import dash_skeleton
+    dash_skeleton.warm()
+    return dash_skeleton
+
+
+@pytest.fixture
+def client(app):
+    return app.server.test_client()
+
+
+# runs `code` in a fresh interpreter with `env` added (for settings the app reads at import,
+# like DATA_DIR) and returns what it prints as json
+def run_app(code, **env):
+    env = dict(os.environ, STARTUP_REPORT='0', PYTHONPATH=ROOT, **env)
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=env, capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+# POSTs the server callback whose output contains `output`, with `changed` ({(id, prop): value})
+# as the triggering change over the values the page starts with, as the renderer would
+def dash_callback(client, output, changed):
+    import loadtest
+
+    values, ids = {}, {}
+    loadtest.collect(client.get('/_dash-layout').get_json(), values, ids)
+    values.update(changed)
+    callback = next(loadtest.Callback(d) for d in client.get('/_dash-dependencies').get_json()
+                    if not d.get('clientside_function') and output in d['output'])
+    response = client.post('/_dash-update-component', json=callback.body(values, ids, set(changed)))
+    return response.status_code, response.get_json()
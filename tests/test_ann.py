@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+import ann
+import embeddings
+from ann import IVFIndex
+from embeddings import EmbeddingStore
+
+
+@pytest.fixture(scope='module')
+def gallery():
+    return ann.synthetic_embeddings(2000, dim=32, seed=0)
+
+
+@pytest.fixture(scope='module')
+def index(gallery):
+    return IVFIndex.build(gallery, n_lists=40, seed=0)
+
+
+def test_build_partitions_the_gallery(gallery, index):
+    assert index.n_lists == 40 and len(index) == len(gallery)
+    assert sorted(index.ids) == list(range(len(gallery)))
+    assert index.offsets[0] == 0 and index.offsets[-1] == len(gallery) and (np.diff(index.offsets) >= 0).all()
+    assert np.array_equal(index.vectors, gallery[index.ids].astype(np.float32))
+    # every vector sits in the list of its nearest centroid
+    labels = np.repeat(np.arange(index.n_lists), np.diff(index.offsets))
+    assert np.array_equal(labels, ann.assign(index.vectors, index.centroids))
+
+
+def test_probing_every_list_is_exact(gallery, index):
+    queries = gallery[:50] + 0.01
+    found, distances = index.search(queries, 8, n_probe=index.n_lists)
+    assert np.array_equal(found, ann.exact_search(queries, gallery, 8))
+    assert (np.diff(distances, axis=1) >= 0).all()
+
+
+def test_recall_rises_with_n_probe(gallery, index):
+    queries = gallery[::40]
+    truth = ann.exact_search(queries, gallery, 8)
+    recalls = [ann.recall(index.search(queries, 8, n_probe)[0], truth) for n_probe in (1, 4, 16, 40)]
+    assert recalls == sorted(recalls) and recalls[-1] == 1.0
+    assert recalls[1] > 0.8
+
+
+def test_short_lists_are_padded():
+    vectors = np.eye(4, dtype=np.float32)
+    index = IVFIndex.build(vectors, n_lists=4)
+    found, distances = index.search(vectors[:1], 3, n_probe=1)
+    assert found.tolist() == [[0, -1, -1]]
+    assert distances[0, 0] == 0 and np.isinf(distances[0, 1:]).all()
+
+
+def test_save_and_load(index, gallery, tmp_path):
+    path = str(tmp_path / 'index.npz')
+    index.save(path)
+    loaded = IVFIndex.load(path)
+    assert loaded.n_lists == index.n_lists and np.array_equal(loaded.ids, index.ids)
+    assert np.array_equal(loaded.search(gallery[:5], 4)[0], index.search(gallery[:5], 4)[0])
+
+
+# top_k_many through the index: never the subject itself, never padding, exact at every list
+def test_top_k_many_through_the_index(gallery, index):
+    store = EmbeddingStore(['Person_{}_{:04d}.jpg'.format(i // 5, i % 5 + 1) for i in range(len(gallery))], gallery)
+    subjects = list(store.files[::97])
+    rows = np.array([store.index_of(s) for s in subjects])
+    exact, _ = embeddings.top_k_many(store, subjects, 8)
+    for n_probe in (1, index.n_lists):
+        found, differences = embeddings.top_k_many(store, subjects, 8, index=index, n_probe=n_probe)
+        assert (found >= 0).all() and np.isfinite(differences).all()
+        assert not (found == rows[:, None]).any()
+    assert np.array_equal(found, exact)
+
+
+# with one vector per list, a single probe never finds k candidates and is widened
+def test_approximate_top_k_widens_the_probe():
+    vectors = np.eye(6, dtype=np.float32)
+    store = EmbeddingStore(['Person_{}_0001.jpg'.format(i) for i in range(6)], vectors)
+    index = IVFIndex.build(vectors, n_lists=6)
+    found, differences = embeddings.top_k_many(store, list(store.files), 3, index=index, n_probe=1)
+    assert (found >= 0).all() and differences == pytest.approx(np.full((6, 3), 2.0))
+    assert all(i not in row for i, row in enumerate(found))
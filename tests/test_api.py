@@ -0,0 +1,50 @@
+import api
+
+
+def test_subject_body(app, client):
+    response = client.get('/api/subjects/LeBron_James.csv')
+    assert response.status_code == 200 and response.mimetype == 'application/json'
+    body = response.get_json()
+    i = app.registry.position('LeBron_James.csv')
+    assert body['id'] == body['value'] == 'LeBron_James.csv'
+    assert body['version'] == app.registry.version
+    assert body['label'] == 'LeBron James'
+    assert [c['name'] for c in body['candidates']] == app.registry.names[i]
+    assert sum(c['match'] for c in body['candidates']) == 1
+    assert body['mismatches']['thresholds'] == app.SLIDER_MARKS
+    assert set(body['thresholds']) >= {'eer_threshold', 'best_threshold', 'highest_threshold'}
+
+
+def test_etag_and_conditional_get(app, client):
+    first = client.get('/api/subjects/Lisa_Leslie.csv')
+    tag = first.headers['ETag']
+    assert tag == '"{}"'.format(api.etag(app.registry.version, '/api/subjects/Lisa_Leslie.csv?'))
+    assert first.headers['Cache-Control'] == api.CACHE_CONTROL
+
+    again = client.get('/api/subjects/Lisa_Leslie.csv', headers={'If-None-Match': tag})
+    assert again.status_code == 304 and again.data == b''
+    assert again.headers['ETag'] == tag
+
+    # another subject, or a stale tag, gets the full body
+    assert client.get('/api/subjects/Paris_Hilton.csv', headers={'If-None-Match': tag}).status_code == 200
+    stale = client.get('/api/subjects/Lisa_Leslie.csv', headers={'If-None-Match': '"0000"'})
+    assert stale.status_code == 200 and stale.data == first.data
+
+
+def test_unknown_subject_is_a_json_404(client):
+    for path in ('/api/subjects/Nobody.csv', '/api/subjects/assets/LeBron_James.csv'):
+        response = client.get(path)
+        assert response.status_code == 404 and response.mimetype == 'application/json'
+        assert 'unknown subject' in response.get_json()['error']
+
+
+def test_subject_list_and_thresholds(app, client):
+    subjects = client.get('/api/subjects').get_json()['subjects']
+    assert [s['id'] for s in subjects] == app.registry.ids
+    assert all(s['candidates'] == 8 and s['impostors'] == 7 for s in subjects)
+    table = client.get('/api/thresholds').get_json()['subjects']
+    assert [row['value'] for row in table] == app.registry.values + ['all']
+
+
+def test_nan_is_null():
+    assert api.dumps({'a': api.finite(float('nan')), 'b': api.finite(2)}) == '{"a":null,"b":2.0}'
@@ -0,0 +1,36 @@
+import glob
+import os
+import numpy as np
+import bootstrap
+from conftest import ROOT
+from scores import NOT_SUBJECTS, ScoreRegistry
+
+THRESHOLDS = np.round(np.arange(0, 1.41, 0.1), 6)
+
+
+def shipped_registry():
+    csvs = sorted(f for f in glob.glob(os.path.join(ROOT, '*.csv')) if os.path.basename(f) not in NOT_SUBJECTS)
+    return ScoreRegistry([{'label': os.path.basename(f), 'value': f} for f in csvs])
+
+
+def test_same_seed_same_intervals():
+    registry = shipped_registry()
+    first = bootstrap.compute(registry, THRESHOLDS, resamples=200, seed=7)
+    second = bootstrap.compute(registry, THRESHOLDS, resamples=200, seed=7)
+    assert np.array_equal(first.low, second.low, equal_nan=True)
+    assert np.array_equal(first.high, second.high, equal_nan=True)
+    assert np.array_equal(first.rate, second.rate, equal_nan=True)
+
+    other = bootstrap.compute(registry, THRESHOLDS, resamples=200, seed=8)
+    assert not np.array_equal(first.low, other.low, equal_nan=True) or not np.array_equal(first.high, other.high, equal_nan=True)
+
+
+# each chunk of subjects carries its own seed, so running the chunks in a pool changes nothing
+def test_pool_matches_in_process(monkeypatch):
+    registry = shipped_registry()
+    monkeypatch.setattr(bootstrap, 'CHUNK_CELLS', 200 * 8 * 3)
+    in_process = bootstrap.compute(registry, THRESHOLDS, resamples=200, seed=7)
+    monkeypatch.setattr(bootstrap, 'POOL_MIN_SUBJECTS', 1)
+    pooled = bootstrap.compute(registry, THRESHOLDS, resamples=200, seed=7, workers=2)
+    assert np.array_equal(in_process.low, pooled.low, equal_nan=True)
+    assert np.array_equal(in_process.high, pooled.high, equal_nan=True)
@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+import calibration
+from conftest import dash_callback
+
+
+def logistic_sample(a, b, n, seed=0):
+    rng = np.random.default_rng(seed)
+    difference = rng.uniform(0, 1.5, n)
+    match = rng.random(n) < calibration.sigmoid(-(a * difference + b))
+    return difference, match
+
+
+# Platt's loss on its smoothed targets, the function fit_platt minimizes
+def smoothed_loss(a, b, difference, match):
+    positives, negatives = match.sum(), (~match).sum()
+    target = np.where(match, (positives + 1) / (positives + 2), 1 / (negatives + 2))
+    p = calibration.sigmoid(-(a * difference + b))
+    return -np.sum(target * np.log(p) + (1 - target) * np.log(1 - p))
+
+
+def test_platt_recovers_a_known_logistic():
+    difference, match = logistic_sample(8.0, -4.0, 50000)
+    curve = calibration.fit_platt(difference, match)
+    assert curve.a == pytest.approx(8.0, abs=0.3)
+    assert curve.b == pytest.approx(-4.0, abs=0.2)
+    assert curve(0.5) == pytest.approx(0.5, abs=0.02)
+
+
+def test_platt_is_the_minimum_of_its_loss():
+    difference, match = logistic_sample(5.0, -2.0, 400, seed=1)
+    curve = calibration.fit_platt(difference, match)
+    best = smoothed_loss(curve.a, curve.b, difference, match)
+    for da, db in ((1e-3, 0), (-1e-3, 0), (0, 1e-3), (0, -1e-3)):
+        assert smoothed_loss(curve.a + da, curve.b + db, difference, match) > best
+
+
+# perfectly separable, like the shipped csvs: the smoothed targets keep the slope finite
+def test_platt_separable():
+    curve = calibration.fit_platt([0.1, 0.2, 0.8, 0.9, 1.0], [True, True, False, False, False])
+    assert np.isfinite([curve.a, curve.b]).all() and curve.a > 0
+    assert curve(0.1) > 0.5 > curve(0.9)
+
+
+# sorted by falling difference the labels read 0 0 1 0 1: the 1 0 violation pools to 0.5
+def test_isotonic_pools_adjacent_violators():
+    curve = calibration.fit_isotonic([0.3, 0.1, 0.5, 0.2, 0.4], [True, True, False, False, False])
+    assert curve.x.tolist() == [0.1, 0.2, 0.3, 0.4, 0.5]
+    assert curve.y.tolist() == [1.0, 0.5, 0.5, 0.0, 0.0]
+    # interpolated between breakpoints, flat beyond them, NaN kept
+    assert curve([0.05, 0.15, 0.45, 2.0]).tolist() == [1.0, 0.75, 0.0, 0.0]
+    assert np.isnan(curve(np.nan))
+
+
+def test_isotonic_is_monotone_and_stepwise():
+    difference, match = logistic_sample(6.0, -3.0, 2000, seed=2)
+    difference = np.round(difference, 2)
+    curve = calibration.fit_isotonic(difference, match)
+    assert (np.diff(curve.y) <= 0).all()
+    assert ((curve.y >= 0) & (curve.y <= 1)).all()
+    # each step is the match rate of the pairs it pools
+    for level in np.unique(curve.y):
+        pooled = np.isin(difference, curve.x[curve.y == level])
+        assert match[pooled].mean() == pytest.approx(level)
+
+
+def test_isotonic_ties_share_their_mean():
+    curve = calibration.fit_isotonic([0.2, 0.2, 0.2, 0.9], [True, True, False, False])
+    assert curve(0.2) == pytest.approx(2 / 3)
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        calibration.fit([0.1], [True], 'spline')
+
+
+def test_api_and_tiles_show_the_probability(app, client):
+    body = client.get('/api/subjects/LeBron_James.csv').get_json()
+    assert body['calibration'] == app.CALIBRATION_METHOD
+    expected = app.match_probability([c['difference'] for c in body['candidates']])
+    assert [c['match_probability'] for c in body['candidates']] == pytest.approx(expected)
+
+    status, payload = dash_callback(client, 'tiles.children', {('subject_options', 'value'): 'LeBron_James.csv'})
+    assert status == 200
+    captions = [t['props']['children'][-1]['props']['children'] for t in payload['response']['tiles']['children']]
+    assert captions == ['{:.0%} likely a match'.format(p) for p in expected]
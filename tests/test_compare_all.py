@@ -0,0 +1,86 @@
+import io
+import os
+import numpy as np
+import pytest
+import compare_all
+from embeddings import EmbeddingStore
+from gallery import TopKTable
+
+
+def store(n=70, dim=8, seed=0):
+    vectors = np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+    return EmbeddingStore(['Person_{}_{:04d}.jpg'.format(i // 3, i % 3 + 1) for i in range(n)], vectors)
+
+
+def brute_force(s, k):
+    v = s.vectors.astype(np.float64)
+    distances = ((v[:, None, :] - v[None, :, :]) ** 2).sum(axis=2)
+    np.fill_diagonal(distances, np.inf)
+    return np.argsort(distances, axis=1, kind='stable')[:, :k], np.sort(distances, axis=1)[:, :k]
+
+
+# tiles that don't divide the gallery evenly, on more than one worker
+def test_run_matches_brute_force():
+    s = store()
+    indices, differences = compare_all.run(s, k=5, tile_size=16, workers=2, log=io.StringIO())
+    expected_indices, expected_differences = brute_force(s, 5)
+    assert np.array_equal(indices, expected_indices)
+    assert differences == pytest.approx(expected_differences, abs=1e-4)
+
+
+def test_k_is_capped_at_the_rest_of_the_gallery():
+    indices, _ = compare_all.run(store(n=4), k=10, tile_size=2, workers=1, log=io.StringIO())
+    assert indices.shape == (4, 3)
+    assert all(sorted(row) == [j for j in range(4) if j != i] for i, row in enumerate(indices))
+
+
+# tiles finished before a run was killed are not computed again
+def test_resumes_from_a_checkpoint(tmp_path):
+    s = store()
+    path = str(tmp_path / 'run.checkpoint.npz')
+    tile_size, k = 16, 5
+    starts = list(range(0, len(s), tile_size))
+    tiles = [(r, c) for r in starts for c in starts]
+    checkpoint = compare_all.Checkpoint(path, compare_all.store_fingerprint(s, tile_size, k), len(s), k, len(tiles))
+    compare_all._shared.update(vectors=s.vectors, squared_norms=np.einsum('ij,ij->i', s.vectors, s.vectors))
+    for number in range(0, len(tiles), 2):
+        row_start, _, indices, differences = compare_all.reduce_tile(tiles[number] + (tile_size, k))
+        checkpoint.merge(row_start, indices, differences)
+        checkpoint.done[number] = True
+    checkpoint.save()
+
+    log = io.StringIO()
+    indices, differences = compare_all.run(s, k, tile_size, workers=2, checkpoint_path=path, log=log)
+    assert log.getvalue().startswith('resuming {}: 13 of 25 tiles already done'.format(path))
+    assert np.array_equal(indices, brute_force(s, k)[0])
+    saved = np.load(path)
+    assert saved['done'].all() and np.array_equal(saved['indices'], indices)
+
+
+def test_a_checkpoint_for_another_store_is_refused(tmp_path):
+    path = str(tmp_path / 'run.checkpoint.npz')
+    compare_all.run(store(), k=5, tile_size=16, workers=1, checkpoint_path=path, log=io.StringIO())
+    with pytest.raises(ValueError, match='different store or settings'):
+        compare_all.run(store(seed=1), k=5, tile_size=16, workers=1, checkpoint_path=path, log=io.StringIO())
+    with pytest.raises(ValueError, match='different store or settings'):
+        compare_all.run(store(), k=5, tile_size=32, workers=1, checkpoint_path=path, log=io.StringIO())
+
+
+def test_fingerprint_covers_quantized_codes():
+    s = store()
+    assert compare_all.store_fingerprint(s, 16, 5) == compare_all.store_fingerprint(store(), 16, 5)
+    assert compare_all.store_fingerprint(s, 16, 5) != compare_all.store_fingerprint(s.quantized('float16'), 16, 5)
+    assert compare_all.store_fingerprint(s, 16, 5) != compare_all.store_fingerprint(s, 16, 6)
+
+
+def test_main_writes_the_table_and_drops_the_checkpoint(tmp_path, capsys):
+    s = store()
+    s.save(str(tmp_path / 'store.npy'))
+    table_path = str(tmp_path / 'topk.npz')
+    compare_all.main(['--store', str(tmp_path / 'store.npy'), '--table', table_path, '--k', '4', '--tile-size', '32',
+                      '--workers', '1'])
+    assert 'wrote top-4 lists for 70 faces' in capsys.readouterr().out
+    assert sorted(os.listdir(tmp_path)) == ['store.npy', 'topk.npz']
+    table = TopKTable.load(table_path)
+    assert table.k == 4
+    assert table.files.tolist() == s.files[brute_force(s, 4)[0]].tolist()
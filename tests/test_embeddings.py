@@ -0,0 +1,79 @@
+import os
+import numpy as np
+import pytest
+import embeddings
+import scores
+from embeddings import EmbeddingStore, distance_blocks
+
+
+def store(n=40, dim=8, seed=0):
+    vectors = np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+    return EmbeddingStore(['Person_{}_{:04d}.jpg'.format(i // 4, i % 4 + 1) for i in range(n)], vectors)
+
+
+@pytest.mark.parametrize('filename, name', [('Jason_Campbell_0002.jpg', 'Jason Campbell'),
+                                            ('/assets/LeBron_James_0012.jpg', 'LeBron James'),
+                                            ('Madonna.jpg', 'Madonna')])
+def test_person_name(filename, name):
+    assert embeddings.person_name(filename) == name
+
+
+def test_subject_csv_name():
+    assert embeddings.subject_csv_name('Lisa Leslie') == 'Lisa_Leslie.csv'
+
+
+def test_store_round_trip(tmp_path):
+    s = store()
+    path = str(tmp_path / 'store.npy')
+    s.save(path)
+    loaded = EmbeddingStore.load(path)
+    assert loaded.files.tolist() == s.files.tolist() and loaded.precision == 'float32'
+    assert np.array_equal(loaded.vectors, s.vectors)
+    assert loaded.index_of('/assets/Person_2_0003.jpg') == 10
+    with pytest.raises(KeyError):
+        loaded.index_of('Nobody_0001.jpg')
+
+
+def test_files_and_vectors_must_line_up():
+    with pytest.raises(ValueError):
+        EmbeddingStore(['a.jpg', 'b.jpg'], np.zeros((3, 4)))
+
+
+def test_distance_blocks_are_squared_l2():
+    s = store()
+    queries = s.vectors[::3]
+    expected = ((queries[:, None, :].astype(np.float64) - s.vectors[None, :, :]) ** 2).sum(axis=2)
+    for block_size in (1, 5, 512):
+        blocks = list(distance_blocks(queries, s.vectors, block_size=block_size))
+        assert [start for start, _ in blocks] == list(range(0, len(queries), block_size))
+        distances = np.concatenate([block for _, block in blocks])
+        assert distances == pytest.approx(expected, abs=1e-4)
+        # a vector against itself is clamped to zero, never slightly negative
+        assert (distances >= 0).all()
+
+
+def test_generate_defaults_to_each_persons_first_image():
+    s = store()
+    generated = list(embeddings.generate(s, candidates=3))
+    assert [subject for subject, _ in generated] == ['Person_{}_0001.jpg'.format(i) for i in range(10)]
+    assert all(len(frame) == 3 for _, frame in generated)
+
+
+# the csvs the cli writes load like the shipped ones
+def test_cli_writes_csvs_the_app_reads(tmp_path, capsys):
+    s = store()
+    s.save(str(tmp_path / 'store.npy'))
+    out = tmp_path / 'csvs'
+    embeddings.main(['--store', str(tmp_path / 'store.npy'), '--subjects', 'Person_1_0002.jpg', 'Person_3_0001.jpg',
+                     '--candidates', '5', '--out', str(out)])
+    assert 'wrote 2 subject csvs' in capsys.readouterr().out
+    assert sorted(os.listdir(out)) == ['Person_1.csv', 'Person_3.csv']
+
+    registry = scores.ScoreRegistry(scores.directory_options(str(out)))
+    i = registry.find('Person_1.csv')
+    assert registry.subject_files[i] == '/assets/Person_1_0002.jpg'
+    assert registry.similarity.shape == (2, 5)
+    # a candidate is a match when it is another image of the subject's person
+    assert registry.match[i].tolist() == [name == 'Person 1' for name in registry.names[i]]
+    indices, differences = embeddings.top_k_many(s, ['Person_1_0002.jpg'], 5)
+    assert sorted(registry.difference[i]) == pytest.approx(differences[0].astype(np.float64), abs=1e-3)
@@ -0,0 +1,56 @@
+import csv
+import io
+import json
+import pytest
+import export
+
+
+# every valid candidate of every subject, as the registry has them
+def expected_rows(registry, threshold):
+    rows = []
+    for i, label in enumerate(registry.labels):
+        for j, name in enumerate(registry.names[i]):
+            similarity = registry.similarity[i, j]
+            rows.append([label, name, round(float(similarity), 3), bool(registry.match[i, j]), bool(similarity >= threshold)])
+    return rows
+
+
+def test_csv(app):
+    chunks = list(export.chunks(app.registry, 0.9, 'csv'))
+    # a chunk per subject, the header riding on the first
+    assert len(chunks) == len(app.registry.values)
+    rows = list(csv.reader(io.StringIO(''.join(chunks))))
+    assert rows[0] == export.COLUMNS
+    assert rows[1:] == [[label, name, str(s), str(m).upper(), str(a).upper()]
+                        for label, name, s, m, a in expected_rows(app.registry, 0.9)]
+
+
+def test_ndjson(app):
+    text = ''.join(export.chunks(app.registry, 0.9, 'ndjson'))
+    records = [json.loads(line) for line in text.splitlines()]
+    assert records == [dict(zip(export.COLUMNS, row)) for row in expected_rows(app.registry, 0.9)]
+
+
+def test_bad_arguments(app):
+    with pytest.raises(ValueError, match='unknown export format'):
+        export.chunks(app.registry, 0.9, 'xlsx')
+    with pytest.raises(ValueError, match='finite'):
+        export.chunks(app.registry, float('nan'))
+
+
+def test_route_streams_an_attachment(app, client):
+    response = client.get('/api/export?threshold=0.9&format=ndjson')
+    assert response.status_code == 200 and response.mimetype == 'application/x-ndjson'
+    assert response.is_streamed
+    assert response.headers['Content-Disposition'] == 'attachment; filename="threshold_0.9.ndjson"'
+    assert len(response.get_data(as_text=True).splitlines()) == app.registry.valid.sum()
+
+    default = client.get('/api/export')
+    assert default.mimetype == 'text/csv' and 'threshold_0.csv' in default.headers['Content-Disposition']
+    assert default.get_data(as_text=True) == ''.join(export.chunks(app.registry, 0.0))
+
+
+@pytest.mark.parametrize('query', ['format=xlsx', 'threshold=high', 'threshold=inf'])
+def test_route_rejects_bad_arguments(client, query):
+    response = client.get('/api/export?' + query)
+    assert response.status_code == 400 and 'error' in response.get_json()
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+from embeddings import EmbeddingStore
+import gallery
+from gallery import TopKTable
+
+K = 5
+
+
+def store(n=60, dim=16):
+    vectors = np.random.default_rng(3).normal(size=(n, dim)).astype(np.float32)
+    files = ['Person_{}_{:04d}.jpg'.format(i // 3, i % 3 + 1) for i in range(n)]
+    return EmbeddingStore(files, vectors)
+
+
+# faces inserted one at a time end up in the same lists as a table built over the whole gallery
+def test_insert_matches_rebuild():
+    full = store()
+    # subjects among the first 40 faces, the rest arrive later
+    subjects = list(full.files[:40:4])
+    partial = EmbeddingStore(full.files[:40], full.vectors[:40])
+
+    table = TopKTable.build(partial, subjects, K)
+    changed = set()
+    for i in range(40, len(full)):
+        changed.update(table.insert(full.files[i], full.vectors[i]))
+    rebuilt = TopKTable.build(full, subjects, K)
+
+    assert changed
+    assert (table.files == rebuilt.files).all()
+    assert table.differences == pytest.approx(rebuilt.differences, abs=1e-4)
+
+
+def test_insert_twice_is_an_error():
+    full = store()
+    table = TopKTable.build(full, list(full.files[:5]), K)
+    nearest = table.files[0, 0]
+    with pytest.raises(ValueError):
+        table.insert(nearest, full.vectors[full.index_of(nearest)])
+
+
+@pytest.mark.parametrize('precision, path', [('float32', 'store.npy'), ('float16', 'store.npy'), ('int8', 'store.npz')])
+def test_cli_insert_keeps_the_store_precision(tmp_path, precision, path):
+    full = store()
+    saved = str(tmp_path / path)
+    EmbeddingStore(full.files[:40], full.vectors[:40], precision).save(saved)
+    # within the stored int8 scale, so existing codes are kept as they are
+    limit = 0.9 * np.abs(full.vectors[:40]).max(axis=0)
+    new = np.clip(full.vectors[40:], -limit, limit)
+    EmbeddingStore(full.files[40:], new).save(str(tmp_path / 'new.npy'))
+    table = str(tmp_path / 'table.npz')
+    gallery.main(['build', '--store', saved, '--table', table, '--subjects', *full.files[:40:4], '--k', str(K)])
+
+    gallery.main(['insert', '--table', table, '--new', str(tmp_path / 'new.npy'), '--store', saved])
+
+    grown = EmbeddingStore.load(saved)
+    assert grown.precision == precision
+    assert list(grown.files) == list(full.files)
+    original = EmbeddingStore(full.files[:40], full.vectors[:40], precision)
+    assert np.array_equal(np.asarray(grown.vectors)[:40], np.asarray(original.vectors))
+    assert np.asarray(grown.vectors)[40:] == pytest.approx(new, abs=0.02)
+
+
+# new int8 vectors outside the stored scale re-encode the store rather than clip
+def test_int8_append_outside_the_scale():
+    full = store()
+    quantized = EmbeddingStore(full.files[:40], full.vectors[:40], 'int8')
+    inside = quantized.appended(EmbeddingStore(full.files[40:41], full.vectors[:1] * 0.5))
+    assert np.array_equal(inside.vectors.scale, quantized.vectors.scale)
+    outside = quantized.appended(EmbeddingStore(full.files[40:41], full.vectors[:1] * 10))
+    assert outside.precision == 'int8'
+    assert (outside.vectors.scale > quantized.vectors.scale).any()
+    assert np.asarray(outside.vectors)[40] == pytest.approx(full.vectors[0] * 10, rel=0.02, abs=0.05)
@@ -0,0 +1,80 @@
+import json
+import numpy as np
+import pytest
+import groups
+
+
+THRESHOLDS = np.round(np.arange(15) * 0.1, 1)
+
+
+# pooled over the group's subjects, one pair at a time
+def brute_force(registry, labels, group, threshold):
+    rows = [i for i, label in enumerate(labels) if label == group]
+    accepted = registry.similarity[rows] >= threshold
+    valid, match = registry.valid[rows], registry.match[rows]
+    impostors, genuine = valid & ~match, valid & match
+    return (accepted & impostors).sum() / impostors.sum(), (~accepted & genuine).sum() / genuine.sum()
+
+
+def test_rates_match_brute_force(app):
+    metadata = groups.load_metadata('subjects.csv')
+    labels = groups.group_labels(app.registry, metadata)
+    result = groups.compute(app.registry, labels, THRESHOLDS[::-1])
+    assert result.thresholds.tolist() == THRESHOLDS.tolist()
+    assert result.groups == sorted(set(labels))
+    assert result.subjects.sum() == len(app.registry.values)
+    for g, group in enumerate(result.groups):
+        for t, threshold in enumerate(THRESHOLDS):
+            false_match, miss = brute_force(app.registry, labels, group, threshold)
+            assert result.false_match[t, g] == pytest.approx(false_match)
+            assert result.miss[t, g] == pytest.approx(miss)
+
+
+def test_labels_join_on_the_csv_path(app):
+    metadata = groups.load_metadata('subjects.csv')
+    assert groups.group_labels(app.registry, metadata, ['Gender'])[app.registry.position('LeBron_James.csv')] == 'male'
+    # subjects missing from the metadata, or a missing column, are unknown
+    metadata.pop('LeBron_James.csv')
+    labels = groups.group_labels(app.registry, metadata, ['Skin', 'Age'])
+    assert labels[app.registry.position('LeBron_James.csv')] == 'unknown unknown'
+    assert all(label.endswith(' unknown') for label in labels)
+
+
+def test_metadata_paths_are_relative_to_its_directory(tmp_path):
+    (tmp_path / 'subjects.csv').write_text('Subject,Csv,Gender,Skin\nA B,A_B.csv,female,darker\n')
+    metadata = groups.load_metadata(str(tmp_path / 'subjects.csv'))
+    assert list(metadata) == [str(tmp_path / 'A_B.csv')]
+    assert groups.load_metadata(str(tmp_path / 'missing.csv')) == {}
+
+
+def test_rates_are_cached(app):
+    metadata = groups.load_metadata('subjects.csv')
+    first = groups.rates(app.registry, metadata, THRESHOLDS)
+    assert groups.rates(app.registry, metadata, THRESHOLDS) is first
+    assert groups.rates(app.registry, metadata, THRESHOLDS, ['Gender']) is not first
+
+
+def test_points_and_figure(app):
+    rates = groups.rates(app.registry, groups.load_metadata('subjects.csv'), THRESHOLDS)
+    points = groups.points(rates)
+    json.dumps(points, allow_nan=False)
+    assert np.array(points['false_match']).shape == (len(THRESHOLDS), len(rates.groups))
+
+    figure = groups.figure(rates, 0.7)
+    json.dumps(figure, allow_nan=False)
+    assert [trace['name'] for trace in figure['data']] == ['false match rate', 'miss rate']
+    assert figure['data'][0]['x'] == ['{} ({})'.format(g, n) for g, n in zip(rates.groups, rates.subjects)]
+    assert figure['data'][0]['y'] == points['false_match'][7]
+
+
+def test_no_metadata():
+    assert groups.points(None) is None
+    figure = groups.figure(None)
+    assert figure['data'] == [] and 'no group metadata' in figure['layout']['annotations'][0]['text']
+
+
+def test_frame(app):
+    rates = groups.rates(app.registry, groups.load_metadata('subjects.csv'), THRESHOLDS)
+    frame = rates.frame()
+    assert list(frame.columns.levels[0]) == ['false_match', 'miss']
+    assert frame.shape == (len(THRESHOLDS), 2 * len(rates.groups))
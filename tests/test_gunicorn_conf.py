@@ -0,0 +1,104 @@
+import importlib.util
+import os
+import threading
+import pytest
+import loadtest
+from conftest import ROOT
+
+MB = 1 << 20
+
+
+# gunicorn.conf.py isn't an importable name; executed fresh so it reads the environment as it is
+def load_config():
+    spec = importlib.util.spec_from_file_location('gunicorn_conf', os.path.join(ROOT, 'gunicorn.conf.py'))
+    config = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(config)
+    return config
+
+
+@pytest.fixture
+def config(monkeypatch):
+    for name in ('WEB_CONCURRENCY', 'GUNICORN_WORKER_CLASS', 'GUNICORN_THREADS', 'GUNICORN_MAX_REQUESTS',
+                 'GUNICORN_MAX_REQUESTS_JITTER', 'APP_MEMORY_MB', 'WORKER_MEMORY_MB'):
+        monkeypatch.delenv(name, raising=False)
+    return load_config()
+
+
+def test_sizing_by_cpu(config):
+    # memory to spare: 2 * cpus + 1 workers, threads for 4 requests per cpu between them
+    assert config.sizing(4, memory=64 << 30) == (9, 2)
+    assert config.sizing(1, memory=64 << 30) == (3, 2)
+
+
+def test_sizing_by_memory(config):
+    assert config.sizing(4, memory=(config.APP_MEMORY_MB + 3 * config.WORKER_MEMORY_MB) * MB) == (3, 6)
+    # always at least one worker, however little memory is left
+    assert config.sizing(4, memory=10 * MB) == (1, 16)
+
+
+def test_threads_only_for_gthread(config):
+    assert config.sizing(4, memory=64 << 30, worker_class='sync') == (9, 1)
+    assert config.sizing(4, memory=64 << 30, worker_class='gevent') == (9, 1)
+
+
+def test_web_concurrency_overrides(config, monkeypatch):
+    monkeypatch.setenv('WEB_CONCURRENCY', '5')
+    assert config.sizing(4, memory=10 * MB) == (5, 4)
+
+
+def test_settings_from_the_environment(config, monkeypatch):
+    assert config.preload_app and config.worker_class == 'gthread'
+    assert config.max_requests == 1000 and config.max_requests_jitter == 100
+    assert config.cpus() >= 1
+    monkeypatch.setenv('GUNICORN_WORKER_CLASS', 'sync')
+    monkeypatch.setenv('GUNICORN_MAX_REQUESTS', '200')
+    monkeypatch.setenv('WEB_CONCURRENCY', '2')
+    config = load_config()
+    assert (config.worker_class, config.workers, config.threads) == ('sync', 2, 1)
+    assert config.max_requests_jitter == 20
+    monkeypatch.setenv('GUNICORN_THREADS', '8')
+    assert load_config().threads == 8
+
+
+def test_parse_output():
+    assert loadtest.parse_output('tiles.children') == ([{'id': 'tiles', 'property': 'children'}], False)
+    specs, multi = loadtest.parse_output('..celeb.src...threshold-slider.max..')
+    assert multi and specs == [{'id': 'celeb', 'property': 'src'}, {'id': 'threshold-slider', 'property': 'max'}]
+    specs, _ = loadtest.parse_output('{"index":["ALL"],"type":"tile-img"}.style')
+    assert specs == [{'id': {'index': ['ALL'], 'type': 'tile-img'}, 'property': 'style'}]
+
+
+def test_callback_expands_all_to_the_ids_on_the_page():
+    callback = loadtest.Callback({'output': '{"index":["ALL"],"type":"tile-img"}.style',
+                                  'inputs': [{'id': 'threshold', 'property': 'children'}], 'state': []})
+    ids = {}
+    for i in (1, 0):
+        for kind in ('tile', 'tile-img'):
+            ids[loadtest.id_key({'type': kind, 'index': i})] = {'type': kind, 'index': i}
+    body = callback.body({('threshold', 'children'): 0.5}, ids, {('threshold', 'children'), ('other', 'value')})
+    assert body['outputs'] == [{'id': {'type': 'tile-img', 'index': 0}, 'property': 'style'},
+                               {'id': {'type': 'tile-img', 'index': 1}, 'property': 'style'}]
+    assert body['inputs'] == [{'id': 'threshold', 'property': 'children', 'value': 0.5}]
+    assert body['changedPropIds'] == ['threshold.children']
+
+
+def test_percentile():
+    assert loadtest.percentile([], 0.5) is None
+    assert loadtest.percentile([3, 1, 2, 4], 0.5) == 3
+    assert loadtest.percentile(range(100), 0.99) == 99
+
+
+# the callback mix, replayed against the app on a real socket
+def test_loadtest_runs_against_the_app(app):
+    from werkzeug.serving import make_server
+
+    server = make_server('127.0.0.1', 0, app.server, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        result = loadtest.run('http://127.0.0.1:{}'.format(server.server_port), seconds=1, concurrency=2)
+    finally:
+        server.shutdown()
+    assert result['requests'] > 0 and result['errors'] == 0
+    # callbacks are named for their first output: the subject's, and the tiles' restyle
+    assert {'/_dash-layout', 'celeb.src', '{"index":["ALL"],"type":"tile-img"}.style'} <= set(result['callbacks'])
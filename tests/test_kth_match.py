@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+import pytest
+from embeddings import EmbeddingStore
+from kth_match import KthMatchEngine, main
+
+
+# people with 1 to 4 images each
+def store(people=20, dim=8, seed=0):
+    rng = np.random.default_rng(seed)
+    files = ['Person_{}_{:04d}.jpg'.format(p, i + 1) for p in range(people) for i in range(p % 4 + 1)]
+    return EmbeddingStore(files, rng.normal(size=(len(files), dim)).astype(np.float32))
+
+
+# every subject's impostor differences, closest first, skipping all of its person's images
+def brute_force(s, subjects):
+    v = s.vectors.astype(np.float64)
+    result = []
+    for subject in subjects:
+        row = s.index_of(subject)
+        distances = ((v - v[row]) ** 2).sum(axis=1)
+        result.append(np.sort(distances[s.names != s.names[row]]))
+    return result
+
+
+def test_kth_matches_brute_force():
+    s = store()
+    engine = KthMatchEngine(s, block_size=7)
+    expected = brute_force(s, engine.subjects)
+    for k in (1, 3, 11):
+        index, differences = engine.kth(k)
+        assert differences == pytest.approx([e[k - 1] for e in expected], abs=1e-4)
+        assert all(s.names[i] != s.names[row] for i, row in zip(index, engine.rows))
+
+
+def test_depth_grows_only_when_needed():
+    engine = KthMatchEngine(store())
+    engine.kth(3)
+    assert engine.depth == 3
+    engine.kth(2)
+    assert engine.depth == 3
+    engine.kth(4)
+    assert engine.depth == 6
+    engine.kth(20)
+    assert engine.depth == 20
+
+
+def test_fewer_impostors_than_k():
+    s = store(people=3)
+    engine = KthMatchEngine(s)
+    index, differences = engine.kth(len(s))
+    # no subject has every image as an impostor
+    assert (index == -1).all() and np.isinf(differences).all()
+    assert engine.frame(len(s))['{}th match'.format(len(s))].tolist() == ['', '', '']
+    with pytest.raises(ValueError, match='larger than the gallery'):
+        engine.kth(len(s) + 1)
+
+
+def test_frame_follows_11th_match_csv():
+    s = store()
+    engine = KthMatchEngine(s)
+    frame = engine.frame(11)
+    assert list(frame.columns) == ['Subject', '11th match', 'Dif score']
+    assert frame['Subject'].tolist() == ['Person {}'.format(p) for p in range(20)]
+    index, differences = engine.kth(11)
+    assert frame['11th match'].tolist() == s.names[index].tolist()
+    assert frame['Dif score'].tolist() == np.round(differences.astype(np.float64), 3).tolist()
+    assert engine.frame(11) is frame
+    assert list(engine.frame(2).columns)[1] == '2nd match'
+
+
+def test_curve():
+    s = store()
+    engine = KthMatchEngine(s, subjects=['Person_3_0002.jpg', 'Person_7_0001.jpg'])
+    curve = engine.curve([1, 2, 5])
+    assert list(curve.columns) == ['Subject', '1st', '2nd', '5th']
+    assert curve['Subject'].tolist() == ['Person 3', 'Person 7']
+    expected = brute_force(s, engine.subjects)
+    assert curve[['1st', '2nd', '5th']].to_numpy() == pytest.approx(np.array([e[[0, 1, 4]] for e in expected]), abs=1e-3)
+    # impostors only ever close in further away
+    assert (np.diff(curve[['1st', '2nd', '5th']].to_numpy(), axis=1) >= 0).all()
+
+
+@pytest.mark.parametrize('k', [0, -2])
+def test_k_below_one_is_rejected(k):
+    engine = KthMatchEngine(store())
+    for ask in (engine.kth, engine.frame, engine.impostors, lambda k: engine.curve([1, k])):
+        with pytest.raises(ValueError, match='at least 1'):
+            ask(k)
+
+
+def test_cli(tmp_path, capsys):
+    store().save(str(tmp_path / 'store.npy'))
+    main(['--store', str(tmp_path / 'store.npy'), '--k', '4', '--out', str(tmp_path / 'kth.csv')])
+    assert 'wrote 20 subjects' in capsys.readouterr().out
+    assert list(pd.read_csv(tmp_path / 'kth.csv').columns) == ['Subject', '4th match', 'Dif score']
+    with pytest.raises(SystemExit):
+        main(['--store', str(tmp_path / 'store.npy'), '--k', '0', '--out', str(tmp_path / 'kth.csv')])
@@ -0,0 +1,75 @@
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+import memory
+
+HEADERS = {'X-Admin-Token': 'secret'}
+
+
+def test_deep_size_counts_buffers_once():
+    array = np.zeros(1000)
+    assert memory.deep_size(array) == sys.getsizeof(array) + 8000
+    # a view is sized by its base, whose buffer is counted once however often it's reached
+    view = array[10:]
+    assert memory.deep_size(view) == sys.getsizeof(view) + memory.deep_size(array)
+    assert memory.deep_size([array, view, array]) == sys.getsizeof([array, view, array]) + memory.deep_size(view)
+    nested = {'a': [b'x' * 1000, (b'y' * 500,)]}
+    assert memory.deep_size(nested) > 1500
+
+
+def test_deep_size_of_objects_and_frames():
+    class Holder:
+        def __init__(self):
+            self.array = np.zeros(256, dtype=np.float32)
+
+    assert memory.deep_size(Holder()) > 1024
+    frame = pd.DataFrame({'a': np.arange(1000), 'b': ['x'] * 1000})
+    assert memory.deep_size(frame) == int(frame.memory_usage(deep=True).sum())
+
+
+def test_sizes_are_largest_first():
+    measured = memory.sizes({'small': [1], 'large': np.zeros(10000), 'medium': np.zeros(100)})
+    assert list(measured) == ['large', 'medium', 'small']
+
+
+def test_snapshots_diff_against_the_last():
+    memory.stop()
+    try:
+        first = memory.snapshot(top=5)
+        assert first['diff'] is False and len(first['top']) <= 5
+        held = [bytearray(1 << 16) for _ in range(64)]
+        second = memory.snapshot(top=5)
+        assert second['snapshot'] == first['snapshot'] + 1 and second['diff'] is True
+        assert second['top'][0]['size_diff'] >= 1 << 20
+        assert memory.tracing()['tracing']
+        del held
+    finally:
+        memory.stop()
+    assert memory.tracing()['tracing'] is False
+
+
+# the admin routes don't exist without ADMIN_TOKEN, or with the wrong header
+@pytest.mark.parametrize('path', ['/admin/memory', '/admin/startup', '/admin/profile'])
+def test_admin_routes_need_the_token(client, monkeypatch, path):
+    monkeypatch.delenv('ADMIN_TOKEN', raising=False)
+    assert client.get(path, headers=HEADERS).status_code == 404
+    monkeypatch.setenv('ADMIN_TOKEN', 'secret')
+    assert client.get(path).status_code == 404
+    assert client.get(path, headers={'X-Admin-Token': 'wrong'}).status_code == 404
+    assert client.get(path, headers=HEADERS).status_code == 200
+
+
+def test_admin_memory(app, client, monkeypatch):
+    monkeypatch.setenv('ADMIN_TOKEN', 'secret')
+    body = client.get('/admin/memory', headers=HEADERS).get_json()
+    assert set(body['structures']) == set(app.memory_structures())
+    assert body['structures']['registry arrays'] >= sum(a.nbytes for a in (app.registry.similarity, app.registry.difference))
+    assert body['process']['rss'] > 0
+
+    try:
+        assert client.post('/admin/memory/snapshot?top=3', headers=HEADERS).get_json()['diff'] is False
+        assert client.post('/admin/memory/snapshot?group_by=module', headers=HEADERS).status_code == 400
+        assert client.post('/admin/memory/snapshot?top=many', headers=HEADERS).status_code == 400
+    finally:
+        assert client.delete('/admin/memory/snapshot', headers=HEADERS).get_json()['tracing'] is False
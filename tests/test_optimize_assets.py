@@ -0,0 +1,75 @@
+import io
+import os
+import shutil
+import pytest
+import optimize_assets
+from conftest import ROOT
+
+
+@pytest.fixture
+def src(tmp_path):
+    from PIL import Image
+
+    src = tmp_path / 'assets'
+    src.mkdir()
+    # a gradient saved unoptimized at high quality, so re-encoding has room to shrink it
+    image = Image.linear_gradient('L').convert('RGB').resize((300, 300))
+    image.save(src / 'face.jpg', 'JPEG', quality=95)
+    shutil.copy(os.path.join(ROOT, 'assets', 'apercu-light.ttf'), src / 'apercu-light.ttf')
+    (src / 'style.css').write_text('body { margin: 0; }\n')
+    (src / 'csv_plan.jpeg').write_bytes((src / 'face.jpg').read_bytes())
+    (src / '.hidden').write_text('x')
+    return src
+
+
+@pytest.mark.parametrize('text, size', [('1500000', 1500000), ('900KB', 900 * 1024), ('1.5MB', int(1.5 * 1024 * 1024)),
+                                        (' 2mb ', 2 * 1024 * 1024), ('10B', 10)])
+def test_parse_size(text, size):
+    assert optimize_assets.parse_size(text) == size
+
+
+def test_build(src, tmp_path):
+    out = tmp_path / 'out'
+    report = {name: (before, after) for name, before, after in optimize_assets.build(str(src), str(out))}
+
+    assert sorted(os.listdir(out)) == ['apercu-light.woff2', 'face.jpg', 'fonts.css', 'style.css']
+    before, after = report['face.jpg']
+    assert before == os.path.getsize(src / 'face.jpg') and after == os.path.getsize(out / 'face.jpg') <= before
+    before, after = report['apercu-light.ttf -> apercu-light.woff2']
+    assert after < before
+    assert report['style.css'] == (20, 20)
+    # the generated stylesheet has no original
+    assert report['fonts.css'][0] is None
+    assert "font-family: apercu;" in (out / 'fonts.css').read_text()
+
+
+def test_images_are_readable_after(src, tmp_path):
+    from PIL import Image
+
+    optimize_assets.build(str(src), str(tmp_path / 'out'))
+    assert Image.open(tmp_path / 'out' / 'face.jpg').size == (300, 300)
+    assert max(Image.open(io.BytesIO(optimize_assets.optimize_image(str(src / 'face.jpg'), 100))).size) == 100
+
+
+def test_report_and_budget(src, tmp_path, capsys):
+    report = optimize_assets.build(str(src), str(tmp_path / 'out'))
+    total = sum(after for _, _, after in report)
+    assert optimize_assets.print_report(report, total)
+    assert not optimize_assets.print_report(report, total - 1)
+    lines = capsys.readouterr().out.splitlines()
+    assert any(line.startswith('fonts.css') and line.endswith('new') for line in lines)
+    assert lines[-1] == 'budget {:,} bytes, OVER by 1 bytes'.format(total - 1)
+
+
+def test_main_exit_code(src, tmp_path):
+    out = str(tmp_path / 'out')
+    assert optimize_assets.main(['--src', str(src), '--out', out, '--budget', '10MB']) == 0
+    assert optimize_assets.main(['--src', str(src), '--out', out, '--budget', '1KB']) == 1
+    assert optimize_assets.main(['--src', str(src), '--out', str(tmp_path / 'all'), '--exclude']) == 0
+    assert 'csv_plan.jpeg' in os.listdir(tmp_path / 'all')
+
+
+# the shipped assets fit the default budget
+def test_shipped_assets_meet_the_default_budget(tmp_path, monkeypatch):
+    monkeypatch.delenv('ASSET_BUDGET', raising=False)
+    assert optimize_assets.main(['--src', os.path.join(ROOT, 'assets'), '--out', str(tmp_path / 'out')]) == 0
@@ -0,0 +1,32 @@
+from conftest import dash_callback
+
+
+def images(app, value):
+    i = app.registry.position(value)
+    return [app.registry.subject_files[i]] + app.registry.files[i]
+
+
+# the subjects on either side of the current radio option, i.e. the likely next click
+def test_neighbours_of_a_middle_subject(app):
+    values = [option['value'] for option in app.SUBJECT_OPTIONS]
+    assert app.prefetch_urls(values[3]) == images(app, values[2]) + images(app, values[4])
+
+
+def test_ends_of_the_list_have_one_neighbour(app):
+    values = [option['value'] for option in app.SUBJECT_OPTIONS]
+    assert app.prefetch_urls(values[0]) == images(app, values[1])
+    assert app.prefetch_urls(values[-1]) == images(app, values[-2])
+
+
+def test_unknown_subject_prefetches_nothing(app):
+    assert app.prefetch_urls('Nobody.csv') == []
+
+
+def test_subject_callback_returns_the_urls(app, client):
+    status, payload = dash_callback(client, 'prefetch_urls.children', {('subject_options', 'value'): 'Paris_Hilton.csv'})
+    assert status == 200
+    urls = payload['response']['prefetch_urls']['children']
+    assert urls == app.prefetch_urls('Paris_Hilton.csv')
+    assert all(url.startswith('/assets/') for url in urls)
+    # every url the page will be told to prefetch is served
+    assert all(client.get(url).status_code == 200 for url in urls)
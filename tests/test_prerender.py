@@ -0,0 +1,49 @@
+import dash_core_components as dcc
+import dash_html_components as html
+import pytest
+import prerender
+from conftest import run_app
+
+
+def test_render_html():
+    tree = html.Div([
+        html.H3('Purpose: ', id='purpose', style={'font-weight': 'bold', 'fontFamily': 'Monaco'}),
+        html.P(['1 < 2 & ', html.A('link', href='/a?b=1&c="2"')], className='lede'),
+        html.Img(src='/assets/x.jpg', alt='x'),
+        None,
+    ])
+    assert prerender.render_html(tree) == (
+        '<div>'
+        '<h3 id="purpose" style="font-weight: bold; font-family: Monaco">Purpose: </h3>'
+        '<p class="lede">1 &lt; 2 &amp; <a href="/a?b=1&amp;c=&quot;2&quot;">link</a></p>'
+        '<img alt="x" src="/assets/x.jpg">'
+        '</div>')
+
+
+def test_only_static_html_components():
+    with pytest.raises(ValueError):
+        prerender.render_html(html.Div(dcc.Slider(id='slider')))
+
+
+def test_index_with_static():
+    index = prerender.index_with_static('<body>{%app_entry%}<footer>{%app_entry%}</footer></body>', '<p>hi</p>')
+    assert index == '<body><div id="static"><p>hi</p></div>\n        {%app_entry%}<footer>{%app_entry%}</footer></body>'
+
+
+# the intro is in the index page and left out of the layout the renderer builds
+def test_intro_is_in_the_page_not_the_layout(app, client):
+    page = client.get('/').get_data(as_text=True)
+    layout = client.get('/_dash-layout').get_data(as_text=True)
+    assert page.index('<div id="static">') < page.index('id="react-entry-point"')
+    assert 'id="purpose"' in page and '"purpose"' not in layout
+    assert '"subject_options"' in layout
+
+
+def test_prerender_can_be_turned_off():
+    result = run_app('''
+import json, dash_skeleton
+client = dash_skeleton.server.test_client()
+print(json.dumps(['id="static"' in client.get('/').get_data(as_text=True),
+                  '"purpose"' in client.get('/_dash-layout').get_data(as_text=True)]))
+''', PRERENDER_INTRO='0')
+    assert result == [False, True]
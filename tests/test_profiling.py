@@ -0,0 +1,85 @@
+import multiprocessing
+import os
+import time
+import pytest
+import profiling
+from conftest import dash_callback
+
+
+def busy():
+    time.sleep(0.002)
+
+
+def work():
+    busy()
+    return len([i for i in range(100)])
+
+
+def name(function):
+    return '{} (test_profiling.py:{})'.format(function.__name__, function.__code__.co_firstlineno)
+
+
+def test_tracer_charges_whole_stacks():
+    with profiling.Tracer('root') as tracer:
+        work()
+    stacks = tracer.collapsed()
+    sleeping = 'root;{};{};time.sleep'.format(name(work), name(busy))
+    assert sleeping in stacks
+    # the sleep is nearly all the time traced, and charged to that stack alone
+    assert stacks[sleeping] >= 1500
+    assert stacks[sleeping] > sum(stacks.values()) / 2
+
+
+def test_filename():
+    assert profiling.filename('mismatch_title.children') == 'mismatch_title.children'
+    assert profiling.filename('..subject1_mismatches.children...subject2_mismatches.children..') == 'subject1_mismatches.children+1'
+    assert profiling.filename('{"index":["ALL"],"type":"tile-img"}.style') == 'index_ALL_type_tile-img_.style'
+
+
+def test_arming_counts_down():
+    profiler = profiling.Profiler()
+    assert not profiler.take()
+    profiler.arm(2)
+    assert [profiler.take() for _ in range(3)] == [True, True, False]
+    profiler.arm(-1)
+    assert profiler.remaining == 0
+
+
+def _take(profiler, results):
+    results.put(profiler.take())
+
+
+# the count lives in shared memory, so forked workers draw from the same budget
+def test_forked_workers_share_the_count():
+    context = multiprocessing.get_context('fork')
+    profiler = profiling.Profiler()
+    profiler.arm(2)
+    results = context.Queue()
+    workers = [context.Process(target=_take, args=(profiler, results)) for _ in range(3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(10)
+    assert sorted(results.get(timeout=5) for _ in workers) == [False, True, True]
+    assert profiler.remaining == 0
+
+
+def test_admin_endpoint_profiles_the_next_callbacks(app, client, monkeypatch, tmp_path):
+    headers = {'X-Admin-Token': 'secret'}
+    assert client.post('/admin/profile?requests=1').status_code == 404
+    monkeypatch.setenv('ADMIN_TOKEN', 'secret')
+    monkeypatch.setattr(app.profiler, 'directory', str(tmp_path))
+    client.delete('/admin/profile', headers=headers)
+    assert client.post('/admin/profile?requests=x', headers=headers).status_code == 400
+    assert client.post('/admin/profile?requests=1', headers=headers).get_json()['remaining'] == 1
+
+    assert dash_callback(client, 'mismatch_title.children', {('threshold', 'children'): 0.7})[0] == 200
+    assert dash_callback(client, 'mismatch_title.children', {('threshold', 'children'): 0.8})[0] == 200
+
+    status = client.get('/admin/profile', headers=headers).get_json()
+    assert status['remaining'] == 0 and status['pid'] == os.getpid()
+    profiled = status['callbacks']['mismatch_title.children']
+    assert profiled['requests'] == 1
+    lines = (tmp_path / profiled['file']).read_text().splitlines()
+    assert lines and all(line.rsplit(' ', 1)[1].isdigit() for line in lines)
+    client.delete('/admin/profile', headers=headers)
@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+import precision_report
+from embeddings import EmbeddingStore, QuantizedVectors, distance_blocks, top_k_many
+
+
+def vectors(n=300, dim=16, seed=0):
+    v = np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+    return v / np.linalg.norm(v, axis=1, keepdims=True)
+
+
+def store(precision='float32'):
+    v = vectors()
+    return EmbeddingStore(['face{}_0001.jpg'.format(i) for i in range(len(v))], v, precision)
+
+
+def test_float16_is_within_half_precision():
+    v = vectors()
+    q = QuantizedVectors.encode(v, 'float16')
+    assert q.precision == 'float16' and q.scale is None and q.nbytes == v.nbytes // 2
+    # float16 keeps 11 significant bits
+    assert np.abs(np.asarray(q) - v).max() <= np.abs(v).max() * 2 ** -11
+
+
+def test_int8_is_within_half_a_step():
+    v = vectors()
+    q = QuantizedVectors.encode(v, 'int8')
+    assert q.codes.dtype == np.int8 and q.scale.shape == (v.shape[1],)
+    assert q.scale == pytest.approx(np.abs(v).max(axis=0) / 127)
+    assert (np.abs(np.asarray(q) - v) <= q.scale / 2 + 1e-7).all()
+    # each dimension's largest magnitude lands on the ends of the code range
+    assert (np.abs(q.codes).max(axis=0) == 127).all()
+
+
+def test_int8_zero_dimension_decodes_to_zero():
+    v = vectors()
+    v[:, 3] = 0
+    q = QuantizedVectors.encode(v, 'int8')
+    assert q.scale[3] == 1 and not np.asarray(q)[:, 3].any()
+
+
+def test_unknown_precision():
+    with pytest.raises(ValueError):
+        QuantizedVectors.encode(vectors(), 'float8')
+
+
+@pytest.mark.parametrize('precision', ['float16', 'int8'])
+def test_distances_match_the_decoded_gallery(precision, monkeypatch):
+    # gallery blocks smaller than the gallery, so dot() stitches several together
+    monkeypatch.setattr('embeddings.GALLERY_BLOCK_SIZE', 64)
+    q = QuantizedVectors.encode(vectors(), precision)
+    decoded = np.asarray(q)
+    queries = vectors(20, seed=1)
+    assert q.dot(queries) == pytest.approx(queries @ decoded.T, abs=1e-5)
+    assert q.squared_norms() == pytest.approx(np.einsum('ij,ij->i', decoded, decoded), abs=1e-5)
+    (_, quantized), = distance_blocks(queries, q)
+    (_, full), = distance_blocks(queries, decoded)
+    assert quantized == pytest.approx(full, abs=1e-5)
+
+
+@pytest.mark.parametrize('precision, path', [('float16', 'store.npy'), ('int8', 'store.npz')])
+def test_quantized_store_round_trip(precision, path, tmp_path):
+    s = store(precision)
+    s.save(str(tmp_path / path))
+    loaded = EmbeddingStore.load(str(tmp_path / path))
+    assert loaded.precision == precision
+    assert np.array_equal(loaded.vectors.codes, s.vectors.codes)
+    assert np.array_equal(np.asarray(loaded.vectors), np.asarray(s.vectors))
+
+
+def test_int8_needs_npz(tmp_path):
+    with pytest.raises(ValueError, match='npz'):
+        store('int8').save(str(tmp_path / 'store.npy'))
+
+
+def test_quantized_candidates_are_close_to_full_precision():
+    full = store()
+    subjects = list(full.files[:50])
+    _, expected = top_k_many(full, subjects, 8)
+    for precision in ('float16', 'int8'):
+        _, differences = top_k_many(full.quantized(precision), subjects, 8)
+        assert differences == pytest.approx(expected, abs=0.05)
+
+
+def test_precision_report(capsys):
+    s = store()
+    subjects = list(s.files[:40])
+    results = [precision_report.compare(s, subjects, p) for p in ('float32', 'float16', 'int8')]
+    exact, half, int8 = results
+    assert exact['max_error'] == 0 and exact['changed_lists'] == 0 and not any(exact['flips'])
+    assert exact['bytes'] == 2 * half['bytes']
+    assert 0 <= half['max_error'] <= int8['max_error'] < 0.05
+    assert len(int8['flips']) == len(precision_report.THRESHOLDS)
+    precision_report.print_report(s, subjects, results)
+    out = capsys.readouterr().out
+    assert out.startswith('300 gallery faces x 16 dims, 40 subjects')
+    assert 'out of 320 subject/candidate pairs' in out
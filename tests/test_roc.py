@@ -0,0 +1,75 @@
+import json
+from statistics import NormalDist
+import numpy as np
+import pytest
+import roc
+
+
+def sample(n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    match = rng.random(n) < 0.2
+    # rounded like the csvs, so many scores tie
+    similarity = np.round(np.where(match, rng.normal(1.0, 0.2, n), rng.normal(0.6, 0.2, n)), 2)
+    return similarity, match
+
+
+def test_rates_match_brute_force():
+    similarity, match = sample()
+    curve = roc.compute(similarity, match)
+    assert curve.thresholds[0] == np.inf and curve.fpr[0] == curve.tpr[0] == 0
+    assert curve.fpr[-1] == curve.tpr[-1] == 1
+    assert curve.thresholds[1:].tolist() == sorted(set(similarity), reverse=True)
+    for t, fpr, tpr in zip(curve.thresholds, curve.fpr, curve.tpr):
+        accepted = similarity >= t
+        assert fpr == pytest.approx((accepted & ~match).sum() / (~match).sum())
+        assert tpr == pytest.approx((accepted & match).sum() / match.sum())
+    assert curve.fnr == pytest.approx(1 - curve.tpr)
+
+
+def test_point_is_the_operating_threshold():
+    curve = roc.compute([0.9, 0.5, 0.5, 0.1], [True, True, False, False])
+    assert curve.thresholds.tolist() == [np.inf, 0.9, 0.5, 0.1]
+    assert [curve.point(t) for t in (2.0, 0.9, 0.7, 0.5, 0.3, 0.1, 0.0)] == [0, 1, 1, 2, 2, 3, 3]
+    assert curve.tpr[curve.point(0.5)] == 1 and curve.fpr[curve.point(0.5)] == 0.5
+
+
+def test_one_class_stays_finite():
+    curve = roc.compute([0.9, 0.4], [True, True])
+    assert curve.fpr.tolist() == [0, 0, 0] and curve.tpr.tolist() == [0, 0.5, 1]
+
+
+def test_det_is_clipped_probit():
+    curve = roc.compute([0.9, 0.5, 0.5, 0.1], [True, True, False, False])
+    x, y = curve.det()
+    assert x[0] == round(NormalDist().inv_cdf(roc.DET_CLIP), 4)
+    assert y[0] == round(NormalDist().inv_cdf(1 - roc.DET_CLIP), 4)
+    assert x[2] == 0 and np.isfinite(x).all() and np.isfinite(y).all()
+
+
+def test_curve_is_cached_per_version(app):
+    curve = roc.curve(app.registry)
+    assert roc.curve(app.registry) is curve is roc._curves[app.registry.version]
+    valid = app.registry.valid
+    assert curve.tpr[-1] == 1 and len(curve.thresholds) <= valid.sum() + 1
+
+
+def test_points_and_figure_are_json(app):
+    curve = roc.curve(app.registry)
+    points = roc.points(curve)
+    assert points['thresholds'][0] == 1e9
+    assert len({len(v) for v in points.values()}) == 1
+    json.dumps(points, allow_nan=False)
+
+    figure = roc.figure(curve, 1.0)
+    json.dumps(figure, allow_nan=False)
+    assert [trace['name'] for trace in figure['data']] == ['ROC', 'DET', 'threshold', 'threshold']
+    i = curve.point(1.0)
+    assert figure['data'][2]['x'] == [curve.fpr[i]] and figure['data'][2]['y'] == [curve.tpr[i]]
+    assert figure['data'][3]['x'] == [points['det_x'][i]] and figure['data'][3]['y'] == [points['det_y'][i]]
+
+
+def test_page_ships_the_curve(app, client):
+    layout = client.get('/_dash-layout').get_data(as_text=True)
+    assert '"roc-graph"' in layout and '"roc_points"' in layout
+    dependencies = client.get('/_dash-dependencies').get_json()
+    assert any((d.get('clientside_function') or {}).get('namespace') == 'roc' for d in dependencies)
@@ -0,0 +1,93 @@
+import glob
+import os
+import numpy as np
+import pandas as pd
+import pytest
+import scores
+from conftest import ROOT, run_app
+
+LEBRON = os.path.join(ROOT, 'LeBron_James.csv')
+SHIPPED = sorted(f for f in glob.glob(os.path.join(ROOT, '*.csv')) if os.path.basename(f) not in scores.NOT_SUBJECTS)
+
+
+def registry():
+    return scores.ScoreRegistry([{'label': os.path.basename(f), 'value': f} for f in SHIPPED])
+
+
+# LeBron_James.csv ends lines with \r\n, the rest with a bare \r; both parse as pandas reads them
+@pytest.mark.parametrize('path', SHIPPED, ids=os.path.basename)
+def test_score_columns_read_like_pandas(path):
+    with open(path, 'rb') as f:
+        columns = scores.score_columns(f.read())
+    frame = pd.read_csv(path)
+    assert columns['names'] == frame['Name'].tolist()
+    assert columns['files'] == frame['File'].tolist()
+    assert columns['subject_file'] == frame['Subject_File'][0]
+    assert columns['match'] == frame['Match'].tolist()
+    assert np.array_equal(columns['similarity'], frame['Similarity'].to_numpy())
+    assert np.array_equal(columns['difference'], frame['Difference'].to_numpy())
+
+
+def test_registry_pads_shorter_csvs(tmp_path):
+    short = tmp_path / 'Short.csv'
+    short.write_text('Name,Difference,Similarity,File,Subject,Subject_File,Match\nA,0.2,1.3,/assets/a.jpg,S,/assets/s.jpg,TRUE\n')
+    r = scores.ScoreRegistry([{'label': 'LeBron James', 'value': LEBRON}, {'label': 'Short', 'value': str(short)}])
+    assert r.similarity.shape == (2, 8)
+    assert r.valid[1].tolist() == [True] + [False] * 7
+    assert np.isnan(r.similarity[1, 1:]).all() and not r.match[1, 1:].any()
+    assert r.impostors.tolist() == [7, 0]
+    assert r.ids == ['LeBron_James.csv', 'Short.csv'] and r.find('Short.csv') == 1 and r.find('x') is None
+
+
+def test_frame_cache_is_a_bounded_lru(monkeypatch):
+    monkeypatch.setattr(scores, 'FRAME_CACHE', 2)
+    r = registry()
+    first = r.frame(r.values[0])
+    r.frame(r.values[1])
+    assert r.frame(r.values[0]) is first
+    r.frame(r.values[2])
+    assert list(r.frames) == [r.values[0], r.values[2]]
+    with pytest.raises(KeyError):
+        r.frame('Nobody.csv')
+
+
+def test_version_follows_the_contents(tmp_path):
+    copy = tmp_path / 'LeBron_James.csv'
+    copy.write_bytes(open(LEBRON, 'rb').read())
+    before = scores.ScoreRegistry([{'label': 'a', 'value': str(copy)}]).version
+    copy.write_bytes(copy.read_bytes().replace(b'0.681', b'0.682'))
+    assert scores.ScoreRegistry([{'label': 'a', 'value': str(copy)}]).version != before
+
+
+# the registry and the analyses built at import need no pandas; only a subject's frame does
+def test_import_path_leaves_pandas_unloaded():
+    loaded = run_app('''
+import json, os, sys
+import scores, roc, sweep, thresholds, groups, calibration, bootstrap
+options = [{'label': f, 'value': f} for f in sorted(os.listdir('.')) if f.endswith('.csv') and f != 'subjects.csv']
+registry = scores.ScoreRegistry(options)
+roc.curve(registry)
+calibration.curve(registry, 'platt')
+sweep.sweep(registry, [0.5])
+before = 'pandas' in sys.modules
+registry.frame(options[0]['value'])
+print(json.dumps([before, 'pandas' in sys.modules]))
+''')
+    assert loaded == [False, True]
+
+
+def test_layout_has_a_mismatch_line_per_subject(app, client):
+    layout = client.get('/_dash-layout').get_json()
+    stack, ids = [layout], []
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(reversed(node))
+        elif isinstance(node, dict) and 'props' in node:
+            if node['props'].get('id') == 'mismatches':
+                ids = [child['props']['id'] for child in node['props']['children']]
+            stack.append(node['props'].get('children'))
+    assert ids == ['subject{}_mismatches'.format(i + 1) for i in range(len(app.SUBJECT_OPTIONS))] + ['threshold_summary']
+    # adding them again changes nothing
+    app.add_mismatch_lines()
+    assert len(app.mismatches.children) == len(ids)
@@ -0,0 +1,67 @@
+import threading
+import time
+import pytest
+from singleflight import SingleFlight
+
+CALLERS = 8
+
+
+# starts CALLERS threads calling flight.do(key, fn) and holds fn until all of them have joined it
+def run_together(flight, key, fn):
+    release = threading.Event()
+    results, errors = [], []
+
+    def held():
+        release.wait(5)
+        return fn()
+
+    def call():
+        try:
+            results.append(flight.do(key, held))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(CALLERS)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while flight.shared < CALLERS - 1 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    return results, errors
+
+
+def test_identical_calls_run_once():
+    flight = SingleFlight()
+    runs = []
+    results, errors = run_together(flight, 'k', lambda: runs.append(1) or 'result')
+    assert len(runs) == 1
+    assert results == ['result'] * CALLERS and not errors
+    assert flight.shared == CALLERS - 1
+
+    # nothing is kept once the call returns
+    assert flight.do('k', lambda: 'again') == 'again'
+
+
+def test_every_waiter_gets_the_error():
+    flight = SingleFlight()
+    runs = []
+
+    def fail():
+        runs.append(1)
+        raise KeyError('boom')
+
+    results, errors = run_together(flight, 'k', fail)
+    assert len(runs) == 1
+    assert not results and len(errors) == CALLERS
+    assert all(isinstance(e, KeyError) for e in errors)
+
+
+def test_different_keys_run_separately():
+    flight = SingleFlight()
+    assert [flight.do(key, lambda key=key: key * 2) for key in 'ab'] == ['aa', 'bb']
+    with pytest.raises(ValueError):
+        flight.do('c', lambda: int('x'))
+    assert flight.shared == 0
@@ -0,0 +1,34 @@
+import json
+import os
+import numpy as np
+from conftest import ROOT
+from scores import ScoreRegistry
+from sweep import sweep
+
+
+# data/sweep_messages.json holds what the original subjectN_mismatches callbacks (a loop over
+# pd.read_csv(csv) with int(num_match / 7 * 100)) returned for each shipped csv at every slider
+# step; the vectorized sweep has to give the same string everywhere
+def test_messages_match_the_original_callbacks():
+    with open(os.path.join(ROOT, 'tests', 'data', 'sweep_messages.json')) as f:
+        expected = json.load(f)
+    csvs = list(expected['messages'])
+    registry = ScoreRegistry([{'label': c, 'value': os.path.join(ROOT, c)} for c in csvs])
+    thresholds = expected['thresholds']
+    assert thresholds == [round(i * 0.01, 2) for i in range(141)]
+
+    messages = sweep(registry, thresholds).messages()
+
+    assert messages.shape == (len(thresholds), len(csvs))
+    for j, c in enumerate(csvs):
+        for i, threshold in enumerate(thresholds):
+            assert messages[i, j] == expected['messages'][c][i], (c, threshold)
+
+
+def test_thresholds_in_any_order():
+    csvs = ['LeBron_James.csv', 'Paris_Hilton.csv']
+    registry = ScoreRegistry([{'label': c, 'value': os.path.join(ROOT, c)} for c in csvs])
+    thresholds = np.round(np.arange(141) * 0.01, 2)
+    shuffled = np.random.default_rng(0).permutation(thresholds)
+    order = np.argsort(shuffled)
+    assert (sweep(registry, shuffled).messages()[order] == sweep(registry, thresholds).messages()).all()
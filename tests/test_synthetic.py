@@ -0,0 +1,82 @@
+import csv
+import filecmp
+import os
+import pytest
+import scores
+import synthetic
+from conftest import run_app
+from embeddings import CANDIDATES, SIMILARITY_OFFSET
+
+SUBJECTS = 12
+
+FETCH = '''
+import json, dash_skeleton
+client = dash_skeleton.server.test_client()
+listed = client.get('/api/subjects').get_json()['subjects']
+first = client.get('/api/subjects/' + listed[0]['id'])
+nested = client.get('/api/subjects/' + listed[0]['value'].lstrip('/'))
+print(json.dumps({'listed': listed, 'status': first.status_code, 'type': first.mimetype, 'subject': first.get_json(),
+                  'nested': [nested.status_code, nested.mimetype]}))
+'''
+
+
+@pytest.fixture(scope='module')
+def dataset(tmp_path_factory):
+    out = str(tmp_path_factory.mktemp('synthetic'))
+    synthetic.generate(out, SUBJECTS, seed=3, images=False)
+    return out
+
+
+def read(path):
+    with open(path, newline='') as f:
+        return list(csv.DictReader(f))
+
+
+def test_same_seed_same_dataset(dataset, tmp_path):
+    synthetic.generate(str(tmp_path), SUBJECTS, seed=3, images=False)
+    names = sorted(f for f in os.listdir(dataset) if f.endswith('.csv'))
+    assert names == sorted(f for f in os.listdir(tmp_path) if f.endswith('.csv'))
+    assert all(filecmp.cmp(os.path.join(dataset, n), os.path.join(tmp_path, n), shallow=False) for n in names)
+
+
+def test_subject_csvs_follow_the_shipped_schema(dataset):
+    options = scores.directory_options(dataset)
+    assert len(options) == SUBJECTS
+    for option in options:
+        rows = read(option['value'])
+        assert list(rows[0]) == ['Name', 'Difference', 'Similarity', 'File', 'Subject', 'Subject_File', 'Match']
+        assert len(rows) == CANDIDATES
+        assert [r['Match'] for r in rows].count('TRUE') == 1
+        assert rows[0]['Subject'] == option['label'] and rows[0]['Subject_File'].startswith('/assets/')
+        differences = [float(r['Difference']) for r in rows]
+        # least similar first, Similarity = 1.5 - Difference
+        assert differences == sorted(differences, reverse=True)
+        assert all(abs(float(r['Similarity']) - (SIMILARITY_OFFSET - float(r['Difference']))) < 1e-3 for r in rows)
+
+
+# the summary's k-th match is never nearer than the impostors the csv keeps
+def test_kth_match_summary_agrees(dataset):
+    summary = {row['Subject']: float(row['Dif score']) for row in read(os.path.join(dataset, 'assets', '11th_match.csv'))}
+    for option in scores.directory_options(dataset):
+        impostors = [float(r['Difference']) for r in read(option['value']) if r['Match'] == 'FALSE']
+        assert summary[option['label']] >= max(impostors)
+
+
+# DATA_DIR option values are paths, so the api is keyed by the csv's file name instead
+def test_app_serves_a_data_dir_subject(dataset):
+    result = run_app(FETCH, DATA_DIR=dataset)
+    assert len(result['listed']) == SUBJECTS
+    first = result['listed'][0]
+    assert first['id'] == os.path.basename(first['value']) and os.path.isabs(first['value'])
+    assert result['status'] == 200 and result['type'] == 'application/json'
+    assert result['subject']['value'] == first['value']
+    assert len(result['subject']['candidates']) == CANDIDATES
+    assert result['nested'] == [404, 'application/json']
+
+
+def test_app_runs_without_subjects_csv(dataset, tmp_path):
+    for name in os.listdir(dataset):
+        if name.endswith('.csv') and name not in scores.NOT_SUBJECTS:
+            os.link(os.path.join(dataset, name), os.path.join(tmp_path, name))
+    result = run_app(FETCH, DATA_DIR=str(tmp_path))
+    assert len(result['listed']) == SUBJECTS and result['status'] == 200
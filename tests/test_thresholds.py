@@ -0,0 +1,59 @@
+import types
+import numpy as np
+import pytest
+import thresholds
+
+nan = np.nan
+
+# three subjects worked through by hand; the last has only two candidates (padded, as in the
+# registry). Reading each row from the highest threshold down (0.x01 being the candidate above
+# every score):
+#   row 0  fmr 0 0 1/4 1/2 3/4 1, miss 1 0 0 ...: a perfect split at 0.9
+#   row 1  at 0.901 0.9 0.8 0.7 0.6 0.5: fmr 0 1/3 1/3 2/3 1 1, miss 1 1 1/2 1/2 1/2 0; the
+#          fmr/miss gap is 1/6 at both 0.8 and 0.7 and ties go to the higher threshold
+#   row 2  fmr 0 0 1, miss 1 0 0: a perfect split at 0.7
+SIMILARITY = np.array([[0.9, 0.8, 0.6, 0.4, 0.2],
+                       [0.9, 0.8, 0.7, 0.6, 0.5],
+                       [0.7, 0.3, nan, nan, nan]])
+MATCH = np.array([[True, False, False, False, False],
+                  [False, True, False, False, True],
+                  [True, False, False, False, False]])
+VALID = ~np.isnan(SIMILARITY)
+
+
+def test_equal_error_rate():
+    solved = thresholds.solve(SIMILARITY, MATCH, VALID)
+    assert solved['eer_threshold'] == pytest.approx([0.9, 0.8, 0.7])
+    assert solved['eer'] == pytest.approx([0, 5 / 12, 0])
+    assert solved['highest_threshold'] == pytest.approx([0.9, 0.8, 0.7])
+
+
+def test_lowest_cost_threshold():
+    solved = thresholds.solve(SIMILARITY, MATCH, VALID)
+    assert solved['best_threshold'] == pytest.approx([0.9, 0.8, 0.7])
+    assert solved['best_fmr'] == pytest.approx([0, 1 / 3, 0])
+    assert solved['best_miss'] == pytest.approx([0, 1 / 2, 0])
+
+    # misses three times as costly: row 1 drops to 0.5, where nothing is missed
+    solved = thresholds.solve(SIMILARITY, MATCH, VALID, miss_cost=3)
+    assert solved['best_threshold'][1] == pytest.approx(0.5)
+    assert (solved['best_fmr'][1], solved['best_miss'][1]) == pytest.approx((1, 0))
+
+    # false matches three times as costly: row 1 rises above every score
+    solved = thresholds.solve(SIMILARITY, MATCH, VALID, false_match_cost=3)
+    assert solved['best_threshold'][1] == pytest.approx(0.901)
+    assert (solved['best_fmr'][1], solved['best_miss'][1]) == pytest.approx((0, 1))
+
+
+# pooled, the 4 genuine and 8 impostor scores have fmr 3/8 and miss 1/4 at 0.7, the closest
+# pair; the cost there (5/8) ties with 0.5 and the higher threshold wins
+def test_pooled_row():
+    registry = types.SimpleNamespace(version='test', values=['a.csv', 'b.csv', 'c.csv'], labels=['A', 'B', 'C'],
+                                     similarity=SIMILARITY, match=MATCH, valid=VALID)
+    table = thresholds.table(registry)
+    assert list(table['subject']) == ['A', 'B', 'C', 'All subjects']
+    pooled = table.loc['all']
+    assert pooled['eer_threshold'] == pytest.approx(0.7)
+    assert pooled['eer'] == pytest.approx(5 / 16)
+    assert pooled['best_threshold'] == pytest.approx(0.7)
+    assert pooled['highest_threshold'] == pytest.approx(0.7)
@@ -0,0 +1,66 @@
+import loadtest
+from conftest import dash_callback
+
+
+def subject(client, value):
+    status, payload = dash_callback(client, 'tiles.children', {('subject_options', 'value'): value})
+    assert status == 200
+    return payload['response']
+
+
+def test_one_tile_per_candidate(app, client):
+    for value in ('LeBron_James.csv', 'Katie_Couric.csv'):
+        response = subject(client, value)
+        i = app.registry.position(value)
+        tiles = response['tiles']['children']
+        assert [t['props']['id'] for t in tiles] == [{'type': 'tile', 'index': n} for n in range(len(app.registry.names[i]))]
+        assert [t['props']['className'] for t in tiles] == ['result'] * len(tiles)
+        images = [t['props']['children'][0]['props'] for t in tiles]
+        assert [image['id'] for image in images] == [{'type': 'tile-img', 'index': n} for n in range(len(tiles))]
+        assert [image['src'] for image in images] == app.registry.files[i]
+        assert [t['props']['children'][1]['props']['children'] for t in tiles] == app.registry.names[i]
+        assert response['celeb']['src'] == app.registry.subject_files[i]
+
+
+# the tiles come back already bordered for the threshold the page is at
+def test_new_tiles_have_the_current_border(app, client):
+    status, payload = dash_callback(client, 'tiles.children', {('subject_options', 'value'): 'LeBron_James.csv',
+                                                               ('threshold', 'children'): 1.0})
+    tiles = payload['response']['tiles']['children']
+    similarity = payload['response']['current_data_similarity']['children']
+    match = payload['response']['current_match_values']['children']
+    styles = [t['props']['children'][0]['props']['style'] for t in tiles]
+    assert styles == [app.tile_style(s, m, 1.0) for s, m in zip(similarity, match)]
+    assert any(style.get('opacity') for style in styles) and not all(style.get('opacity') for style in styles)
+
+
+def test_tile_style(app):
+    assert app.tile_style(0.9, True, 0.5) == {'border': '10px #00ff00 solid'}
+    assert app.tile_style(0.9, False, 0.5) == {'border': '10px black solid'}
+    assert app.tile_style(0.3, True, 0.5) == {'border': '10px black solid', 'opacity': '0.2'}
+    # before the throttle has stored a threshold
+    assert app.tile_style(0.3, True, None) == {'border': '10px #00ff00 solid'}
+
+
+# one ALL callback restyles every tile on the page when the threshold moves
+def test_threshold_restyles_every_tile(app, client):
+    values, ids = {}, {}
+    loadtest.collect(client.get('/_dash-layout').get_json(), values, ids)
+    response = subject(client, 'Jennifer_Lopez.csv')
+    for output, props in response.items():
+        for prop, value in props.items():
+            values[(output, prop)] = value
+    loadtest.collect(response['tiles']['children'], values, ids)
+    values[('threshold', 'children')] = 0.8
+
+    callback = next(loadtest.Callback(d) for d in client.get('/_dash-dependencies').get_json()
+                    if not d.get('clientside_function') and '"tile-img"' in d['output'])
+    body = callback.body(values, ids, {('threshold', 'children')})
+    assert len(body['outputs']) == 8
+    result = client.post('/_dash-update-component', json=body)
+    assert result.status_code == 200
+    styles = result.get_json()['response']
+    similarity = response['current_data_similarity']['children']
+    match = response['current_match_values']['children']
+    for n, (s, m) in enumerate(zip(similarity, match)):
+        assert styles[loadtest.id_key({'index': n, 'type': 'tile-img'})]['style'] == app.tile_style(s, m, 0.8)
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+import embeddings
+from embeddings import EmbeddingStore, top_k, top_k_many, top_k_rows
+
+
+def store(n=50, dim=8, seed=0):
+    vectors = np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+    return EmbeddingStore(['Person_{}_{:04d}.jpg'.format(i // 2, i % 2 + 1) for i in range(n)], vectors)
+
+
+def brute_force(s, rows, k):
+    v = s.vectors.astype(np.float64)
+    distances = ((v[rows, None, :] - v[None, :, :]) ** 2).sum(axis=2)
+    distances[np.arange(len(rows)), rows] = np.inf
+    return np.argsort(distances, axis=1)[:, :k], np.sort(distances, axis=1)[:, :k]
+
+
+def test_top_k_rows_is_a_sorted_prefix():
+    distances = np.random.default_rng(1).random((20, 30))
+    for k in (1, 5, 29, 30, 40):
+        assert np.array_equal(top_k_rows(distances, k), np.argsort(distances, axis=1)[:, :k])
+
+
+def test_top_k_many_matches_brute_force():
+    s = store()
+    rows = np.arange(0, 50, 3)
+    expected_indices, expected_differences = brute_force(s, rows, 6)
+    for block_size in (1, 4, 512):
+        indices, differences = top_k_many(s, list(s.files[rows]), 6, block_size=block_size)
+        assert np.array_equal(indices, expected_indices)
+        assert differences == pytest.approx(expected_differences, abs=1e-4)
+        assert not (indices == rows[:, None]).any()
+
+
+def test_k_is_capped_at_the_rest_of_the_gallery():
+    s = store(n=5)
+    indices, _ = top_k_many(s, [s.files[0]], 10)
+    assert sorted(indices[0]) == [1, 2, 3, 4]
+
+
+def test_top_k_frame_follows_the_csv_schema():
+    s = store()
+    frame = top_k(s, s.files[0], 4)
+    assert list(frame.columns) == embeddings.CSV_COLUMNS
+    assert list(frame['Difference']) == sorted(frame['Difference'], reverse=True)
+    assert (frame['Similarity'] - (1.5 - frame['Difference'])).abs().max() < 1e-9
+    # a candidate matches when it is another image of the subject's own person
+    assert list(frame['Match']) == list(frame['Name'] == 'Person 0')
+    assert frame['Subject_File'][0] == '/assets/Person_0_0001.jpg' and frame['Subject_File'][1:].isna().all()
+
+
+@pytest.mark.parametrize('k', [0, -1])
+def test_k_below_one_is_rejected(k):
+    s = store()
+    with pytest.raises(ValueError, match='at least 1'):
+        top_k_rows(np.zeros((2, 3)), k)
+    with pytest.raises(ValueError, match='at least 1'):
+        top_k_many(s, [s.files[0]], k)
+    with pytest.raises(ValueError, match='at least 1'):
+        top_k(s, s.files[0], k)
+    with pytest.raises(SystemExit):
+        embeddings.main(['--store', 'unused.npy', '--candidates', str(k)])
+
+
+def test_a_store_of_one_face_has_no_candidates():
+    s = store(n=1)
+    with pytest.raises(ValueError, match='no faces besides'):
+        top_k_many(s, [s.files[0]], 3)
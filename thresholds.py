@@ -0,0 +1,102 @@
+import numpy as np
+
+
+# operating thresholds for every subject and for all subjects pooled, where a pair is a match
+# when Similarity >= threshold:
+#   eer        the threshold where the false match rate and the miss rate are closest, and
+#              the equal error rate there
+#   best       the threshold with the lowest FALSE_MATCH_COST * fmr + MISS_COST * miss rate
+#   highest    the highest threshold that still finds the subject's true match(es)
+# Candidates are each subject's own scores (plus one above them all, which matches nothing).
+# Error rates come from one binary search over a single sorted array in which every subject's
+# scores are shifted into their own band, so all subjects are solved at once.
+
+FALSE_MATCH_COST = 1.0
+MISS_COST = 1.0
+
+_tables = {}
+
+
+# counts of `scores` (subjects x n, only where `mask`) that are >= / < each candidate threshold
+class BandedCounts:
+
+    def __init__(self, scores, mask, low, span):
+        rows = np.broadcast_to(np.arange(scores.shape[0])[:, None], scores.shape)
+        self.keys = np.sort(rows[mask] * span + (scores[mask] - low))
+        self.totals = mask.sum(axis=1)
+        self.ends = np.cumsum(self.totals)
+        self.starts = self.ends - self.totals
+        self.low = low
+        self.span = span
+
+    def below(self, candidates):
+        rows = np.arange(candidates.shape[0])[:, None]
+        keys = rows * self.span + (candidates - self.low)
+        return np.searchsorted(self.keys, keys, side='left') - self.starts[:, None]
+
+    def at_or_above(self, candidates):
+        return self.totals[:, None] - self.below(candidates)
+
+
+def solve(similarity, match, valid, false_match_cost=FALSE_MATCH_COST, miss_cost=MISS_COST):
+    similarity = np.where(valid, similarity, np.nan)
+    low = np.nanmin(similarity)
+    high = np.nanmax(similarity)
+    span = high - low + 2
+    impostors = BandedCounts(similarity, valid & ~match, low, span)
+    genuine = BandedCounts(similarity, valid & match, low, span)
+
+    # candidates: every score in the row, plus one that matches nothing; padding repeats it
+    above_all = np.nanmax(similarity, axis=1, keepdims=True) + 1e-3
+    candidates = np.concatenate([np.where(valid, similarity, above_all), above_all], axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        fmr = impostors.at_or_above(candidates) / impostors.totals[:, None]
+        miss = genuine.below(candidates) / genuine.totals[:, None]
+
+    # ties go to the higher threshold, the one that lets fewer impostors through
+    order = np.argsort(-candidates, axis=1, kind='stable')
+    candidates = np.take_along_axis(candidates, order, axis=1)
+    fmr = np.take_along_axis(fmr, order, axis=1)
+    miss = np.take_along_axis(miss, order, axis=1)
+    rows = np.arange(len(candidates))
+
+    # rounded so rates that tie exactly aren't split by float noise
+    gap = np.round(np.abs(fmr - miss), 12)
+    eer_at = np.nanargmin(np.where(np.isnan(gap), np.inf, gap), axis=1)
+    cost = np.round(false_match_cost * fmr + miss_cost * miss, 12)
+    best_at = np.nanargmin(np.where(np.isnan(cost), np.inf, cost), axis=1)
+    highest = np.where(valid & match, similarity, -np.inf).max(axis=1)
+    highest[np.isneginf(highest)] = np.nan
+
+    return {
+        'eer_threshold': candidates[rows, eer_at],
+        'eer': (fmr[rows, eer_at] + miss[rows, eer_at]) / 2,
+        'best_threshold': candidates[rows, best_at],
+        'best_fmr': fmr[rows, best_at],
+        'best_miss': miss[rows, best_at],
+        'highest_threshold': highest,
+    }
+
+
+# one row per subject plus a final 'All subjects' row for the pooled data, cached per data version
+def table(registry, false_match_cost=FALSE_MATCH_COST, miss_cost=MISS_COST):
+    key = (registry.version, false_match_cost, miss_cost)
+    if key not in _tables:
+        import pandas as pd
+        per_subject = solve(registry.similarity, registry.match, registry.valid, false_match_cost, miss_cost)
+        valid = registry.valid
+        pooled = solve(registry.similarity[valid][None, :], registry.match[valid][None, :],
+                       np.ones((1, int(valid.sum())), dtype=bool), false_match_cost, miss_cost)
+        # the pooled data only finds every true match up to the lowest subject's highest threshold
+        pooled['highest_threshold'] = np.array([np.nanmin(per_subject['highest_threshold'])])
+        frame = pd.DataFrame({name: np.r_[per_subject[name], pooled[name]] for name in per_subject})
+        frame.index = registry.values + ['all']
+        frame.insert(0, 'subject', registry.labels + ['All subjects'])
+        _tables[key] = frame
+    return _tables[key]
+
+
+def describe(row):
+    return ('Equal error rate {:.0%} at {:.2f}. Lowest-cost threshold {:.2f}. '
+            'Still finds the true match up to {:.2f}.'.format(
+                row['eer'], row['eer_threshold'], row['best_threshold'], row['highest_threshold']))